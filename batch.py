@@ -0,0 +1,209 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from extract_complex_pdf import DirectorySink
+
+RESULT_MARKER = '_result.json'
+MANIFEST_FILENAME = 'manifest.json'
+
+
+def find_pdfs(input_dir):
+    """
+    All PDF files below input_dir, in a stable order
+    """
+    pdf_paths = []
+    for root, _, files in os.walk(input_dir):
+        for file in files:
+            if file.lower().endswith('.pdf'):
+                pdf_paths.append(os.path.join(root, file))
+    return sorted(pdf_paths)
+
+
+def unpack_pdf_archive(archive_path, input_dir):
+    """
+    Extract the PDF members of a ZIP archive into input_dir, ignoring anything
+    else and any member path that would escape input_dir
+
+    Returns:
+        int: Number of PDFs extracted
+    """
+    count = 0
+    root = os.path.realpath(input_dir)
+    with zipfile.ZipFile(archive_path) as archive:
+        for member in archive.infolist():
+            name = member.filename
+            if member.is_dir() or not name.lower().endswith('.pdf') or name.startswith('__MACOSX/'):
+                continue
+
+            target = os.path.realpath(os.path.join(root, name))
+            if not target.startswith(root + os.sep):
+                continue
+
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with archive.open(member) as src, open(target, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            count += 1
+    return count
+
+
+def document_id(pdf_path, input_dir):
+    """
+    Output directory name of a document: its path relative to the batch root,
+    flattened into a single filesystem-safe name
+    """
+    relative = os.path.splitext(os.path.relpath(pdf_path, input_dir))[0]
+    return re.sub(r'[^\w.-]+', '_', relative.replace(os.sep, '__'))
+
+
+def read_marker(doc_dir):
+    try:
+        with open(os.path.join(doc_dir, RESULT_MARKER), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def process_document(extract_fn, pdf_path, doc_id, doc_dir):
+    """
+    Executed inside a pool process: extract one document into doc_dir.
+    The result marker is written last, so its presence means the document is
+    finished and can be skipped when a batch is resumed.
+    """
+    start = time.time()
+    marker = {'document': doc_id, 'source': pdf_path, 'status': None, 'error': None,
+              'doi': None, 'stages': None, 'pages_reused': None, 'page_tiers': None, 'pages_timed_out': [],
+              'duplicates': [], 'files': [], 'seconds': None}
+    try:
+        result = extract_fn(pdf_path, DirectorySink(doc_dir))
+        if result is None:
+            marker['status'] = 'empty'
+        else:
+            marker['status'] = 'done'
+            marker['doi'] = result.get('doi')
+            marker['stages'] = result.get('stages')
+            marker['pages_reused'] = result.get('pages_reused')
+            marker['page_tiers'] = result.get('page_tiers')
+            marker['pages_timed_out'] = result.get('pages_timed_out') or []
+            marker['duplicates'] = result.get('duplicates') or []
+    except Exception as e:
+        os.makedirs(doc_dir, exist_ok=True)
+        marker['status'] = 'failed'
+        marker['error'] = str(e)
+
+    marker['files'] = sorted(f for f in os.listdir(doc_dir) if f != RESULT_MARKER)
+    marker['seconds'] = time.time() - start
+    _write_json(os.path.join(doc_dir, RESULT_MARKER), marker)
+    return marker
+
+
+def write_manifest(output_dir, documents, stats):
+    # Pages handled by each extraction tier, summed over the documents, and
+    # the pages given up after a time budget (listed per document)
+    page_tiers = {}
+    pages_timed_out = 0
+    for marker in documents.values():
+        for tier, count in (marker.get('page_tiers') or {}).items():
+            page_tiers[tier] = page_tiers.get(tier, 0) + count
+        pages_timed_out += len(marker.get('pages_timed_out') or [])
+    manifest = {'stats': dict(stats, page_tiers=page_tiers, pages_timed_out=pages_timed_out),
+                'documents': sorted(documents.values(), key=lambda d: d['document'])}
+    _write_json(os.path.join(output_dir, MANIFEST_FILENAME), manifest)
+    return manifest
+
+
+def run_batch(input_dir, output_dir, extract_fn, max_workers=None, resume=True, mp_context=None):
+    """
+    Extract every PDF below input_dir into its own directory under output_dir,
+    fanning documents out across a process pool
+
+    Args:
+        input_dir (str): Directory searched recursively for PDFs
+        output_dir (str): Directory receiving one sub-directory per document and manifest.json
+        extract_fn (callable): Picklable function (pdf_path, sink) -> result dict or None
+        max_workers (int): Pool size, defaults to the CPU count
+        resume (bool): Skip documents already finished by a previous run
+        mp_context: multiprocessing context of the pool (e.g. 'forkserver'
+            when called from a threaded server)
+
+    Returns:
+        dict: The combined manifest
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    pdf_paths = find_pdfs(input_dir)
+
+    documents = {}
+    pending = []
+    for pdf_path in pdf_paths:
+        doc_id = document_id(pdf_path, input_dir)
+        doc_dir = os.path.join(output_dir, doc_id)
+        marker = read_marker(doc_dir) if resume else None
+        if marker and marker['status'] in ('done', 'empty'):
+            documents[doc_id] = marker
+        else:
+            pending.append((pdf_path, doc_id, doc_dir))
+
+    skipped = len(documents)
+    print(f"Batch: {len(pdf_paths)} document(s), {skipped} already finished, {len(pending)} to process")
+
+    stats = {'documents': len(pdf_paths), 'skipped': skipped, 'processed': 0, 'failed': 0,
+             'seconds': 0.0, 'documents_per_second': None}
+    start = time.time()
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+            futures = {executor.submit(process_document, extract_fn, pdf_path, doc_id, doc_dir): doc_id
+                       for pdf_path, doc_id, doc_dir in pending}
+            for future in as_completed(futures):
+                doc_id = futures[future]
+                try:
+                    marker = future.result()
+                except Exception as e:
+                    marker = {'document': doc_id, 'status': 'failed', 'error': str(e)}
+
+                documents[doc_id] = marker
+                stats['processed'] += 1
+                if marker['status'] == 'failed':
+                    stats['failed'] += 1
+
+                elapsed = time.time() - start
+                stats['seconds'] = elapsed
+                stats['documents_per_second'] = stats['processed'] / elapsed if elapsed else None
+                print(f"[{stats['processed']}/{len(pending)}] {doc_id}: {marker['status']} "
+                      f"({stats['documents_per_second']:.2f} docs/s)")
+
+                # Keep the manifest current so an interrupted batch still leaves a usable one
+                write_manifest(output_dir, documents, stats)
+
+    manifest = write_manifest(output_dir, documents, stats)
+    rate = stats['documents_per_second']
+    print(f"Batch finished: {stats['processed']} processed, {stats['failed']} failed, "
+          f"{skipped} skipped in {stats['seconds']:.1f}s"
+          + (f" ({rate:.2f} docs/s)" if rate else ''))
+    return manifest
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Extract tables from every PDF in a directory')
+    arg_parser.add_argument('input_dir', help='Directory searched recursively for PDFs')
+    arg_parser.add_argument('output_dir', help='Directory receiving per-document results and manifest.json')
+    arg_parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    arg_parser.add_argument('--no-resume', action='store_true', help='Re-process documents finished by a previous run')
+    args = arg_parser.parse_args()
+
+    from main import pool_extraction, run_extraction
+
+    extract_fn, _ = pool_extraction(run_extraction)
+    run_batch(args.input_dir, args.output_dir, extract_fn, max_workers=args.workers, resume=not args.no_resume)
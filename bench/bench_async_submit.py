@@ -0,0 +1,105 @@
+"""
+Throughput of the async LlamaParse submitter against the local mock server,
+for several in-flight limits, and whether it splits the result into the
+server's pages and finds the document's DOI.
+
+    python -m bench.bench_async_submit --documents 40 --latency 1 --in-flight 1 4 16
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from bench.mock_llamaparse import start_mock_server
+from bench.synthetic_pdf import write_table_pdf
+from doc_index import DOI_SEARCH_PAGES, find_doi
+from llama_async import AsyncLlamaParseSubmitter, submit_and_extract
+
+
+async def parse_one(base_url, pdf_path):
+    async with AsyncLlamaParseSubmitter(api_key='mock', base_url=base_url, poll_interval=0.05) as submitter:
+        return await submitter.parse(pdf_path)
+
+
+def check_pages(pdf_path, pages=2):
+    """
+    Parse one PDF on a mock server whose pages hold '---' rules
+
+    Returns:
+        list: Failure messages
+    """
+    server, base_url = start_mock_server(latency=0.0, pages=pages)
+    try:
+        documents = asyncio.run(parse_one(base_url, pdf_path))
+    finally:
+        server.shutdown()
+
+    failures = []
+    if [doc.metadata['page_label'] for doc in documents] != list(range(1, pages + 1)):
+        failures.append(f"expected pages 1-{pages}, got {[doc.metadata['page_label'] for doc in documents]}")
+    doi = find_doi('\n'.join(doc.text for doc in documents[:DOI_SEARCH_PAGES]))
+    if doi != '10.5555/mock.0':
+        failures.append(f"expected DOI 10.5555/mock.0, got {doi}")
+    return failures
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--documents', type=int, default=40)
+    arg_parser.add_argument('--latency', type=float, default=1.0)
+    arg_parser.add_argument('--rate-limit', type=float, default=20.0, help='Mock server requests/second before 429')
+    arg_parser.add_argument('--throttle-probability', type=float, default=0.05)
+    arg_parser.add_argument('--in-flight', type=int, nargs='+', default=[1, 4, 16])
+    arg_parser.add_argument('--rps', type=float, default=15.0, help='Client request budget per second')
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    pdf_paths = []
+    for i in range(args.documents):
+        pdf_path = os.path.join(work_dir, f"paper_{i:04d}.pdf")
+        write_table_pdf(pdf_path, pages=1, rows=5, cols=4, seed=i)
+        pdf_paths.append(pdf_path)
+
+    failures = check_pages(pdf_paths[0])
+    results = []
+    for in_flight in args.in_flight:
+        server, base_url = start_mock_server(latency=args.latency, rate_limit=args.rate_limit,
+                                             throttle_probability=args.throttle_probability)
+        output_dir = os.path.join(work_dir, f"out_{in_flight}")
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            stats = asyncio.run(submit_and_extract(
+                pdf_paths, output_dir, api_key='mock', base_url=base_url, max_in_flight=in_flight,
+                requests_per_second=args.rps, poll_interval=0.25, backoff_base=0.25
+            ))
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+            server.shutdown()
+
+        stats['in_flight'] = in_flight
+        results.append(stats)
+        print(f"in_flight={in_flight:<3} {stats['documents_per_second']:6.2f} docs/s "
+              f"completed={stats['completed']} failed={stats['failed']} "
+              f"throttled={stats['throttled']} retries={stats['retries']}")
+
+        if stats['failed']:
+            failures.append(f"in_flight={in_flight}: {stats['failed']} documents failed")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'ok': not failures, 'failures': failures, 'runs': results}, f, indent=2)
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
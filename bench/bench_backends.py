@@ -0,0 +1,79 @@
+"""
+Measure parse latency and extract_and_save_tables throughput per parser
+backend, fully offline by default (LlamaParse is replaced by recorded fixtures).
+
+    python -m bench.bench_backends --pages 8 --backends fixture camelot pdfplumber
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from bench.synthetic_markdown import synthetic_markdown
+from bench.synthetic_pdf import write_table_pdf
+from extract_complex_pdf import extract_and_save_tables
+from parser_backends import FixtureBackend, ParsedDocument, get_backend, latency_stats, parse_documents
+from zip_stream import ZipSink
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--pages', type=int, default=8)
+    arg_parser.add_argument('--rows', type=int, default=20)
+    arg_parser.add_argument('--cols', type=int, default=8)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--backends', nargs='+', default=['fixture', 'camelot', 'pdfplumber'])
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    pdf_path = os.path.join(work_dir, 'fixture.pdf')
+    write_table_pdf(pdf_path, pages=args.pages, rows=args.rows, cols=args.cols)
+
+    # Record what a markdown parser would return for this PDF, one document per page
+    fixture_dir = os.path.join(work_dir, 'recordings')
+    documents = [ParsedDocument(synthetic_markdown(tables=1, rows=args.rows, cols=args.cols, seed=page,
+                                                   first_table=page + 1))
+                 for page in range(args.pages)]
+    FixtureBackend.record(fixture_dir, pdf_path, documents)
+    os.environ['PARSER_FIXTURE_DIR'] = fixture_dir
+
+    results = []
+    for name in args.backends:
+        get_backend(name)
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            tables = 0
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                parsed = parse_documents(pdf_path, backend=name)
+                sink = ZipSink(open(os.devnull, 'wb'))
+                extract_and_save_tables(parsed, doi='10.1000/bench', sink=sink)
+                sink.close()
+                tables += sink.entries // 2
+            elapsed = time.perf_counter() - start
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+        results.append({
+            'backend': name,
+            'runs': args.repeat,
+            'tables': tables,
+            'seconds': elapsed,
+            'documents_per_second': args.repeat / elapsed,
+            'tables_per_second': tables / elapsed,
+            'latency': latency_stats()[name],
+        })
+        print(f"{name:<11} {args.repeat / elapsed:7.2f} docs/s {tables / elapsed:8.1f} tables/s "
+              f"parse mean={latency_stats()[name]['mean_seconds']:.3f}s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
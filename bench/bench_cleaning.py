@@ -0,0 +1,219 @@
+"""
+Check the vectorised table cleaning in main.py against the row-wise reference
+implementation and measure the speedup on large synthetic tables. The output
+differences of the later header fix (HEADER_SKIP_VALUE_ROWS) are listed.
+
+    python -m bench.bench_cleaning --rows 10000
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+import main as service
+from bench import legacy_cleaning
+from bench.synthetic_pdf import AMINO_ACIDS, format_value
+from layout_templates import LayoutTemplateRegistry
+
+SPECIAL_CELLS = ['', '  ', None, np.nan, '1.2 +- 0.3', '4.5+/-0.1a', '- 2', '3.1 ± 0.2b',
+                 '  Lys \t', '12', '.5', 'n.d.', '+', 'Total']
+
+
+def synthetic_table(rows, cols, seed=0, header_rows=2, category_every=15, noise=0.05):
+    """
+    Raw Camelot-like table: caption, multi-row header, category rows, mean±SD
+    cells and a sprinkle of awkward values
+    """
+    rng = random.Random(seed)
+    data = [['Table 1. Amino acid composition'] + [''] * (cols - 1)]
+    data.append(['A.A.', 'Ref.*'] + ['B C .'] * (cols - 2))
+    for h in range(header_rows - 1):
+        data.append(['', ''] + [str(i + 1) for i in range(cols - 2)])
+
+    for r in range(rows):
+        if category_every and r % category_every == 0:
+            data.append([f"Group {r // category_every}"] + [''] * (cols - 1))
+            continue
+        row = [AMINO_ACIDS[r % len(AMINO_ACIDS)], str(rng.randint(10, 99))]
+        row += [format_value(rng) for _ in range(cols - 2)]
+        for c in range(cols):
+            if rng.random() < noise:
+                row[c] = rng.choice(SPECIAL_CELLS)
+        data.append(row)
+    return pd.DataFrame(data)
+
+
+def frames_equal(expected, actual):
+    if expected is None or actual is None:
+        return expected is None and actual is None
+    return (list(expected.columns) == list(actual.columns) and
+            list(expected.index) == list(actual.index) and
+            expected.astype(object).values.tolist() == actual.astype(object).values.tolist())
+
+
+def check_equivalence(cases):
+    """
+    Compare every public cleaning function against the reference implementation,
+    with the reference's header detection (HEADER_SKIP_VALUE_ROWS off)
+
+    Returns:
+        list: Descriptions of mismatching cases (empty when equivalent)
+    """
+    skip_value_rows = service.HEADER_SKIP_VALUE_ROWS
+    service.HEADER_SKIP_VALUE_ROWS = False
+    service.layout_templates = LayoutTemplateRegistry()
+    try:
+        return _mismatches(cases)
+    finally:
+        service.HEADER_SKIP_VALUE_ROWS = skip_value_rows
+
+
+def _mismatches(cases):
+    failures = []
+    for name, df in cases:
+        cells = pd.Series(df.to_numpy(dtype=object).ravel(), dtype=object)
+        expected_cells = [legacy_cleaning.clean_special_characters(v) for v in cells]
+        if service.clean_series(cells).tolist() != expected_cells:
+            failures.append(f"{name}: clean_series")
+
+        if legacy_cleaning.identify_column_headers(df) != service.identify_column_headers(df):
+            failures.append(f"{name}: identify_column_headers")
+
+        cleaned = service.clean_frame(df)
+        if not frames_equal(legacy_cleaning.process_categories(cleaned), service.process_categories(cleaned)):
+            failures.append(f"{name}: process_categories")
+
+        expected = legacy_cleaning.validate_and_clean_table_data(df, doi='10.1/x', title='T')
+        actual = service.validate_and_clean_table_data(df, doi='10.1/x', title='T')
+        if not frames_equal(expected, actual):
+            failures.append(f"{name}: validate_and_clean_table_data")
+    return failures
+
+
+def value_row_header_changes(cases):
+    """
+    Cases whose cleaned table differs from the reference implementation once
+    rows of measured values are no longer taken as header rows
+    (HEADER_SKIP_VALUE_ROWS=1)
+
+    Returns:
+        list: Per differing case its name and the header row and data rows
+            kept before and after
+    """
+    skip_value_rows = service.HEADER_SKIP_VALUE_ROWS
+    service.HEADER_SKIP_VALUE_ROWS = True
+    service.layout_templates = LayoutTemplateRegistry()
+    changes = []
+    try:
+        for name, df in cases:
+            expected = legacy_cleaning.validate_and_clean_table_data(df, doi='10.1/x', title='T')
+            actual = service.validate_and_clean_table_data(df, doi='10.1/x', title='T')
+            if not frames_equal(expected, actual):
+                changes.append({
+                    'case': name,
+                    'header_row_before': int(legacy_cleaning.identify_column_headers(df)[1]),
+                    'header_row_after': int(service.identify_column_headers(df)[1]),
+                    'rows_before': None if expected is None else len(expected),
+                    'rows_after': None if actual is None else len(actual),
+                })
+    finally:
+        service.HEADER_SKIP_VALUE_ROWS = skip_value_rows
+    return changes
+
+
+def equivalence_cases():
+    cases = [(f"synthetic seed={seed}", synthetic_table(rows=60, cols=6, seed=seed, noise=0.2))
+             for seed in range(20)]
+    cases += [
+        ('no header', pd.DataFrame([['1', '2.0'], ['3', '4'], ['5', '6'], ['7', '8']])),
+        ('all categories', pd.DataFrame([['A', ''], ['B', ''], ['C', None]])),
+        ('single column', pd.DataFrame([['Sample'], ['Lys'], ['His']])),
+        ('duplicate headers', pd.DataFrame([['x', 'x', 'x'], ['a', '1', '2'], ['b', '3', '4']])),
+        ('missing values', pd.DataFrame([[None, np.nan, 'a'], ['b', None, '1'], ['c', '2', None], ['d', '', '']])),
+        ('numeric frame', pd.DataFrame(np.arange(12, dtype=float).reshape(4, 3))),
+        ('gapped index', synthetic_table(rows=20, cols=5, seed=3).iloc[::2]),
+        ('values with letters', pd.DataFrame([['Table 2. Amino acids (g/100 g protein)', '', ''],
+                                              ['Amino acid', 'Raw', 'Cooked'],
+                                              ['Lys', '5.12±0.10a', '4.98±0.08b'],
+                                              ['His', '2.31±0.05a', '2.20±0.04a'],
+                                              ['Leu', '7.85±0.12b', '7.90±0.09b']])),
+    ]
+    return cases
+
+
+def time_call(fn, *args, repeat=1):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, default=10000)
+    arg_parser.add_argument('--cols', type=int, default=14)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    failures = check_equivalence(equivalence_cases())
+    for failure in failures:
+        print(f"MISMATCH {failure}")
+    print(f"Equivalence: {'OK' if not failures else f'{len(failures)} mismatches'}")
+
+    # Intended output changes of HEADER_SKIP_VALUE_ROWS: value rows become data
+    header_changes = value_row_header_changes(equivalence_cases())
+    print(f"HEADER_SKIP_VALUE_ROWS=1 changes {len(header_changes)} of {len(equivalence_cases())} cases:")
+    for change in header_changes:
+        print(f"  {change['case']:<24} header row {change['header_row_before']} -> {change['header_row_after']}, "
+              f"data rows {change['rows_before']} -> {change['rows_after']}")
+        if change['rows_after'] is None or (change['rows_before'] or 0) > change['rows_after']:
+            failures.append(f"{change['case']}: skipping value header rows lost data rows")
+
+    # The equivalence cases above also ran through learned layout templates;
+    # the timings are of the heuristics (template hits: bench.bench_templates)
+    service.layout_templates = None
+    df = synthetic_table(rows=args.rows, cols=args.cols)
+    cleaned = service.clean_frame(df)
+    benchmarks = [
+        ('clean cells', lambda: [df[c].apply(legacy_cleaning.clean_special_characters) for c in df.columns],
+         lambda: service.clean_frame(df)),
+        ('identify_column_headers', lambda: legacy_cleaning.identify_column_headers(df),
+         lambda: service.identify_column_headers(df)),
+        ('process_categories', lambda: legacy_cleaning.process_categories(cleaned),
+         lambda: service.process_categories(cleaned)),
+        ('validate_and_clean_table_data', lambda: legacy_cleaning.validate_and_clean_table_data(df),
+         lambda: service.validate_and_clean_table_data(df)),
+    ]
+
+    results = []
+    for name, legacy_fn, vectorised_fn in benchmarks:
+        legacy_seconds = time_call(legacy_fn, repeat=1)
+        vectorised_seconds = time_call(vectorised_fn, repeat=args.repeat)
+        results.append({
+            'function': name,
+            'rows': args.rows,
+            'legacy_seconds': legacy_seconds,
+            'vectorised_seconds': vectorised_seconds,
+            'speedup': legacy_seconds / vectorised_seconds,
+        })
+        print(f"{name:<32} legacy={legacy_seconds:.3f}s vectorised={vectorised_seconds:.4f}s "
+              f"speedup={legacy_seconds / vectorised_seconds:.1f}x")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'equivalent': not failures, 'mismatches': failures, 'header_changes': header_changes,
+                       'results': results}, f, indent=2)
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
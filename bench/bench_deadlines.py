@@ -0,0 +1,155 @@
+"""
+Request latency percentiles on a stream of papers where a few contain a
+pathological page, with and without per-page time budgets, and whether the
+budgets change anything besides the pages they give up on.
+Each configuration runs in a fresh process with its own settings.
+
+    python -m bench.bench_deadlines --documents 20 --slow 2 --page-timeout 2
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+
+def child(output_dir, pdf_paths):
+    """
+    Executed in a fresh process: extract each PDF into a ZIP and report its
+    latency, output files and the pages given up on
+    """
+    import contextlib
+    import io
+
+    import main
+    from zip_stream import ZipSink
+
+    documents = []
+    for pdf_path in pdf_paths:
+        output_path = os.path.join(output_dir, os.path.basename(pdf_path) + '.zip')
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), open(output_path, 'wb') as f, ZipSink(f) as sink:
+            result = main.run_extraction(pdf_path, sink)
+        seconds = time.perf_counter() - start
+
+        with zipfile.ZipFile(output_path) as archive:
+            files = {name: hashlib.sha256(archive.read(name)).hexdigest() for name in archive.namelist()}
+        documents.append({'seconds': seconds, 'files': files,
+                          'pages_timed_out': (result or {}).get('pages_timed_out') or [],
+                          'page_tiers': (result or {}).get('page_tiers')})
+    print(json.dumps(documents))
+
+
+def run_child(work_dir, pdf_paths, name, page_timeout, retry):
+    output_dir = os.path.join(work_dir, name)
+    os.makedirs(output_dir)
+    env = dict(os.environ, PAGE_TIMEOUT=str(page_timeout), DOCUMENT_TIMEOUT='0', PAGE_TIMEOUT_RETRY=retry,
+               PARSER_BACKEND='pdfplumber', PAGE_WINDOW='0', PAGE_CACHE='0', DOC_INDEX='0',
+               RESULT_CACHE_DIR=os.path.join(work_dir, 'cache'))
+    completed = subprocess.run([sys.executable, '-m', 'bench.bench_deadlines', '--child', output_dir] + pdf_paths,
+                               env=env, capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else 'child failed')
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def percentile(values, q):
+    """
+    Nearest-rank percentile
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def latency_summary(documents):
+    seconds = [document['seconds'] for document in documents]
+    summary = {f"p{q}": percentile(seconds, q) for q in (50, 95, 99)}
+    summary.update(max=max(seconds), total=sum(seconds))
+    return summary
+
+
+def file_page(name):
+    return int(re.match(r'\d+', name).group(0))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--documents', type=int, default=20)
+    arg_parser.add_argument('--slow', type=int, default=2, help='Documents containing a pathological page')
+    arg_parser.add_argument('--page-timeout', type=float, default=2.0, help='PAGE_TIMEOUT of the budgeted run')
+    arg_parser.add_argument('--retry', default='pdfplumber',
+                            help="PAGE_TIMEOUT_RETRY of the budgeted run ('' leaves timed-out pages out)")
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    arg_parser.add_argument('--child', nargs='+', metavar='PATH', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1:])
+        return
+
+    from bench.synthetic_pdf import write_mixed_pdf
+
+    kinds = ['table', 'prose', 'table', 'methods']
+    slow_every = args.documents // args.slow if args.slow else 0
+    slow_pages = {}
+    work_dir = tempfile.mkdtemp()
+    failures = []
+    try:
+        pdf_paths = []
+        for i in range(args.documents):
+            document_kinds = list(kinds)
+            if slow_every and i % slow_every == slow_every - 1 and len(slow_pages) < args.slow:
+                document_kinds.insert(2, 'grid')
+                slow_pages[i] = 3
+            pdf_path = os.path.join(work_dir, f"paper-{i:03d}.pdf")
+            write_mixed_pdf(pdf_path, document_kinds, seed=i)
+            pdf_paths.append(pdf_path)
+
+        unbounded = run_child(work_dir, pdf_paths, 'unbounded', 0, '')
+        budgeted = run_child(work_dir, pdf_paths, 'budgeted', args.page_timeout, args.retry)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for i, (before, after) in enumerate(zip(unbounded, budgeted)):
+        expected = [{'page': slow_pages[i], 'reason': 'page_timeout'}] if i in slow_pages else []
+        if after['pages_timed_out'] != expected:
+            failures.append(f"document {i}: expected timed-out pages {expected}, got {after['pages_timed_out']}")
+        if before['pages_timed_out']:
+            failures.append(f"document {i}: pages timed out without a budget")
+        # Only the files of the pages given up on may differ
+        keep = {page['page'] for page in expected}
+        before_files = {name: digest for name, digest in before['files'].items() if file_page(name) not in keep}
+        after_files = {name: digest for name, digest in after['files'].items() if file_page(name) not in keep}
+        if before_files != after_files:
+            failures.append(f"document {i}: tables of the other pages differ")
+
+    results = {'unbounded': latency_summary(unbounded), 'budgeted': latency_summary(budgeted)}
+    print(f"{args.documents} papers, {len(slow_pages)} with a pathological page, "
+          f"PAGE_TIMEOUT={args.page_timeout:g}s retry={args.retry or 'none'}")
+    for name, summary in results.items():
+        print(f"  {name:<10} p50={summary['p50']:.2f}s p95={summary['p95']:.2f}s p99={summary['p99']:.2f}s "
+              f"max={summary['max']:.2f}s total={summary['total']:.1f}s")
+    if slow_pages and results['budgeted']['p99'] >= results['unbounded']['p99']:
+        failures.append('per-page budgets did not lower p99 latency')
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'ok': not failures, 'failures': failures, 'page_timeout': args.page_timeout,
+                       'retry': args.retry, 'slow_documents': sorted(slow_pages), 'latency': results}, f, indent=2)
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Check the DOI/title extractor on synthetic papers (DOI on page 1, on a later
+page, only in XMP or document info, only in the references) and time cold
+extraction against document index lookups.
+
+    python -m bench.bench_doc_index --documents 50
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from bench.synthetic_pdf import write_paper_pdf
+from doc_index import DocumentIndex, extract_document_metadata
+from pdf_session import PdfSession
+
+TITLE = 'Amino acid composition of common bean cultivars'
+XMP = '''<?xpacket begin="" id="W5M0MpCehiHzreSzNTczkc9d"?>
+<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+<rdf:Description rdf:about="" xmlns:dc="http://purl.org/dc/elements/1.1/"
+  xmlns:prism="http://prismstandard.org/namespaces/basic/2.0/">
+<dc:title><rdf:Alt><rdf:li xml:lang="x-default">{title}</rdf:li></rdf:Alt></dc:title>
+<prism:doi>{doi}</prism:doi>
+</rdf:Description></rdf:RDF></x:xmpmeta>
+<?xpacket end="w"?>'''
+
+# (name, write_paper_pdf arguments, expected DOI, expected DOI source, expected title)
+CASES = [
+    ('DOI label on page 1', {'front_lines': ['DOI: 10.1016/j.foodchem.2021.129876']},
+     '10.1016/j.foodchem.2021.129876', 'page 1', TITLE),
+    ('doi.org link with trailing period', {'front_lines': ['Available at https://doi.org/10.3390/foods9010001.']},
+     '10.3390/foods9010001', 'page 1', TITLE),
+    ('dx.doi.org link', {'front_lines': ['http://dx.doi.org/10.1021/acs.jafc.0c01234']},
+     '10.1021/acs.jafc.0c01234', 'page 1', TITLE),
+    ('XMP only', {'xmp': XMP.format(title='Protein quality of lentil flours', doi='10.1111/ijfs.15001')},
+     '10.1111/ijfs.15001', 'xmp', 'Protein quality of lentil flours'),
+    ('document info only', {'info': {'doi': '10.1007/s11130-020-00800-1', 'Title': 'Microsoft Word - draft.docx'}},
+     '10.1007/s11130-020-00800-1', 'info', TITLE),
+    ('DOI on page 2', {'page_lines': {2: ['doi:10.1016/j.lwt.2020.109901']}},
+     '10.1016/j.lwt.2020.109901', 'page 2', TITLE),
+    ('references only', {'pages': 5, 'reference_dois': ['10.1016/j.foodres.2019.01.002']},
+     None, None, TITLE),
+]
+
+LEGACY_PATTERNS = [
+    r'http://dx\.doi\.org/[^\s]+',
+    r'(?:doi:|DOI:|https?://doi\.org/)[^\s]+',
+    r'DOI:\s*10\.\d{4,9}/[^\s]+'
+]
+
+
+def legacy_extract_doi(pdf_path):
+    """
+    The previous main.extract_doi: rebuild the pattern and scan page 1
+    """
+    with PdfSession(pdf_path) as session:
+        match = re.search('|'.join(LEGACY_PATTERNS), session.page_text(1))
+        return match.group(0) if match else None
+
+
+def time_call(fn, items):
+    start = time.perf_counter()
+    results = [fn(item) for item in items]
+    return time.perf_counter() - start, results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--documents', type=int, default=50, help='Papers used for the timings')
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    failures = []
+    try:
+        for i, (name, options, doi, source, title) in enumerate(CASES):
+            path = os.path.join(work_dir, f"case_{i}.pdf")
+            write_paper_pdf(path, title=TITLE, seed=i, **options)
+            with PdfSession(path) as session:
+                metadata = extract_document_metadata(session)
+            found = (metadata['doi'], metadata['doi_source'], metadata['title'])
+            ok = found == (doi, source, title)
+            if not ok:
+                failures.append(f"{name}: expected {(doi, source, title)}, got {found}")
+            print(f"{'ok' if ok else 'MISMATCH':<8} {name:<34} doi={metadata['doi']} ({metadata['doi_source']})")
+
+        paths = []
+        for i in range(args.documents):
+            path = os.path.join(work_dir, f"paper_{i}.pdf")
+            write_paper_pdf(path, title=TITLE, front_lines=[f"DOI: 10.1000/paper.{i}"], seed=1000 + i)
+            paths.append(path)
+
+        index = DocumentIndex(os.path.join(work_dir, 'index.sqlite'))
+
+        def lookup(path):
+            with PdfSession(path) as session:
+                return index.lookup(session, os.path.basename(path))
+
+        legacy_seconds, _ = time_call(legacy_extract_doi, paths)
+        cold_seconds, cold = time_call(lookup, paths)
+        warm_seconds, warm = time_call(lookup, paths)
+        if not all(result['cached'] for result in warm) or any(result['cached'] for result in cold):
+            failures.append('index: repeat lookups were not served from the index')
+
+        # The same paper under another file: found as a duplicate by DOI
+        copy_path = os.path.join(work_dir, 'copy.pdf')
+        write_paper_pdf(copy_path, title=TITLE, front_lines=['DOI: 10.1000/PAPER.0', 'Preprint'], seed=7)
+        duplicates = lookup(copy_path)['duplicates']
+        if [d['filename'] for d in duplicates] != ['paper_0.pdf']:
+            failures.append(f"deduplication: expected paper_0.pdf, got {duplicates}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    n = args.documents
+    print(f"{n} papers: page-1 regex scan={legacy_seconds / n * 1000:.1f}ms/doc "
+          f"cold extraction={cold_seconds / n * 1000:.1f}ms/doc index hit={warm_seconds / n * 1000:.2f}ms/doc "
+          f"({cold_seconds / warm_seconds:.0f}x)")
+    for failure in failures:
+        print(f"MISMATCH {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'correct': not failures, 'mismatches': failures, 'documents': n,
+                       'legacy_seconds': legacy_seconds, 'cold_seconds': cold_seconds,
+                       'index_hit_seconds': warm_seconds}, f, indent=2)
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Peak resident memory of a full extraction as the page count grows, with and
+without bounded-memory page windows, and whether both give the same output.
+Each run happens in a fresh process so its peak RSS is its own.
+
+    python -m bench.bench_memory --pages 10 40 80 --window 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+
+def child(pdf_path, output_path):
+    """
+    Executed in a fresh process: extract one PDF into a ZIP and report peak RSS
+    """
+    import contextlib
+    import io
+
+    import main
+    from memory_guard import peak_rss
+    from zip_stream import ZipSink
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), open(output_path, 'wb') as f, ZipSink(f) as sink:
+        main.run_extraction(pdf_path, sink)
+    seconds = time.perf_counter() - start
+
+    digest = hashlib.sha256()
+    with zipfile.ZipFile(output_path) as archive:
+        for name in archive.namelist():
+            digest.update(name.encode('utf-8'))
+            digest.update(archive.read(name))
+    print(json.dumps({'peak_rss': peak_rss(), 'seconds': seconds, 'output_sha256': digest.hexdigest()}))
+
+
+def run_child(pdf_path, work_dir, window, backend, max_rss_mb):
+    env = dict(os.environ, PAGE_WINDOW=str(window), PARSER_BACKEND=backend, MAX_RSS_MB=str(max_rss_mb),
+               RESULT_CACHE_DIR=os.path.join(work_dir, 'cache'), PAGE_CACHE='0', DOC_INDEX='0')
+    output_path = os.path.join(work_dir, f"out-{window}.zip")
+    completed = subprocess.run([sys.executable, '-m', 'bench.bench_memory', '--child', pdf_path, output_path],
+                               env=env, capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else 'child failed')
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--pages', type=int, nargs='+', default=[10, 40, 80])
+    arg_parser.add_argument('--window', type=int, default=8, help='PAGE_WINDOW of the bounded runs')
+    arg_parser.add_argument('--backend', default='pdfplumber', help='Windowed parser backend (pdfplumber or camelot)')
+    arg_parser.add_argument('--max-rss-mb', type=int, default=0, help='MAX_RSS_MB of the bounded runs')
+    arg_parser.add_argument('--tolerance-mb', type=float, default=16.0,
+                            help='Allowed peak RSS growth of the bounded runs from the smallest to the largest PDF')
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    arg_parser.add_argument('--child', nargs=2, metavar=('PDF', 'OUTPUT'), help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    from bench.synthetic_pdf import write_table_pdf
+
+    results = []
+    failures = []
+    work_dir = tempfile.mkdtemp()
+    try:
+        for pages in args.pages:
+            pdf_path = os.path.join(work_dir, f"paper-{pages}.pdf")
+            write_table_pdf(pdf_path, pages=pages, tables_per_page=2, rows=30, cols=8, prose_every=3, seed=pages)
+            whole = run_child(pdf_path, work_dir, 0, args.backend, 0)
+            bounded = run_child(pdf_path, work_dir, args.window, args.backend, args.max_rss_mb)
+            if whole['output_sha256'] != bounded['output_sha256']:
+                failures.append(f"{pages} pages: windowed output differs from whole-document output")
+            results.append({'pages': pages, 'whole': whole, 'bounded': bounded})
+            print(f"{pages:>5} pages: whole document peak={whole['peak_rss'] / 2**20:.0f}MB "
+                  f"({whole['seconds']:.1f}s)  window={args.window} peak={bounded['peak_rss'] / 2**20:.0f}MB "
+                  f"({bounded['seconds']:.1f}s)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    growth = (results[-1]['bounded']['peak_rss'] - results[0]['bounded']['peak_rss']) / 2**20
+    whole_growth = (results[-1]['whole']['peak_rss'] - results[0]['whole']['peak_rss']) / 2**20
+    print(f"peak RSS growth {args.pages[0]} -> {args.pages[-1]} pages: whole document {whole_growth:+.0f}MB, "
+          f"windowed {growth:+.0f}MB (tolerance {args.tolerance_mb:.0f}MB)")
+    if growth > args.tolerance_mb:
+        failures.append(f"windowed peak RSS grew by {growth:.0f}MB")
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'ok': not failures, 'failures': failures, 'window': args.window, 'backend': args.backend,
+                       'results': results}, f, indent=2)
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Incremental re-extraction of a revised PDF through the page cache: pages
+reused, time against a cold extraction and whether both give the same tables.
+Also checks that pages drawing different form XObjects from the same content
+stream get different page hashes.
+
+    python -m bench.bench_page_cache --pages 24 --changed 2 --insert
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from bench.bench_page_filter import PAGE_KINDS, PAGE_WEIGHTS
+from bench.synthetic_pdf import write_form_pdf, write_mixed_pdf
+from page_cache import PageCache
+from pdf_session import PdfSession
+
+
+def extract(pdf_path, page_cache):
+    """
+    Screen the pages and read the Camelot tables of the candidate pages
+
+    Returns:
+        tuple: (seconds, [(page, rows), ...], reuse counts, Camelot page parses)
+    """
+    start = time.perf_counter()
+    with PdfSession(pdf_path, page_cache=page_cache) as session:
+        tables = [(int(table.page), table.df.values.tolist())
+                  for table in session.read_candidate_tables(flavor='stream')]
+        reuse = session.reuse_counts
+        camelot_pages = session.parse_counts['camelot']
+    return time.perf_counter() - start, tables, reuse, camelot_pages
+
+
+def form_page_hashes(work_dir):
+    """
+    Page hashes of two one-page PDFs with the same content stream ('q /Fm0 Do Q')
+    drawing form XObjects with different values
+    """
+    hashes = []
+    for i, line in enumerate(['Lysine 2.45', 'Glycine 9.99']):
+        pdf_path = os.path.join(work_dir, f"form-{i}.pdf")
+        write_form_pdf(pdf_path, [line])
+        with PdfSession(pdf_path) as session:
+            hashes.append(session.page_hash(1))
+    return hashes
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--pages', type=int, default=24)
+    arg_parser.add_argument('--changed', type=int, default=2, help='Pages whose content changes in the revision')
+    arg_parser.add_argument('--insert', action='store_true',
+                            help='Also insert a new prose page at the front, shifting every page')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    rng = random.Random(args.seed)
+    kinds = rng.choices(PAGE_KINDS, weights=PAGE_WEIGHTS, k=args.pages)
+    seeds = [args.seed * 10000 + i for i in range(args.pages)]
+    revised_kinds = list(kinds)
+    revised_seeds = list(seeds)
+    for page in rng.sample(range(args.pages), min(args.changed, args.pages)):
+        revised_seeds[page] += 5000
+    if args.insert:
+        revised_kinds.insert(0, 'prose')
+        revised_seeds.insert(0, args.seed * 10000 - 1)
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        original = os.path.join(work_dir, 'original.pdf')
+        revised = os.path.join(work_dir, 'revised.pdf')
+        write_mixed_pdf(original, kinds, page_seeds=seeds)
+        write_mixed_pdf(revised, revised_kinds, page_seeds=revised_seeds)
+
+        page_cache = PageCache(os.path.join(work_dir, 'pages'), max_bytes=256 * 1024 * 1024)
+        first_seconds, _, _, _ = extract(original, page_cache)
+        cold_seconds, cold_tables, _, cold_camelot = extract(revised, None)
+        warm_seconds, warm_tables, reuse, warm_camelot = extract(revised, page_cache)
+        form_hashes = form_page_hashes(work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    equivalent = cold_tables == warm_tables
+    result = {
+        'pages': len(revised_kinds),
+        'changed': args.changed,
+        'inserted': args.insert,
+        'tables': len(warm_tables),
+        'pages_reused': reuse['pages_reused'],
+        'page_reuse_ratio': reuse['page_reuse_ratio'],
+        'camelot_pages_cold': cold_camelot,
+        'camelot_pages_incremental': warm_camelot,
+        'first_upload_seconds': first_seconds,
+        'cold_seconds': cold_seconds,
+        'incremental_seconds': warm_seconds,
+        'speedup': cold_seconds / warm_seconds,
+        'equivalent': equivalent,
+        'form_pages_distinguished': form_hashes[0] != form_hashes[1],
+    }
+    print(f"revision of {result['pages']} pages ({args.changed} changed{', 1 inserted' if args.insert else ''}): "
+          f"{reuse['pages_reused']} pages reused ({reuse['page_reuse_ratio']:.0%}), "
+          f"Camelot pages {cold_camelot} -> {warm_camelot}")
+    print(f"  cold={cold_seconds:.2f}s incremental={warm_seconds:.2f}s speedup={result['speedup']:.1f}x "
+          f"tables={len(warm_tables)} {'identical' if equivalent else 'MISMATCH'}")
+
+    failures = []
+    if not equivalent:
+        failures.append('incremental tables differ from a cold extraction')
+    if not result['form_pages_distinguished']:
+        failures.append('pages drawing different form XObjects share a page hash')
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(dict(result, ok=not failures, failures=failures), f, indent=2)
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
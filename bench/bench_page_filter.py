@@ -0,0 +1,132 @@
+"""
+Recall and cost of the page pre-filter: which pages are sent to Camelot, how
+many table pages are missed, and Camelot time on all pages vs. candidate pages.
+
+    python -m bench.bench_page_filter --documents 20 --pages 12
+    python -m bench.bench_page_filter --fixtures path/to/pdfs   # with labels.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from pdf_session import PdfSession
+from bench.synthetic_pdf import write_mixed_pdf
+
+PAGE_KINDS = ['table', 'plain_table', 'prose', 'references', 'methods']
+PAGE_WEIGHTS = [2, 1, 4, 2, 2]
+
+
+def synthetic_fixtures(work_dir, documents, pages, seed=0):
+    """
+    Write synthetic papers mixing table and non-table pages
+
+    Returns:
+        dict: pdf path -> list of table pages
+    """
+    rng = random.Random(seed)
+    labels = {}
+    for i in range(documents):
+        kinds = rng.choices(PAGE_KINDS, weights=PAGE_WEIGHTS, k=pages)
+        pdf_path = os.path.join(work_dir, f"paper_{i:03d}.pdf")
+        labels[pdf_path] = write_mixed_pdf(pdf_path, kinds, seed=seed + i)
+    return labels
+
+
+def load_fixture_labels(fixture_dir):
+    """
+    labels.json in fixture_dir maps PDF file names to their table pages
+    """
+    with open(os.path.join(fixture_dir, 'labels.json'), 'r', encoding='utf-8') as f:
+        return {os.path.join(fixture_dir, name): pages for name, pages in json.load(f).items()}
+
+
+def evaluate(labels, camelot_documents=0):
+    """
+    Screen every labelled PDF and compare against the true table pages
+
+    Returns:
+        dict: Page counts, recall, precision, missed pages and timings
+    """
+    result = {'documents': len(labels), 'pages': 0, 'table_pages': 0, 'candidate_pages': 0,
+              'true_positives': 0, 'missed': [], 'screen_seconds': 0.0,
+              'camelot_all_seconds': 0.0, 'camelot_candidates_seconds': 0.0, 'camelot_documents': 0}
+
+    for index, (pdf_path, table_pages) in enumerate(sorted(labels.items())):
+        with PdfSession(pdf_path) as session:
+            start = time.perf_counter()
+            candidates = set(session.candidate_pages())
+            result['screen_seconds'] += time.perf_counter() - start
+            result['pages'] += session.page_count
+
+        result['table_pages'] += len(table_pages)
+        result['candidate_pages'] += len(candidates)
+        result['true_positives'] += len(candidates & set(table_pages))
+        result['missed'] += [f"{os.path.basename(pdf_path)}:{p}" for p in table_pages if p not in candidates]
+
+        if index < camelot_documents:
+            with PdfSession(pdf_path) as session:
+                start = time.perf_counter()
+                session.read_tables(pages='all', flavor='stream')
+                result['camelot_all_seconds'] += time.perf_counter() - start
+            with PdfSession(pdf_path) as session:
+                start = time.perf_counter()
+                session.read_candidate_tables(flavor='stream')
+                result['camelot_candidates_seconds'] += time.perf_counter() - start
+            result['camelot_documents'] += 1
+
+    result['recall'] = result['true_positives'] / result['table_pages'] if result['table_pages'] else 1.0
+    result['precision'] = result['true_positives'] / result['candidate_pages'] if result['candidate_pages'] else 1.0
+    result['skipped_fraction'] = 1 - result['candidate_pages'] / result['pages'] if result['pages'] else 0.0
+    return result
+
+
+def report(name, result):
+    print(f"{name}: {result['documents']} documents, {result['pages']} pages screened, "
+          f"{result['candidate_pages']} sent to Camelot ({result['skipped_fraction']:.0%} skipped)")
+    print(f"  recall={result['recall']:.3f} precision={result['precision']:.3f} "
+          f"screen={result['screen_seconds'] / max(result['pages'], 1) * 1000:.1f}ms/page")
+    if result['camelot_documents']:
+        print(f"  Camelot on {result['camelot_documents']} documents: all pages "
+              f"{result['camelot_all_seconds']:.2f}s, candidate pages {result['camelot_candidates_seconds']:.2f}s "
+              f"(screening included)")
+    for missed in result['missed']:
+        print(f"  MISSED table page {missed}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--documents', type=int, default=20)
+    arg_parser.add_argument('--pages', type=int, default=12)
+    arg_parser.add_argument('--camelot-documents', type=int, default=3,
+                            help='Documents also timed with Camelot on all vs. candidate pages')
+    arg_parser.add_argument('--fixtures', help='Directory of real PDFs with a labels.json of table pages')
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        results = {'synthetic': evaluate(synthetic_fixtures(work_dir, args.documents, args.pages),
+                                         args.camelot_documents)}
+        if args.fixtures:
+            results['fixtures'] = evaluate(load_fixture_labels(args.fixtures), args.camelot_documents)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for name, result in results.items():
+        report(name, result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    # No real table may be dropped by the pre-filter
+    if any(result['missed'] for result in results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
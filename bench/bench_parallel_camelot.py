@@ -0,0 +1,69 @@
+"""
+Compare serial and page-parallel Camelot extraction on a multi-page fixture.
+
+    python -m bench.bench_parallel_camelot --pages 32 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import camelot
+
+from bench.synthetic_pdf import write_table_pdf
+from parallel_camelot import read_pdf_parallel
+
+
+def tables_signature(tables):
+    return [(table.page, table.order, table.df.values.tolist()) for table in tables]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--pdf', help='Existing PDF to use instead of a synthetic fixture')
+    arg_parser.add_argument('--pages', type=int, default=32)
+    arg_parser.add_argument('--rows', type=int, default=30)
+    arg_parser.add_argument('--cols', type=int, default=8)
+    arg_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    pdf_path = args.pdf
+    if not pdf_path:
+        pdf_path = os.path.join(tempfile.mkdtemp(), 'fixture.pdf')
+        write_table_pdf(pdf_path, pages=args.pages, rows=args.rows, cols=args.cols)
+
+    reference = tables_signature(camelot.read_pdf(pdf_path, pages='all', flavor='stream'))
+    results = []
+    for workers in args.workers:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            tables = read_pdf_parallel(pdf_path, pages='all', flavor='stream', max_workers=workers)
+            timings.append(time.perf_counter() - start)
+
+        identical = tables_signature(tables) == reference
+
+        best = min(timings)
+        results.append({
+            'workers': workers,
+            'tables': len(tables),
+            'best_seconds': best,
+            'speedup': results[0]['best_seconds'] / best if results else 1.0,
+            'identical_to_serial': identical,
+        })
+        print(f"workers={workers:<2} tables={len(tables):<4} best={best:.3f}s "
+              f"speedup={results[-1]['speedup']:.2f}x identical={identical}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'pdf': pdf_path, 'cpu_count': os.cpu_count(), 'results': results}, f, indent=2)
+
+    if not all(result['identical_to_serial'] for result in results):
+        raise SystemExit("Parallel output differs from the serial path")
+
+
+if __name__ == '__main__':
+    main()
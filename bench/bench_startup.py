@@ -0,0 +1,117 @@
+"""
+Cold start of the web app: import time of main against the eager imports of
+the previous tree, and time to the first extraction response of a cold worker
+against a worker forked from a warmed-up (preloaded) master.
+
+    python -m bench.bench_startup --backends pdfplumber camelot --repeat 3
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Libraries main imported at module level, directly or through
+# extract_complex_pdf and pdf_session, before backends were loaded lazily
+LEGACY_IMPORTS = ['llama_parse', 'llama_index.core', 'nest_asyncio', 'tabula', 'camelot']
+MODES = ['import', 'legacy_import', 'cold_worker', 'preforked_worker']
+
+
+def first_response(app, pdf_path):
+    with open(pdf_path, 'rb') as f:
+        response = app.test_client().post('/extract-tables', data={'file': (f, 'startup.pdf')})
+    if response.status_code != 200:
+        raise RuntimeError(f"/extract-tables returned {response.status_code}")
+
+
+def child(mode, pdf_path):
+    """
+    Executed in a fresh process: time one startup path and print it as JSON
+    """
+    import contextlib
+    import importlib
+    import io
+
+    start = time.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == 'legacy_import':
+            for module in LEGACY_IMPORTS:
+                importlib.import_module(module)
+        import main
+        if mode in ('import', 'legacy_import'):
+            seconds = time.monotonic() - start
+        elif mode == 'cold_worker':
+            first_response(main.app, pdf_path)
+            seconds = time.monotonic() - start
+        else:
+            app = main.create_app()
+            read_fd, write_fd = os.pipe()
+            forked_at = time.monotonic()
+            pid = os.fork()
+            if pid == 0:
+                first_response(app, pdf_path)
+                os.write(write_fd, str(time.monotonic() - forked_at).encode('ascii'))
+                os._exit(0)
+            os.waitpid(pid, 0)
+            seconds = float(os.read(read_fd, 64).decode('ascii'))
+    print(json.dumps({'seconds': seconds}))
+
+
+def run_child(mode, backend, pdf_path, work_dir):
+    cache_dir = tempfile.mkdtemp(dir=work_dir)
+    env = dict(os.environ, PARSER_BACKEND=backend, RESULT_CACHE_DIR=cache_dir, PAGE_CACHE='0', DOC_INDEX='0')
+    completed = subprocess.run([sys.executable, '-m', 'bench.bench_startup', '--child', mode, pdf_path],
+                               env=env, capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else 'child failed')
+    return json.loads(completed.stdout.strip().splitlines()[-1])['seconds']
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--backends', nargs='+', default=['pdfplumber', 'camelot'],
+                            help='Parser backends (llamaparse needs an API key and network access)')
+    arg_parser.add_argument('--repeat', type=int, default=3, help='Fresh processes per measurement (median reported)')
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    arg_parser.add_argument('--child', nargs=2, metavar=('MODE', 'PDF'), help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    from bench.synthetic_pdf import write_table_pdf
+
+    results = {}
+    work_dir = tempfile.mkdtemp()
+    try:
+        pdf_path = os.path.join(work_dir, 'startup.pdf')
+        write_table_pdf(pdf_path, pages=1, seed=0)
+        for backend in args.backends:
+            results[backend] = {}
+            for mode in MODES:
+                if mode == 'legacy_import' and backend != args.backends[0]:
+                    # The eager imports did not depend on the backend
+                    results[backend][mode] = results[args.backends[0]][mode]
+                    continue
+                runs = [run_child(mode, backend, pdf_path, work_dir) for _ in range(args.repeat)]
+                results[backend][mode] = statistics.median(runs)
+            r = results[backend]
+            print(f"{backend:<11} import main: {r['legacy_import']:.2f}s -> {r['import']:.2f}s   "
+                  f"first response: cold worker {r['cold_worker']:.2f}s, "
+                  f"preforked worker {r['preforked_worker']:.2f}s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'repeat': args.repeat, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Time to first table of /extract-tables/stream (Server-Sent Events) against
+the full latency of the /extract-tables ZIP, and whether both endpoints and
+a replay from the result cache give the same tables.
+
+    python -m bench.bench_table_events --pages 12 --repeat 3
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+
+def read_events(response, start):
+    """
+    Parse a streamed event-stream response, noting when each event arrived
+
+    Returns:
+        list: (seconds since start, event name, payload)
+    """
+    events = []
+    buffer = ''
+    for chunk in response.response:
+        buffer += chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
+        while '\n\n' in buffer:
+            message, buffer = buffer.split('\n\n', 1)
+            fields = dict(line.split(': ', 1) for line in message.splitlines())
+            events.append((time.perf_counter() - start, fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--pages', type=int, default=12)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--backend', default='pdfplumber')
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    os.environ.update(PARSER_BACKEND=args.backend, PAGE_CACHE='0', DOC_INDEX='0', PAGE_WINDOW='0',
+                      RESULT_CACHE_DIR=os.path.join(work_dir, 'cache'))
+
+    import contextlib
+
+    from bench.synthetic_pdf import write_table_pdf
+    from result_cache import ResultCache
+    from table_events import zip_table_payloads
+
+    failures = []
+    timings = {'zip_seconds': [], 'stream_first_table_seconds': [], 'stream_seconds': []}
+    try:
+        pdf_path = os.path.join(work_dir, 'paper.pdf')
+        write_table_pdf(pdf_path, pages=args.pages, rows=20, cols=8, prose_every=3)
+        with open(pdf_path, 'rb') as f:
+            data = f.read()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            import main as service
+
+            client = service.app.test_client()
+
+            def post(url, buffered=True):
+                return client.post(url, data={'file': (io.BytesIO(data), 'paper.pdf')}, buffered=buffered)
+
+            for i in range(args.repeat):
+                # A fresh result cache, so both endpoints run the whole pipeline
+                service.result_cache = ResultCache(os.path.join(work_dir, f"cache-{i}"), 512 * 1024 * 1024)
+                start = time.perf_counter()
+                response = post('/extract-tables')
+                zip_bytes = response.get_data()
+                timings['zip_seconds'].append(time.perf_counter() - start)
+                response.close()
+
+                service.result_cache = ResultCache(os.path.join(work_dir, f"stream-cache-{i}"), 512 * 1024 * 1024)
+                start = time.perf_counter()
+                response = post('/extract-tables/stream', buffered=False)
+                events = read_events(response, start)
+                response.close()
+                tables = [(seconds, payload) for seconds, name, payload in events if name == 'table']
+                if not tables or events[-1][1] != 'summary':
+                    failures.append(f"run {i}: stream ended with {events[-1][1] if events else 'no events'}")
+                    continue
+                timings['stream_first_table_seconds'].append(tables[0][0])
+                timings['stream_seconds'].append(events[-1][0])
+
+            zip_path = os.path.join(work_dir, 'result.zip')
+            with open(zip_path, 'wb') as f:
+                f.write(zip_bytes)
+            expected = list(zip_table_payloads(zip_path))
+            if [payload for _, payload in tables] != expected:
+                failures.append('streamed tables differ from the ZIP')
+
+            # The streamed result was cached: a replay and the ZIP endpoint are hits
+            response = post('/extract-tables/stream', buffered=False)
+            replayed = [payload for _, name, payload in read_events(response, time.perf_counter()) if name == 'table']
+            if response.headers.get('X-Cache') != 'HIT' or replayed != expected:
+                failures.append('replay from the result cache differs')
+            response.close()
+            response = post('/extract-tables')
+            with open(zip_path, 'wb') as f:
+                f.write(response.get_data())
+            if response.headers.get('X-Cache') != 'HIT' or list(zip_table_payloads(zip_path)) != expected:
+                failures.append('ZIP served from the streamed result differs')
+            response.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = {name: statistics.median(values) for name, values in timings.items() if values}
+    print(f"{args.pages} pages, {len(expected)} tables, backend={args.backend}, median of {args.repeat}:")
+    print(f"  /extract-tables         full ZIP    {summary['zip_seconds']:.2f}s")
+    print(f"  /extract-tables/stream  first table {summary['stream_first_table_seconds']:.2f}s  "
+          f"last event {summary['stream_seconds']:.2f}s")
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'ok': not failures, 'failures': failures, 'pages': args.pages, 'tables': len(expected),
+                       'backend': args.backend, 'timings': timings, 'median': summary}, f, indent=2)
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
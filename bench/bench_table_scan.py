@@ -0,0 +1,111 @@
+"""
+Check scan_tables in extract_complex_pdf.py against the per-table reference
+scan and show how both scale with the number of tables in one document.
+
+    python -m bench.bench_table_scan --tables 50 100 250 500
+"""
+import argparse
+import json
+import random
+import time
+
+import extract_complex_pdf
+from bench import legacy_tables
+from bench.synthetic_markdown import markdown_table, synthetic_markdown
+
+TRICKY_LINES = [
+    'Abbreviations:', 'abbreviation', 'a abbreviations: x', 'Note:', 'The', 'The\nThe end.',
+    'a b c', '1. Results of the assay', 'Scores', '', '  ', 'Table', 'and The rest',
+]
+
+
+def tricky_markdown(seed, tables=6):
+    """
+    Markdown with tables separated by random note, abbreviation and title
+    fragments, including ones that run into the following table
+    """
+    rng = random.Random(seed)
+    blocks = [rng.choice(['', '\n', 'Intro'])]
+    for t in range(tables):
+        blocks += rng.sample(TRICKY_LINES, rng.randint(0, 4))
+        table = markdown_table(rng, t + 1, rows=rng.randint(1, 4), cols=rng.randint(2, 5))
+        lines = table.split('\n')
+        # Drop the caption and/or the trailing notes at random
+        if rng.random() < 0.3:
+            lines = lines[2:]
+        if rng.random() < 0.5:
+            lines = lines[:-rng.randint(1, 3)]
+        blocks.append('\n'.join(lines))
+    return '\n'.join(blocks) + rng.choice(['', '\n'])
+
+
+def summarise(scanned):
+    return [(m.span(), metadata) for m, metadata in scanned]
+
+
+def check_equivalence(texts):
+    failures = []
+    for name, text in texts:
+        expected = summarise(legacy_tables.scan_tables(text))
+        if summarise(extract_complex_pdf.scan_tables(text)) != expected:
+            failures.append(f"{name}: scan_tables")
+        per_table = [(m.span(), extract_complex_pdf.extract_table_metadata(text, m.start()))
+                     for m in extract_complex_pdf.TABLE_PATTERN.finditer(text)]
+        if per_table != expected:
+            failures.append(f"{name}: extract_table_metadata")
+    return failures
+
+
+def time_call(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--tables', type=int, nargs='+', default=[50, 100, 250, 500])
+    arg_parser.add_argument('--rows', type=int, default=20)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    texts = [(f"tricky seed={seed}", tricky_markdown(seed)) for seed in range(300)]
+    texts += [(f"synthetic seed={seed}", synthetic_markdown(tables=5, rows=5, seed=seed)) for seed in range(20)]
+    failures = check_equivalence(texts)
+    for failure in failures:
+        print(f"MISMATCH {failure}")
+    print(f"Equivalence: {'OK' if not failures else f'{len(failures)} mismatches'} ({len(texts)} documents)")
+
+    results = []
+    for tables in args.tables:
+        text = '\n' + synthetic_markdown(tables=tables, rows=args.rows, seed=tables)
+        legacy_seconds = time_call(lambda: legacy_tables.scan_tables(text), args.repeat)
+        scan_seconds = time_call(lambda: extract_complex_pdf.scan_tables(text), args.repeat)
+        results.append({
+            'tables': tables,
+            'characters': len(text),
+            'legacy_seconds': legacy_seconds,
+            'scan_seconds': scan_seconds,
+            'legacy_us_per_table': legacy_seconds / tables * 1e6,
+            'scan_us_per_table': scan_seconds / tables * 1e6,
+            'speedup': legacy_seconds / scan_seconds,
+        })
+        print(f"{tables:>5} tables ({len(text) / 1e6:.1f}M chars): legacy={legacy_seconds:.3f}s "
+              f"({legacy_seconds / tables * 1e6:.0f}us/table) scan={scan_seconds:.4f}s "
+              f"({scan_seconds / tables * 1e6:.0f}us/table) speedup={legacy_seconds / scan_seconds:.1f}x")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'equivalent': not failures, 'mismatches': failures, 'results': results}, f, indent=2)
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
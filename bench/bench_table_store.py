@@ -0,0 +1,147 @@
+"""
+Compare loading and filtering a corpus of extracted tables stored as
+per-table CSV + metadata JSON files with the consolidated Parquet store.
+One paper is extracted into the store twice more, as on result cache misses,
+and must not be counted more than once.
+
+    python -m bench.bench_table_store --papers 200 --pages 4
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow.compute as pc
+
+from bench.synthetic_markdown import synthetic_documents
+from extract_complex_pdf import DirectorySink, extract_and_save_tables
+from table_store import TableStore
+
+
+class NullSink:
+    def write(self, filename, content):
+        pass
+
+
+def build_corpus(work_dir, papers, pages, tables, rows, cols, repeated=None):
+    """
+    Extract the same synthetic papers into a CSV directory tree and a store,
+    extracting paper number repeated into the store three times
+
+    Returns:
+        tuple: (CSV root, TableStore)
+    """
+    csv_root = os.path.join(work_dir, 'csv')
+    store = TableStore(os.path.join(work_dir, 'store'))
+    for paper in range(papers):
+        documents = synthetic_documents(count=pages, tables=tables, rows=rows, cols=cols, seed=paper * 1000)
+        doi = f"10.1000/paper.{paper}"
+        extract_and_save_tables(documents, doi=doi, sink=DirectorySink(os.path.join(csv_root, str(paper))))
+        for _ in range(3 if paper == repeated else 1):
+            extract_and_save_tables(documents, doi=doi, sink=NullSink(), output_format='parquet', store=store,
+                                    file_hash=f"paper-{paper}")
+    return csv_root, store
+
+
+def load_csv_corpus(csv_root, doi=None, amino_acid=None):
+    """
+    What a consumer of the CSV output has to do: open every metadata file and
+    every table to find the matching rows
+    """
+    frames = []
+    for root, _, files in os.walk(csv_root):
+        for file in files:
+            if not file.endswith('_metadata.json'):
+                continue
+            with open(os.path.join(root, file), 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            if doi is not None and metadata['doi'] != doi:
+                continue
+            frame = pd.read_csv(os.path.join(root, file.replace('_metadata.json', '.csv')), dtype=str)
+            if amino_acid is not None:
+                frame = frame[frame['Sample'].str.strip().str.lower() == amino_acid.lower()]
+            frames.append(frame)
+    return frames
+
+
+def time_call(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--papers', type=int, default=200)
+    arg_parser.add_argument('--pages', type=int, default=4)
+    arg_parser.add_argument('--tables', type=int, default=2, help='Tables per page')
+    arg_parser.add_argument('--rows', type=int, default=20)
+    arg_parser.add_argument('--cols', type=int, default=8)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            csv_root, store = build_corpus(work_dir, args.papers, args.pages, args.tables, args.rows, args.cols,
+                                           repeated=args.papers // 2)
+
+        doi = f"10.1000/paper.{args.papers // 2}"
+        cases = [
+            ('load all', {}),
+            ('filter by DOI', {'doi': doi}),
+            ('filter by amino acid', {'amino_acid': 'Leu'}),
+        ]
+
+        failures = []
+        results = []
+        for name, query in cases:
+            csv_seconds, frames = time_call(lambda: load_csv_corpus(csv_root, **query), args.repeat)
+            store_seconds, table = time_call(lambda: store.query(**query), args.repeat)
+
+            csv_tables = sum(1 for frame in frames if len(frame))
+            store_tables = len(pc.unique(pc.binary_join_element_wise(
+                table['doi'], table['table'], '/')).to_pylist()) if table.num_rows else 0
+            if csv_tables != store_tables:
+                failures.append(f"{name}: {csv_tables} tables from CSV, {store_tables} from the store")
+            if table.num_rows and table.num_rows != len(table.group_by(['doi', 'table', 'row', 'column']).aggregate([])):
+                failures.append(f"{name}: the store returns duplicate cells")
+
+            results.append({'case': name, 'tables': store_tables, 'store_rows': table.num_rows,
+                            'csv_seconds': csv_seconds, 'store_seconds': store_seconds,
+                            'speedup': csv_seconds / store_seconds})
+            print(f"{name:<22} {store_tables:>5} tables: csv={csv_seconds:.3f}s store={store_seconds:.4f}s "
+                  f"speedup={csv_seconds / store_seconds:.1f}x")
+
+        csv_bytes = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(csv_root) for f in files)
+        store_bytes = sum(os.path.getsize(os.path.join(store.data_dir, f)) for f in os.listdir(store.data_dir))
+        print(f"on disk: csv={csv_bytes / 1e6:.1f}MB store={store_bytes / 1e6:.1f}MB "
+              f"({len(store.catalog())} parts)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for failure in failures:
+        print(f"MISMATCH {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'consistent': not failures, 'mismatches': failures, 'results': results,
+                       'csv_bytes': csv_bytes, 'store_bytes': store_bytes}, f, indent=2)
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
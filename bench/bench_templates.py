@@ -0,0 +1,156 @@
+"""
+Layout template hit rate on Camelot tables from a few synthetic journal
+formats, the header detection time saved per table, and whether cleaning
+through templates gives the same tables as the row-scoring heuristics.
+Captions differ from table to table; a table whose column Camelot split in
+two must come out of the Camelot tier like the unsplit table, learning
+templates must change the result cache settings, and the read-only copy
+pool processes get must clean alike and learn nothing.
+
+    python -m bench.bench_templates --journals 3 --papers 4 --pages 3
+"""
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import main as service
+from bench.bench_cleaning import frames_equal
+from bench.synthetic_pdf import write_table_pdf
+from layout_templates import LayoutTemplateRegistry
+from pdf_session import PdfSession
+
+# (columns, data rows, superscript significance letters) per journal format
+JOURNALS = [(8, 20, False), (6, 14, True), (10, 18, False), (7, 12, True)]
+
+CAPTIONS = [
+    'Amino acid composition of samples (g/100 g protein)',
+    'Essential amino acids of the protein isolates (mg/g)',
+    'Free amino acid content after hydrolysis',
+]
+
+
+def clean_tables(service, tables):
+    """
+    Clean every table as the Camelot tier does before writing out the frames
+
+    Returns:
+        tuple: (seconds, cleaned frames, None for rejected tables)
+    """
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        frames = [service.accepted_camelot_frame(table) for table in tables]
+    return time.perf_counter() - start, frames
+
+
+def split_column(table, column=2):
+    """
+    Copy of a table as Camelot splits a column in two: the text stays in the
+    left piece and an empty sliver follows it
+    """
+    df = table.df.copy()
+    df.columns = range(df.shape[1])
+    x0, x1 = table.cols[column]
+    middle = (x0 + x1) / 2
+    df.insert(column + 1, 'sliver', '')
+    df.columns = range(df.shape[1])
+    split = copy.copy(table)
+    split.df = df
+    split.cols = list(table.cols[:column]) + [(x0, middle), (middle, x1)] + list(table.cols[column + 1:])
+    return split
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--journals', type=int, default=3, help=f"Journal formats (at most {len(JOURNALS)})")
+    arg_parser.add_argument('--papers', type=int, default=4, help='Papers per journal')
+    arg_parser.add_argument('--pages', type=int, default=3, help='Table pages per paper')
+    arg_parser.add_argument('--min-hit-rate', type=float, default=0.5)
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    tables = []
+    work_dir = tempfile.mkdtemp()
+    try:
+        for journal, (cols, rows, superscripts) in enumerate(JOURNALS[:args.journals]):
+            for paper in range(args.papers):
+                path = os.path.join(work_dir, f"journal{journal}-{paper}.pdf")
+                write_table_pdf(path, pages=args.pages, rows=rows, cols=cols, superscripts=superscripts,
+                                seed=journal * 100 + paper, captions=CAPTIONS[paper % len(CAPTIONS):])
+                with PdfSession(path) as session:
+                    tables.extend(session.read_tables(flavor='stream'))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    service.layout_templates = None
+    heuristic_seconds, expected = clean_tables(service, tables)
+
+    registry = LayoutTemplateRegistry()
+    service.layout_templates = registry
+    initial_settings = service.extraction_settings()
+    template_seconds, actual = clean_tables(service, tables)
+    settings_changed = service.extraction_settings() != initial_settings
+
+    mismatches = [i for i, (e, a) in enumerate(zip(expected, actual)) if not frames_equal(e, a)]
+    stats = registry.stats()
+
+    # Pool processes match against a read-only copy of the templates: the
+    # same tables and version as the registry copied, and nothing learned
+    pool_registry = LayoutTemplateRegistry.from_snapshot(registry.snapshot())
+    service.layout_templates = pool_registry
+    _, pool_frames = clean_tables(service, tables)
+    empty_registry = LayoutTemplateRegistry.from_snapshot(LayoutTemplateRegistry().snapshot())
+    service.layout_templates = empty_registry
+    clean_tables(service, tables)
+    service.layout_templates = registry
+    pool_read_only = (pool_registry.version() == registry.version() and
+                      all(frames_equal(a, p) for a, p in zip(actual, pool_frames)) and
+                      empty_registry.stats()['layouts_seen'] == 0)
+
+    # A split column is merged back per the learned column boundaries, in the
+    # markdown the Camelot tier writes out
+    split = split_column(tables[-1])
+    _, (split_frame,) = clean_tables(service, [split])
+    split_merged = (split_frame is not None and expected[-1] is not None and
+                    service.camelot_table_markdown(split, split_frame) ==
+                    service.camelot_table_markdown(tables[-1], expected[-1]))
+    print(f"{len(tables)} tables from {args.journals} journal formats: {stats['templates']} templates learned, "
+          f"hit rate {stats['hit_rate']:.0%} ({stats['hits']} hits, {stats['misses']} misses)")
+    print(f"  header detection: heuristics {stats['mean_miss_ms']:.2f}ms/table, "
+          f"template {stats['mean_hit_ms'] or 0:.2f}ms/table, saved {stats['saved_ms_per_table']:.2f}ms/table")
+    print(f"  Camelot tier cleaning: heuristics only {heuristic_seconds / len(tables) * 1000:.2f}ms/table, "
+          f"with templates {template_seconds / len(tables) * 1000:.2f}ms/table  "
+          f"{'identical' if not mismatches else f'{len(mismatches)} MISMATCHES'}")
+    print(f"  split column merged: {split_merged}, result cache settings changed: {settings_changed} "
+          f"(template version {registry.version()}), pool copy read-only: {pool_read_only}")
+
+    failures = [f"table {i}: cleaned table differs from the heuristics" for i in mismatches]
+    if not split_merged:
+        failures.append('table with a split column comes out of the Camelot tier differently from the unsplit table')
+    if not pool_read_only:
+        failures.append('a read-only copy of the templates cleaned differently or learned templates')
+    if not settings_changed:
+        failures.append('learned templates did not change the result cache settings')
+    if stats['hit_rate'] < args.min_hit_rate:
+        failures.append(f"hit rate {stats['hit_rate']:.0%} below {args.min_hit_rate:.0%}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'ok': not failures, 'failures': failures, 'tables': len(tables), 'templates': stats,
+                       'split_column_merged': split_merged, 'settings_changed': settings_changed,
+                       'pool_read_only': pool_read_only,
+                       'heuristic_seconds': heuristic_seconds, 'template_seconds': template_seconds}, f, indent=2)
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Tiered extraction against the previous pipeline (Camelot on the candidate
+pages, its tables discarded, then the markdown parser on the whole document):
+pages sent to the parser, time, tables found per table page and whether the
+tables have the synthetic header, data rows and caption title.
+
+    python -m bench.bench_tiers --documents 10 --pages 12 --backend pdfplumber
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+
+# Data rows and columns of the synthetic tables
+ROWS = 12
+COLS = 6
+
+
+def table_page(name):
+    # Tables are named after their page, e.g. '3.csv' or '3b.csv'
+    return int(name.split('.')[0].rstrip('abcdefghijklmnopqrstuvwxyz'))
+
+
+def table_pages(sink):
+    return {table_page(name) for name in sink.files if name.endswith('.csv')}
+
+
+def malformed_tables(sink, kinds, header, rows):
+    """
+    Table pages whose table CSV differs from the synthetic table: another header
+    (e.g. the caption or an empty header taken for it), fewer data rows or,
+    for captioned tables, no title
+    """
+    malformed = set()
+    for name, content in sink.files.items():
+        if not name.endswith('.csv'):
+            continue
+        page = table_page(name)
+        if not kinds[page - 1].endswith('table'):
+            continue
+        table = list(csv.reader(io.StringIO(content)))
+        data = [row for row in table[1:] if row and row[0] not in ('', header[0])]
+        captioned = kinds[page - 1] == 'table'
+        if (not table or table[0] != ['Sample'] + header[1:] + ['Title', 'DOI'] or len(data) < rows
+                or (captioned and not (len(table[1]) > len(header) and table[1][len(header)].startswith('Table')))):
+            malformed.add(page)
+    return malformed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--documents', type=int, default=10)
+    arg_parser.add_argument('--pages', type=int, default=12)
+    arg_parser.add_argument('--backend', default='pdfplumber', help='Markdown parser backend of the second tier')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    os.environ.update(PARSER_BACKEND=args.backend, PAGE_CACHE='0', DOC_INDEX='0')
+
+    import main as app_main
+    from bench.bench_page_filter import PAGE_KINDS, PAGE_WEIGHTS
+    from bench.sinks import MemorySink
+    from bench.synthetic_pdf import table_lines, write_mixed_pdf
+    from extract_complex_pdf import save_tables_iter
+    from parser_backends import parse_documents
+    from pdf_session import PdfSession
+
+    def previous(pdf_path):
+        with PdfSession(pdf_path) as session:
+            # Camelot ran and its tables were thrown away
+            for table in session.read_candidate_tables(flavor='stream'):
+                app_main.is_potential_table(table.df)
+            documents = parse_documents(pdf_path, session)
+            return documents, {'camelot': 0, 'parser': session.page_count, 'skipped': 0}
+
+    def tiered(pdf_path):
+        with PdfSession(pdf_path) as session:
+            return app_main.tiered_documents(session)
+
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp()
+    results = {}
+    failures = []
+    try:
+        papers = []
+        for i in range(args.documents):
+            path = os.path.join(work_dir, f"paper_{i:03d}.pdf")
+            kinds = rng.choices(PAGE_KINDS, weights=PAGE_WEIGHTS, k=args.pages)
+            papers.append((path, kinds, set(write_mixed_pdf(path, kinds, rows=ROWS, seed=args.seed + i))))
+        header = table_lines(rng, 1, 0, COLS)[1][0]
+
+        for name, extract in (('previous', previous), ('tiered', tiered)):
+            totals = {'camelot': 0, 'parser': 0, 'retry': 0, 'timed_out': 0, 'skipped': 0}
+            found = missed = malformed = camelot_malformed = 0
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for path, kinds, labelled in papers:
+                    documents, tiers = extract(path)
+                    camelot_pages = {int(document.metadata['page_label']) for document in documents
+                                     if document.metadata.get('tier') == 'camelot'}
+                    sink = MemorySink()
+                    for _ in save_tables_iter(documents, '10.1/bench', sink):
+                        pass
+                    pages = table_pages(sink)
+                    found += len(labelled & pages)
+                    missed += len(labelled - pages)
+                    bad = malformed_tables(sink, kinds, header, ROWS)
+                    malformed += len(bad)
+                    camelot_malformed += len(bad & camelot_pages)
+                    for tier, count in tiers.items():
+                        totals[tier] += count
+            results[name] = {'seconds': time.perf_counter() - start, 'page_tiers': totals,
+                             'table_pages_found': found, 'table_pages_missed': missed,
+                             'tables_malformed': malformed, 'camelot_tables_malformed': camelot_malformed}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for name, result in results.items():
+        tiers = result['page_tiers']
+        print(f"{name:<9} {result['seconds']:6.2f}s  pages: camelot={tiers['camelot']} parser={tiers['parser']} "
+              f"skipped={tiers['skipped']}  table pages found={result['table_pages_found']} "
+              f"missed={result['table_pages_missed']} malformed={result['tables_malformed']}")
+    if results['tiered']['table_pages_found'] < results['previous']['table_pages_found']:
+        failures.append('tiered extraction found tables on fewer pages')
+    if results['tiered']['camelot_tables_malformed']:
+        failures.append(f"{results['tiered']['camelot_tables_malformed']} tables from the Camelot tier differ "
+                        f"from the synthetic tables")
+    print(f"speedup={results['previous']['seconds'] / results['tiered']['seconds']:.1f}x")
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'ok': not failures, 'failures': failures, 'backend': args.backend, 'results': results},
+                      f, indent=2)
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
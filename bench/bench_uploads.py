@@ -0,0 +1,159 @@
+"""
+Concurrent uploads of different PDFs under the same filename: every response
+must hold the tables of its own PDF and no upload workspace may be left behind.
+Also times the upload handling of a cache hit against saving and re-hashing.
+
+    python -m bench.bench_uploads --uploads 8 --threads 4 --size-mb 20
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+
+def zip_digest(data):
+    digest = hashlib.sha256()
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        for name in sorted(archive.namelist()):
+            digest.update(name.encode('utf-8'))
+            digest.update(archive.read(name))
+    return digest.hexdigest()
+
+
+def upload_app(mode):
+    """
+    Flask app with a single upload route computing the cache key's file hash
+    the way mode does
+    """
+    from flask import Flask, request
+
+    from result_cache import hash_file
+    from uploads import UploadRequest, upload_hash
+
+    app = Flask(__name__)
+    captured = {}
+    if mode == 'streaming_hash':
+        app.request_class = UploadRequest
+
+    @app.route('/upload', methods=['POST'])
+    def upload():
+        file = request.files['file']
+        captured['received_at'] = time.perf_counter()
+        if mode == 'save_and_hash':
+            path = os.path.join(tempfile.gettempdir(), file.filename)
+            file.save(path)
+            key = hash_file(path)
+            os.remove(path)
+        else:
+            key = upload_hash(file)
+        captured['handled_at'] = time.perf_counter()
+        return key
+
+    return app, captured
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--uploads', type=int, default=8, help='Different PDFs uploaded as paper.pdf')
+    arg_parser.add_argument('--threads', type=int, default=4)
+    arg_parser.add_argument('--size-mb', type=float, default=20, help='Size of the payload of the upload timing')
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    upload_dir = os.path.join(work_dir, 'uploads')
+    os.makedirs(upload_dir)
+    os.environ.update(PARSER_BACKEND='pdfplumber', PAGE_CACHE='0', DOC_INDEX='0', UPLOAD_DIR=upload_dir,
+                      RESULT_CACHE_DIR=os.path.join(work_dir, 'cache'))
+
+    import contextlib
+
+    from bench.synthetic_pdf import write_table_pdf
+    from zip_stream import ZipSink
+
+    failures = []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import main as app_main
+
+            # Expected result of every PDF, extracted on its own
+            pdfs = []
+            for i in range(args.uploads):
+                path = os.path.join(work_dir, f"paper-{i}.pdf")
+                write_table_pdf(path, pages=2, seed=100 + i)
+                buffer = io.BytesIO()
+                with ZipSink(buffer) as sink:
+                    app_main.run_extraction(path, sink)
+                with open(path, 'rb') as f:
+                    pdfs.append((f.read(), zip_digest(buffer.getvalue())))
+
+            def upload(item):
+                data, expected = item
+                response = app_main.app.test_client().post(
+                    '/extract-tables', data={'file': (io.BytesIO(data), 'paper.pdf')})
+                # Closing the response (as a WSGI server does) removes the workspace
+                ok = zip_digest(response.get_data()) == expected
+                response.close()
+                return response.status_code, ok
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.threads) as executor:
+                outcomes = list(executor.map(upload, pdfs))
+            concurrent_seconds = time.perf_counter() - start
+
+        mixed_up = sum(1 for status, ok in outcomes if status != 200 or not ok)
+        if mixed_up:
+            failures.append(f"{mixed_up} of {len(outcomes)} concurrent uploads returned another PDF's tables")
+        leftovers = os.listdir(upload_dir)
+        if leftovers:
+            failures.append(f"{len(leftovers)} upload workspace(s) left behind")
+
+        # Upload handling of a repeat upload: the previous code path (Werkzeug's
+        # default upload stream, save to the temp dir, hash the saved file)
+        # against the hash computed while the request body is received
+        payload = os.urandom(int(args.size_mb * 1024 * 1024))
+        timings = {}
+        for mode in ('save_and_hash', 'streaming_hash'):
+            app, captured = upload_app(mode)
+            client = app.test_client()
+            handling, total = [], []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                response = client.post('/upload', data={'file': (io.BytesIO(payload), 'big.pdf')})
+                total.append(time.perf_counter() - start)
+                handling.append(captured['handled_at'] - captured['received_at'])
+                if response.get_data(as_text=True) != hashlib.sha256(payload).hexdigest():
+                    failures.append(f"{mode}: wrong upload hash")
+            timings[mode] = {'handling_seconds': statistics.median(handling),
+                             'request_seconds': statistics.median(total)}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"{args.uploads} concurrent uploads of paper.pdf on {args.threads} threads: "
+          f"{len(outcomes) - mixed_up} with their own tables, {concurrent_seconds:.2f}s")
+    for mode, timing in timings.items():
+        print(f"  {args.size_mb:.0f}MB repeat upload, {mode:<15} handling={timing['handling_seconds'] * 1000:7.1f}ms "
+              f"request={timing['request_seconds'] * 1000:7.1f}ms")
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'ok': not failures, 'failures': failures, 'uploads': args.uploads, 'threads': args.threads,
+                       'concurrent_seconds': concurrent_seconds, 'size_mb': args.size_mb, 'timings': timings},
+                      f, indent=2)
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
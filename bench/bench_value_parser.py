@@ -0,0 +1,114 @@
+"""
+Check the vectorised mean±SD value parser against a per-cell regex parse and
+compare the speed of both, and of the old and new numeric-content check.
+
+    python -m bench.bench_value_parser --rows 10000
+"""
+import argparse
+import json
+import math
+import random
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench.bench_cleaning import SPECIAL_CELLS, synthetic_table
+from value_parser import VALUE_PATTERN, numeric_mask, parse_values
+
+VALUE_RE = re.compile(VALUE_PATTERN)
+
+EXTRA_CELLS = ['2.45±0.05b', '7.53 ± 0.08 e', '1.2+/-0.3', '4.1 +- 0.2 ab', '−0.3a', '-1', '+2.5', '.5',
+               '12.', '1.2.3', '3±', '±0.2', 'nd', 'tr', '45 mg', '1e5', ' 8.80 ', '0.2ABCDE']
+
+
+def parse_cell(value):
+    """
+    Reference: parse one cell with the regex, as downstream consumers did
+    """
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    match = VALUE_RE.match(str(value).strip())
+    if not match:
+        return None
+    sd = match.group('sd')
+    return (float(np.float32(float(match.group('mean').replace('−', '-')))),
+            float(np.float32(float(sd))) if sd else None,
+            match.group('letters'))
+
+
+def vectorised_cells(df):
+    values = parse_values(df)
+    cells = []
+    for mean, sd, letters, parsed in zip(values['mean'].ravel(), values['sd'].ravel(),
+                                         values['letters'].ravel(), values['parsed'].ravel()):
+        cells.append((float(mean), None if np.isnan(sd) else float(sd), letters) if parsed else None)
+    return cells
+
+
+def legacy_numeric_ratio(df):
+    return df.apply(lambda x: pd.to_numeric(x, errors='coerce')).notna().mean().mean()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--rows', type=int, default=10000)
+    arg_parser.add_argument('--cols', type=int, default=14)
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    rng = random.Random(0)
+    cases = [synthetic_table(rows=80, cols=6, seed=seed, noise=0.2) for seed in range(10)]
+    cases.append(pd.DataFrame(np.array([rng.choice(EXTRA_CELLS + SPECIAL_CELLS) for _ in range(600)],
+                                       dtype=object).reshape(100, 6)))
+    mismatches = 0
+    for df in cases:
+        expected = [parse_cell(v) for v in df.to_numpy(dtype=object).ravel()]
+        mismatches += sum(1 for a, b in zip(expected, vectorised_cells(df)) if a != b)
+    print(f"Equivalence: {'OK' if not mismatches else f'{mismatches} mismatching cells'}")
+
+    df = synthetic_table(rows=args.rows, cols=args.cols)
+    cells = df.to_numpy(dtype=object).ravel()
+
+    start = time.perf_counter()
+    [parse_cell(v) for v in cells]
+    per_cell_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parse_values(df)
+    vectorised_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy_ratio = legacy_numeric_ratio(df)
+    legacy_numeric_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ratio = numeric_mask(df).mean(axis=0).mean()
+    numeric_seconds = time.perf_counter() - start
+
+    results = {
+        'equivalent': not mismatches,
+        'cells': len(cells),
+        'per_cell_seconds': per_cell_seconds,
+        'vectorised_seconds': vectorised_seconds,
+        'legacy_numeric_seconds': legacy_numeric_seconds,
+        'legacy_numeric_ratio': float(legacy_ratio),
+        'numeric_seconds': numeric_seconds,
+        'numeric_ratio': float(ratio),
+    }
+    print(f"parse {len(cells)} cells: per-cell regex={per_cell_seconds:.3f}s vectorised={vectorised_seconds:.3f}s "
+          f"({per_cell_seconds / vectorised_seconds:.1f}x)")
+    print(f"numeric content: to_numeric per column={legacy_numeric_seconds:.3f}s (ratio {legacy_ratio:.2f}, "
+          f"mean±SD cells not counted) numeric_mask={numeric_seconds:.3f}s (ratio {ratio:.2f})")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
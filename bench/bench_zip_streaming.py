@@ -0,0 +1,114 @@
+"""
+Compare peak memory of the old buffered output stage (temp directory plus an
+in-memory BytesIO archive) with the streaming ZipSink output stage.
+
+    python -m bench.bench_zip_streaming --documents 200 --tables 10 --rows 60
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+from bench.synthetic_markdown import synthetic_documents
+from extract_complex_pdf import extract_and_save_tables, save_tables_iter
+from zip_stream import ZipSink, iter_zip
+
+
+def buffered_output(documents):
+    """
+    Output stage as it was: write files to a temp dir, then zip them into BytesIO
+    """
+    output_dir = tempfile.mkdtemp()
+    try:
+        extract_and_save_tables(documents, output_dir=output_dir, doi='10.1000/bench')
+        temp_zip_stream = io.BytesIO()
+        with zipfile.ZipFile(temp_zip_stream, 'w') as temp_zip:
+            for root, _, files in os.walk(output_dir):
+                for file in files:
+                    file_path = os.path.join(root, file)
+                    temp_zip.write(file_path, os.path.relpath(file_path, output_dir))
+        return len(temp_zip_stream.getvalue())
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def streaming_output(documents):
+    """
+    Output stage now: tables go straight into a chunked ZIP; chunks are discarded
+    here as a socket would consume them
+    """
+    sink = ZipSink()
+    size = 0
+    for chunk in iter_zip(sink, save_tables_iter(documents, '10.1000/bench', sink)):
+        size += len(chunk)
+    return size
+
+
+def measure(mode, args):
+    documents = synthetic_documents(count=args.documents, tables=args.tables, rows=args.rows, cols=args.cols)
+    baseline_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Silence the per-table progress prints of the pipeline
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        tracemalloc.start()
+        start = time.perf_counter()
+        archive_bytes = (buffered_output if mode == 'buffered' else streaming_output)(documents)
+        elapsed = time.perf_counter() - start
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    return {
+        'mode': mode,
+        'archive_bytes': archive_bytes,
+        'seconds': elapsed,
+        'traced_peak_bytes': traced_peak,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'rss_growth_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss_kb,
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--documents', type=int, default=200)
+    arg_parser.add_argument('--tables', type=int, default=10)
+    arg_parser.add_argument('--rows', type=int, default=60)
+    arg_parser.add_argument('--cols', type=int, default=14)
+    arg_parser.add_argument('--mode', choices=['buffered', 'streaming'], help=argparse.SUPPRESS)
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args)))
+        return
+
+    # Each mode runs in a fresh process so peak RSS is not shared between them
+    results = []
+    for mode in ('buffered', 'streaming'):
+        command = [sys.executable, '-m', 'bench.bench_zip_streaming', '--mode', mode,
+                   '--documents', str(args.documents), '--tables', str(args.tables),
+                   '--rows', str(args.rows), '--cols', str(args.cols)]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results.append(result)
+        print(f"{mode:<10} archive={result['archive_bytes'] / 1e6:.1f}MB time={result['seconds']:.2f}s "
+              f"traced_peak={result['traced_peak_bytes'] / 1e6:.1f}MB rss_growth={result['rss_growth_kb'] / 1024:.1f}MB")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Run every benchmark that checks correctness (equivalence with the original
+implementations, table page recall, identical output across modes, flat
+memory) at small sizes, and exit non-zero if any of them fails.
+
+    python -m bench.check
+    python -m bench.check --only bench_cleaning bench_memory
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (benchmark module, arguments) of the checks, cheapest first
+CHECKS = [
+    ('bench_value_parser', ['--rows', '2000']),
+    ('bench_cleaning', ['--rows', '2000', '--repeat', '1']),
+    ('bench_table_scan', ['--tables', '50', '100', '--repeat', '1']),
+    ('bench_table_store', ['--papers', '40', '--repeat', '1']),
+    ('bench_doc_index', ['--documents', '10']),
+    ('bench_async_submit', ['--documents', '8', '--latency', '0.3', '--in-flight', '1', '4']),
+    ('bench_uploads', ['--uploads', '4', '--size-mb', '2', '--repeat', '3']),
+    ('bench_page_filter', ['--documents', '6', '--pages', '8']),
+    ('bench_page_cache', ['--pages', '8']),
+    ('bench_templates', []),
+    ('bench_tiers', ['--documents', '5', '--pages', '8']),
+    ('bench_table_events', ['--pages', '6', '--repeat', '1']),
+    ('bench_deadlines', ['--documents', '6', '--slow', '1']),
+    ('bench_memory', ['--pages', '8', '24', '--window', '4']),
+]
+
+
+def run_check(module, args):
+    """
+    Run one benchmark in a fresh process
+
+    Returns:
+        tuple: (passed, seconds, output)
+    """
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-m', f"bench.{module}"] + args, cwd=ROOT, capture_output=True,
+                             text=True)
+    return process.returncode == 0, time.perf_counter() - start, process.stdout + process.stderr
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--only', nargs='+', metavar='MODULE', help='Run only these benchmarks')
+    arg_parser.add_argument('--json', help='Write results to this JSON file')
+    args = arg_parser.parse_args()
+
+    checks = [(module, check_args) for module, check_args in CHECKS if not args.only or module in args.only]
+    unknown = set(args.only or ()) - {module for module, _ in CHECKS}
+    if unknown:
+        arg_parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    failures = []
+    results = []
+    for module, check_args in checks:
+        passed, seconds, output = run_check(module, check_args)
+        results.append({'module': module, 'args': check_args, 'passed': passed, 'seconds': seconds})
+        print(f"{'PASS' if passed else 'FAIL'} {module:<20} {seconds:7.1f}s", flush=True)
+        if not passed:
+            failures.append(module)
+            print('\n'.join(f"    {line}" for line in output.strip().splitlines()[-15:]))
+
+    print(f"{len(checks) - len(failures)}/{len(checks)} checks passed")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'ok': not failures, 'failures': failures, 'checks': results}, f, indent=2)
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""
+Row-wise cleaning helpers as they were before the vectorised rewrite in main.py.
+Kept only as the reference implementation for bench.bench_cleaning.
+"""
+import re
+
+import pandas as pd
+
+from main import make_unique_headers
+
+
+def validate_and_clean_table_data(df, doi=None, title=None):
+    """
+    Enhanced validation and cleaning for complex table data with Sample column
+    and additional DOI and Title columns
+    """
+    if df is None or df.empty:
+        return None
+
+    # Make a copy to avoid modifying the original
+    df = df.copy()
+
+    # Clean all cell values
+    for col in df.columns:
+        df[col] = df[col].apply(clean_special_characters)
+
+    # Remove completely empty rows and columns
+    df = df.dropna(how='all', axis=0)
+    df = df.dropna(how='all', axis=1)
+
+    if df.shape[0] < 3 or df.shape[1] < 2:
+        return None
+
+    # Identify and set headers
+    headers, header_idx = identify_column_headers(df)
+
+    # Ensure first column is named "Sample"
+    headers[0] = "Sample"
+
+    if header_idx >= 0:
+        data_df = df.iloc[header_idx + 1:].copy()
+    else:
+        data_df = df.copy()
+
+    # Reset index and set column names
+    data_df.reset_index(drop=True, inplace=True)
+    data_df.columns = headers
+
+    # Process categories
+    try:
+        data_df = process_categories(data_df)
+    except Exception as e:
+        print(f"Warning: Error in category processing - {str(e)}")
+        pass
+
+    if data_df.empty or data_df.shape[1] < 2:
+        return None
+
+    # Add DOI and Title columns
+    data_df['DOI'] = doi if doi else ''
+    data_df['Title'] = title if title else ''
+
+    return data_df
+
+
+def is_category_row(row):
+    """
+    Check if a row represents a category (first cell has value, rest are empty)
+    """
+    if pd.isna(row.iloc[0]) or str(row.iloc[0]).strip() == '':
+        return False
+
+    # Check if all other cells are empty
+    return row.iloc[1:].isna().all() or (row.iloc[1:].astype(str).str.strip() == '').all()
+
+
+def clean_special_characters(text):
+    """
+    Clean and standardize special characters in text
+    """
+    if pd.isna(text):
+        return ''
+
+    text = str(text).strip()
+    # Replace various forms of plus-minus symbol
+    text = re.sub(r'[±\+\-]+', '±', text)
+    # Remove multiple spaces
+    text = re.sub(r'\s+', ' ', text)
+    return text
+
+
+def identify_column_headers(df):
+    """
+    Enhanced function to identify column headers from complex tables
+    """
+    header_candidates = []
+    header_idx = -1
+
+    # First pass: look for multiple header rows that might need to be combined
+    for idx, row in df.iterrows():
+        if row.isna().all():
+            continue
+
+        values = row.astype(str).apply(clean_special_characters)
+
+        # Skip rows that are mostly numbers or symbols
+        if values.str.match(r'^[\d\s±\-\+\.]+$').mean() > 0.7:
+            continue
+
+        non_empty_ratio = values.str.len().gt(0).mean()
+        non_numeric_ratio = (~values.str.match(r'^\d*\.?\d+$')).mean()
+        avg_length = values.str.len().mean()
+
+        if (non_empty_ratio > 0.3 and
+                non_numeric_ratio > 0.5 and
+                avg_length < 50):
+            header_candidates.append((idx, values))
+
+    if header_candidates:
+        # If we have multiple header rows, try to combine them
+        if len(header_candidates) > 1:
+            # Combine consecutive header rows
+            combined_headers = []
+            prev_idx = None
+            for idx, values in header_candidates:
+                if prev_idx is not None and idx - prev_idx > 1:
+                    break
+                if not combined_headers:
+                    combined_headers = values.tolist()
+                else:
+                    for i, val in enumerate(values):
+                        if val.strip() and combined_headers[i].strip():
+                            combined_headers[i] = f"{combined_headers[i]} {val}".strip()
+                        elif val.strip():
+                            combined_headers[i] = val.strip()
+                prev_idx = idx
+            header_idx = header_candidates[-1][0]
+            headers = combined_headers
+        else:
+            header_idx = header_candidates[0][0]
+            headers = header_candidates[0][1].tolist()
+
+        # Clean and make headers unique
+        headers = [clean_special_characters(h) for h in headers]
+        headers = make_unique_headers(headers)
+
+        return headers, header_idx
+
+    # If no clear headers found, generate default ones
+    return make_unique_headers([f'Column_{i+1}' for i in range(df.shape[1])]), -1
+
+
+def process_categories(df):
+    """
+    Enhanced category processing with better error handling
+    """
+    try:
+        processed_rows = []
+        current_category = None
+
+        for idx, row in df.iterrows():
+            row_values = row.astype(str).apply(clean_special_characters)
+
+            if is_category_row(row_values):
+                current_category = row_values.iloc[0].strip()
+                continue
+
+            if current_category and not row_values.isna().all():
+                new_row = row.copy()
+                first_val = clean_special_characters(new_row.iloc[0])
+                if first_val:
+                    new_row.iloc[0] = f"{current_category} - {first_val}"
+                processed_rows.append(new_row)
+            elif not row_values.isna().all():
+                processed_rows.append(row)
+
+        if processed_rows:
+            result_df = pd.DataFrame(processed_rows)
+            result_df.columns = df.columns
+            return result_df
+        return df
+
+    except Exception as e:
+        print(f"Warning: Error in category processing - {str(e)}")
+        return df
@@ -0,0 +1,39 @@
+"""
+Per-table markdown scanning as it was before scan_tables, kept as the
+reference for bench.bench_table_scan
+"""
+import re
+
+TABLE_PATTERN = re.compile(
+    r"(?<=\n)\|(?:[^|\n]+\|)+\n\|(?:[-:]+\|)+\n(?:\|(?:[^|\n]+\|)+\n)+",
+    re.MULTILINE
+)
+
+
+def extract_table_metadata(text, table_start_index):
+    metadata = {
+        'title': None,
+        'note': None,
+        'abbreviations': None
+    }
+
+    title_search_range = text[:table_start_index].split('\n')[-3:]
+    for line in reversed(title_search_range):
+        if re.match(r'^\d+\.', line) or any(word in line.lower() for word in ['table', 'of', 'scores', 'composition']):
+            metadata['title'] = line.strip()
+            break
+
+    note_pattern = r'(?:Note:|^a\s|The\s)'
+    note_match = re.search(f'{note_pattern}.*', text[table_start_index:], re.MULTILINE)
+    if note_match:
+        metadata['note'] = note_match.group(0).strip()
+
+    abbr_match = re.search(r'a?\s*[Aa]bbreviations?:?\s*(.*)', text[table_start_index:], re.MULTILINE)
+    if abbr_match:
+        metadata['abbreviations'] = abbr_match.group(1).strip()
+
+    return metadata
+
+
+def scan_tables(text):
+    return [(m, extract_table_metadata(text, m.start())) for m in TABLE_PATTERN.finditer(text)]
@@ -0,0 +1,525 @@
+"""
+Concurrent load test of the service under gunicorn: replays a weighted mix of
+fixture PDFs against /extract-tables, /extract-tables/stream, /jobs and
+/extract-batch at a fixed concurrency (closed loop) or arrival rate (open
+loop), with LlamaParse replaced by recorded parser output and a simulated
+latency. Reports throughput, latency percentiles, the error rate and the RSS
+of every worker over time. Linux only (RSS is read from /proc).
+
+    python -m bench.load_test --threads 8 --concurrency 4 --duration 60 --mix small=3 medium=1 prose=1
+    python -m bench.load_test --rate 0.5 --duration 120 --endpoints extract=2 stream=1 jobs=1 --json load.json
+"""
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from bench.bench_deadlines import percentile
+from bench.synthetic_pdf import write_mixed_pdf, write_paper_pdf, write_table_pdf
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+# Synthetic fixtures by mix name
+FIXTURES = {
+    'small': lambda path: write_table_pdf(path, pages=4, rows=20, cols=8),
+    'medium': lambda path: write_table_pdf(path, pages=12, rows=30, cols=10, prose_every=3, seed=1),
+    'mixed': lambda path: write_mixed_pdf(path, ['table', 'plain_table', 'prose', 'references', 'methods', 'table'],
+                                          seed=2),
+    'prose': lambda path: write_paper_pdf(path, title='Amino acid requirements of adults', pages=4, seed=3),
+    'pathological': lambda path: write_mixed_pdf(path, ['table', 'prose', 'grid', 'methods'], seed=4),
+}
+
+
+def parse_weights(specs, known, what):
+    """
+    Weights from name=weight arguments (a bare name weighs 1)
+    """
+    weights = {}
+    for spec in specs:
+        name, _, weight = spec.partition('=')
+        if name not in known:
+            raise SystemExit(f"Unknown {what} '{name}', use one of {', '.join(sorted(known))}")
+        weights[name] = float(weight or 1)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+def prepare_fixtures(work_dir, names, fixtures_dir, record_dir, record_backend):
+    """
+    Write the synthetic PDFs of the mix, add the PDFs of fixtures_dir and
+    record each one's parser output into record_dir for the fixture backend,
+    unless a recording (e.g. real LlamaParse output) already exists
+
+    Returns:
+        dict: mix name -> PDF bytes
+    """
+    from parser_backends import FixtureBackend, get_backend
+    from result_cache import hash_file
+
+    paths = {}
+    for name in names:
+        if name in FIXTURES:
+            paths[name] = os.path.join(work_dir, f"{name}.pdf")
+            FIXTURES[name](paths[name])
+    for filename in sorted(os.listdir(fixtures_dir)) if fixtures_dir else []:
+        if filename.lower().endswith('.pdf'):
+            paths[os.path.splitext(filename)[0]] = os.path.join(fixtures_dir, filename)
+
+    fixtures = {}
+    for name, path in paths.items():
+        if not os.path.exists(os.path.join(record_dir, f"{hash_file(path)}.json")):
+            FixtureBackend.record(record_dir, path, get_backend(record_backend).parse(path))
+        with open(path, 'rb') as f:
+            fixtures[name] = f.read()
+    return fixtures
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(work_dir, args, record_dir):
+    """
+    Start gunicorn with gunicorn.conf.py, its caches and queues inside
+    work_dir and the fixture parser backend, and wait until /ready
+
+    Returns:
+        tuple: (gunicorn process, base URL)
+    """
+    port = free_port()
+    env = dict(os.environ, BIND=f"127.0.0.1:{port}", WEB_CONCURRENCY=str(args.workers),
+               GUNICORN_THREADS=str(args.threads), PARSER_BACKEND='fixture', PARSER_FIXTURE_DIR=record_dir,
+               PARSER_FIXTURE_LATENCY_MS=str(args.parser_latency_ms),
+               RESULT_CACHE_DIR=os.path.join(work_dir, 'cache'), PAGE_CACHE_DIR=os.path.join(work_dir, 'pages'),
+               DOC_INDEX_PATH=os.path.join(work_dir, 'doc-index.sqlite'), UPLOAD_DIR=os.path.join(work_dir, 'uploads'),
+               JOBS_DIR=os.path.join(work_dir, 'jobs'), BATCH_DIR=os.path.join(work_dir, 'batches'))
+    if not args.warm_caches:
+        # Every request runs the whole pipeline
+        env.update(RESULT_CACHE_MAX_MB='0', PAGE_CACHE='0')
+    for pair in args.server_env:
+        key, _, value = pair.partition('=')
+        env[key] = value
+    os.makedirs(env['UPLOAD_DIR'], exist_ok=True)
+
+    log_path = os.path.join(work_dir, 'gunicorn.log')
+    with open(log_path, 'wb') as log:
+        process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=ROOT, env=env,
+                                   stdout=log, stderr=subprocess.STDOUT)
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=2).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    stop_server(process)
+    with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+        tail = ''.join(f.readlines()[-20:])
+    raise SystemExit(f"gunicorn did not become ready within {args.startup_timeout:g}s:\n{tail}")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=40)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def process_children():
+    """
+    Child PIDs of every running process, by parent PID
+    """
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", 'r') as f:
+                # The command name may contain spaces, the fields after it do not
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/statm", 'r') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def sample_rss(master_pid):
+    """
+    RSS of the gunicorn master, of each worker and of all of them together
+    with the processes they started (e.g. Camelot page processes)
+    """
+    children = process_children()
+
+    def tree(pid):
+        pids = [pid]
+        for child in children.get(pid, []):
+            pids.extend(tree(child))
+        return pids
+
+    workers = {str(pid): rss_bytes(pid) for pid in children.get(master_pid, [])}
+    return {'master': rss_bytes(master_pid), 'workers': workers,
+            'total': sum(rss_bytes(pid) for pid in tree(master_pid))}
+
+
+def upload(name, data):
+    return {'file': (f"{name}.pdf", data, 'application/pdf')}
+
+
+def request_extract(client, base_url, name, data, args):
+    response = client.post(f"{base_url}/extract-tables", files=upload(name, data))
+    return {'status': response.status_code, 'page_tiers': response.headers.get('X-Page-Tiers')}
+
+
+def request_stream(client, base_url, name, data, args):
+    start = time.perf_counter()
+    events = []
+    result = {}
+    with client.stream('POST', f"{base_url}/extract-tables/stream", files=upload(name, data)) as response:
+        result['status'] = response.status_code
+        for line in response.iter_lines():
+            if line.startswith('event: '):
+                events.append(line[len('event: '):])
+                if events[-1] == 'table' and 'first_table_seconds' not in result:
+                    result['first_table_seconds'] = time.perf_counter() - start
+    if response.status_code == 200 and (not events or events[-1] != 'summary'):
+        result['error'] = f"stream ended with {events[-1] if events else 'no events'}"
+    return result
+
+
+def request_job(client, base_url, name, data, args):
+    """
+    Submit a job and poll its result until it is no longer queued or running.
+    The client keeps its connection alive, so polls reach the worker that
+    holds the job.
+    """
+    response = client.post(f"{base_url}/jobs", files=upload(name, data))
+    if response.status_code != 202:
+        return {'status': response.status_code}
+    result_url = f"{base_url}/jobs/{response.json()['id']}/result"
+    deadline = time.monotonic() + args.timeout
+    while time.monotonic() < deadline:
+        time.sleep(args.poll_interval)
+        response = client.get(result_url)
+        if response.status_code != 202:
+            return {'status': response.status_code}
+    return {'status': 202, 'error': 'job did not finish'}
+
+
+def request_batch(client, base_url, name, data, args):
+    # A unique member gives every archive its own batch directory
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for i in range(args.batch_size):
+            archive.writestr(f"{name}-{i}.pdf", data)
+        archive.writestr('request.txt', os.urandom(16).hex())
+    response = client.post(f"{base_url}/extract-batch",
+                           files={'file': ('batch.zip', buffer.getvalue(), 'application/zip')})
+    return {'status': response.status_code}
+
+
+ENDPOINTS = {
+    'extract': request_extract,
+    'stream': request_stream,
+    'jobs': request_job,
+    'batch': request_batch,
+}
+
+
+class LoadGenerator:
+    """
+    Issues requests drawn from the fixture and endpoint mixes and records the
+    outcome of each. Latency is measured from the time a request was due, so
+    in an open loop requests waiting for a free client thread count as slow
+    rather than disappearing from the percentiles.
+    """
+
+    def __init__(self, base_url, fixtures, mix, endpoints, args):
+        self.base_url = base_url
+        self.fixtures = fixtures
+        self.mix = mix
+        self.endpoints = endpoints
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.records = []
+        self.in_flight = 0
+        self.issued = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.start = time.perf_counter()
+
+    def _client(self):
+        if not hasattr(self._local, 'client'):
+            self._local.client = httpx.Client(timeout=self.args.timeout)
+        return self._local.client
+
+    def next_request(self):
+        """
+        (fixture, endpoint) of the next request, or None once --requests were issued
+        """
+        with self._lock:
+            if self.args.requests and self.issued >= self.args.requests:
+                return None
+            self.issued += 1
+            name = self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+            endpoint = self.rng.choices(list(self.endpoints), weights=list(self.endpoints.values()))[0]
+            return name, endpoint
+
+    def run_request(self, name, endpoint, due):
+        with self._lock:
+            self.in_flight += 1
+        record = {'fixture': name, 'endpoint': endpoint, 'due': due - self.start}
+        try:
+            record.update(ENDPOINTS[endpoint](self._client(), self.base_url, name, self.fixtures[name], self.args))
+            if 'error' not in record and record['status'] != 200:
+                record['error'] = f"HTTP {record['status']}"
+        except httpx.HTTPError as e:
+            record['error'] = type(e).__name__
+        end = time.perf_counter()
+        record.update(end=end - self.start, latency=end - due)
+        with self._lock:
+            self.in_flight -= 1
+            self.records.append(record)
+
+    def closed_loop(self, deadline):
+        def user():
+            while time.perf_counter() < deadline:
+                request = self.next_request()
+                if request is None:
+                    return
+                self.run_request(*request, time.perf_counter())
+
+        threads = [threading.Thread(target=user) for _ in range(self.args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def open_loop(self, deadline):
+        # Poisson arrivals at --rate requests per second
+        with ThreadPoolExecutor(max_workers=self.args.max_in_flight) as pool:
+            due = time.perf_counter()
+            while True:
+                due += self.rng.expovariate(self.args.rate)
+                if due >= deadline:
+                    break
+                request = self.next_request()
+                if request is None:
+                    break
+                time.sleep(max(0.0, due - time.perf_counter()))
+                pool.submit(self.run_request, *request, due)
+
+
+def latency_stats(records):
+    latencies = [record['latency'] for record in records]
+    errors = sum(1 for record in records if 'error' in record)
+    stats = {'requests': len(records), 'errors': errors, 'error_rate': errors / len(records) if records else 0.0}
+    if latencies:
+        stats.update({f"p{q}": percentile(latencies, q) for q in (50, 95, 99)})
+        stats.update(mean=sum(latencies) / len(latencies), max=max(latencies))
+    return stats
+
+
+def build_timeline(records, samples):
+    """
+    Per RSS sample: requests completed since the previous sample, their
+    errors and latency percentiles, the requests in flight and the RSS
+    """
+    timeline = []
+    previous = 0.0
+    for sample in samples:
+        done = [record for record in records if previous < record['end'] <= sample['t']]
+        entry = dict(sample, completed=len(done), errors=sum(1 for record in done if 'error' in record))
+        if done:
+            latencies = [record['latency'] for record in done]
+            entry.update(p50=percentile(latencies, 50), p95=percentile(latencies, 95))
+        timeline.append(entry)
+        previous = sample['t']
+    return timeline
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    load = arg_parser.add_mutually_exclusive_group()
+    load.add_argument('--concurrency', type=int, default=4, help='Closed loop: simultaneous clients')
+    load.add_argument('--rate', type=float, help='Open loop: mean arrivals per second (Poisson)')
+    arg_parser.add_argument('--max-in-flight', type=int, default=64, help='Open loop: client threads')
+    arg_parser.add_argument('--duration', type=float, default=60.0, help='Seconds to issue requests for')
+    arg_parser.add_argument('--requests', type=int, default=0, help='Stop after this many requests (0 = no limit)')
+    arg_parser.add_argument('--mix', nargs='+', default=['small=3', 'medium=1', 'prose=1'],
+                            help=f"Fixture weights as name=weight; synthetic fixtures: {', '.join(FIXTURES)}")
+    arg_parser.add_argument('--fixtures', help='Directory of PDFs to add to the mix by file stem (weight 1 '
+                                               'unless given in --mix)')
+    arg_parser.add_argument('--endpoints', nargs='+', default=['extract'],
+                            help=f"Endpoint weights as name=weight: {', '.join(ENDPOINTS)}")
+    arg_parser.add_argument('--batch-size', type=int, default=3, help='PDFs per /extract-batch archive')
+    arg_parser.add_argument('--poll-interval', type=float, default=0.25, help='Seconds between job result polls')
+    arg_parser.add_argument('--timeout', type=float, default=600.0, help='Seconds per request')
+    arg_parser.add_argument('--workers', type=int, default=1, help='gunicorn WEB_CONCURRENCY')
+    arg_parser.add_argument('--threads', type=int, default=4, help='gunicorn GUNICORN_THREADS')
+    arg_parser.add_argument('--parser-latency-ms', type=float, default=3000,
+                            help='Simulated LlamaParse latency per parse')
+    arg_parser.add_argument('--parser-fixture-dir',
+                            help='Recorded parser output to use (e.g. from PARSER_RECORD_DIR); missing '
+                                 'recordings are made with --record-backend')
+    arg_parser.add_argument('--record-backend', default='pdfplumber')
+    arg_parser.add_argument('--warm-caches', action='store_true',
+                            help='Keep the result and page caches on, so repeated fixtures are cache hits')
+    arg_parser.add_argument('--server-env', nargs='+', default=[], metavar='KEY=VALUE',
+                            help='Extra settings for the server, e.g. TIERED_EXTRACTION=0')
+    arg_parser.add_argument('--url', help='Load an already running server instead (RSS needs --pid)')
+    arg_parser.add_argument('--pid', type=int, help='gunicorn master PID of --url')
+    arg_parser.add_argument('--startup-timeout', type=float, default=120.0)
+    arg_parser.add_argument('--sample-interval', type=float, default=1.0, help='Seconds between RSS samples')
+    arg_parser.add_argument('--max-error-rate', type=float, default=0.01)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--json', help='Write the report to this JSON file')
+    args = arg_parser.parse_args()
+
+    endpoints = parse_weights(args.endpoints, ENDPOINTS, 'endpoint')
+    stems = {os.path.splitext(f)[0] for f in os.listdir(args.fixtures) if f.lower().endswith('.pdf')} \
+        if args.fixtures else set()
+    mix = parse_weights(args.mix, set(FIXTURES) | stems, 'fixture')
+    named = {spec.partition('=')[0] for spec in args.mix}
+    mix.update({stem: 1.0 for stem in sorted(stems - named)})
+
+    work_dir = tempfile.mkdtemp()
+    process = None
+    try:
+        record_dir = args.parser_fixture_dir or os.path.join(work_dir, 'fixtures')
+        fixtures = prepare_fixtures(work_dir, mix, args.fixtures, record_dir, args.record_backend)
+        if args.url:
+            base_url, master_pid = args.url.rstrip('/'), args.pid
+        else:
+            process, base_url = start_server(work_dir, args, record_dir)
+            master_pid = process.pid
+
+        generator = LoadGenerator(base_url, fixtures, mix, endpoints, args)
+        samples = []
+        stop = threading.Event()
+
+        def sampler():
+            while True:
+                sample = {'t': time.perf_counter() - generator.start, 'in_flight': generator.in_flight}
+                if master_pid:
+                    sample['rss'] = sample_rss(master_pid)
+                samples.append(sample)
+                if stop.wait(args.sample_interval):
+                    return
+
+        sampler_thread = threading.Thread(target=sampler, daemon=True)
+        sampler_thread.start()
+        deadline = generator.start + args.duration
+        if args.rate:
+            generator.open_loop(deadline)
+        else:
+            generator.closed_loop(deadline)
+        stop.set()
+        sampler_thread.join()
+        # The last sample covers requests that finished after the final tick
+        samples.append({'t': time.perf_counter() - generator.start, 'in_flight': generator.in_flight,
+                        **({'rss': sample_rss(master_pid)} if master_pid else {})})
+    finally:
+        if process is not None:
+            stop_server(process)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    records = generator.records
+    elapsed = max((record['end'] for record in records), default=0.0)
+    totals = latency_stats(records)
+    totals.update(seconds=elapsed, throughput=len(records) / elapsed if elapsed else 0.0)
+    errors = {}
+    for record in records:
+        if 'error' in record:
+            errors[record['error']] = errors.get(record['error'], 0) + 1
+    page_tiers = {}
+    for record in records:
+        for item in filter(None, (record.get('page_tiers') or '').split(', ')):
+            tier, count = item.split('=')
+            page_tiers[tier] = page_tiers.get(tier, 0) + int(count)
+    first_tables = [record['first_table_seconds'] for record in records if 'first_table_seconds' in record]
+    rss_samples = [sample['rss'] for sample in samples if 'rss' in sample]
+
+    report = {
+        'config': {'workers': args.workers, 'threads': args.threads, 'url': args.url,
+                   'load': {'rate': args.rate} if args.rate else {'concurrency': args.concurrency},
+                   'duration': args.duration, 'requests': args.requests, 'mix': mix, 'endpoints': endpoints,
+                   'parser_latency_ms': args.parser_latency_ms, 'warm_caches': args.warm_caches,
+                   'server_env': args.server_env},
+        'totals': totals,
+        'errors': errors,
+        'by_endpoint': {name: latency_stats([r for r in records if r['endpoint'] == name]) for name in endpoints},
+        'by_fixture': {name: latency_stats([r for r in records if r['fixture'] == name]) for name in mix},
+        'page_tiers': page_tiers,
+        'stream_first_table': {f"p{q}": percentile(first_tables, q) for q in (50, 95)} if first_tables else None,
+        'rss': {'peak_total': max(s['total'] for s in rss_samples),
+                'peak_worker': max((max(s['workers'].values(), default=0) for s in rss_samples), default=0)}
+        if rss_samples else None,
+        'timeline': build_timeline(records, samples),
+        'requests': records,
+    }
+
+    load_text = f"rate={args.rate:g}/s" if args.rate else f"concurrency={args.concurrency}"
+    print(f"{len(records)} requests in {elapsed:.1f}s ({totals['throughput']:.2f} req/s), {load_text}, "
+          f"{args.workers} workers x {args.threads} threads, parser latency {args.parser_latency_ms:g}ms")
+    for group in ('by_endpoint', 'by_fixture'):
+        for name, stats in report[group].items():
+            if stats['requests']:
+                print(f"  {name:<14} n={stats['requests']:<5} errors={stats['errors']:<4} p50={stats['p50']:.2f}s "
+                      f"p95={stats['p95']:.2f}s p99={stats['p99']:.2f}s max={stats['max']:.2f}s")
+    if records:
+        print(f"  {'all':<14} error rate {totals['error_rate']:.1%}  p50={totals['p50']:.2f}s "
+              f"p95={totals['p95']:.2f}s p99={totals['p99']:.2f}s")
+    if page_tiers:
+        print(f"  page tiers: {', '.join(f'{tier}={count}' for tier, count in page_tiers.items())}")
+    if report['rss']:
+        print(f"  peak RSS: worker {report['rss']['peak_worker'] / 2 ** 20:.0f}MB, "
+              f"all processes {report['rss']['peak_total'] / 2 ** 20:.0f}MB")
+
+    failures = []
+    if not records:
+        failures.append('no request completed')
+    elif totals['error_rate'] > args.max_error_rate:
+        failures.append(f"error rate {totals['error_rate']:.1%} above {args.max_error_rate:.1%}: {errors}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(dict(report, ok=not failures, failures=failures), f, indent=2)
+
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
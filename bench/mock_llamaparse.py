@@ -0,0 +1,154 @@
+"""
+Local stand-in for the LlamaParse REST API that simulates parse latency,
+rate limiting (429 with Retry-After) and random throttling. Results list each
+page separately (/result/json); pages end with a footnote after a '---' rule
+and the first one carries the DOI 10.5555/mock.<job number>.
+
+    python -m bench.mock_llamaparse --port 8765 --latency 2 --rate-limit 10 --throttle-probability 0.1
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench.synthetic_markdown import synthetic_markdown
+
+PAGE_SEPARATOR = '\n---\n'
+
+
+def mock_page(seed, page):
+    """
+    Markdown of one page of a mock job
+    """
+    markdown = synthetic_markdown(tables=1, rows=10, cols=6, seed=seed * 100 + page, first_table=page + 1)
+    if page == 0:
+        markdown = f"doi: 10.5555/mock.{seed}\n\n{markdown}"
+    return f"{markdown}\n---\n\n*Values are means of three replicates.*\n"
+
+
+class MockState:
+    def __init__(self, latency=1.0, jitter=0.2, rate_limit=0.0, throttle_probability=0.0, pages=2, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.throttle_probability = throttle_probability
+        self.pages = pages
+        self.rng = random.Random(seed)
+        self.jobs = {}
+        self.window = []
+        self.stats = {'uploads': 0, 'status_polls': 0, 'results': 0, 'throttled': 0}
+        self.lock = threading.Lock()
+
+    def throttle(self):
+        """
+        True if this request must be answered with 429
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.window = [t for t in self.window if now - t < 1.0]
+            limited = self.rate_limit and len(self.window) >= self.rate_limit
+            if limited or self.rng.random() < self.throttle_probability:
+                self.stats['throttled'] += 1
+                return True
+            self.window.append(now)
+            return False
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _throttled(self):
+        if self.state.throttle():
+            self._json(429, {'detail': 'Too many requests'}, {'Retry-After': '1'})
+            return True
+        return False
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path != '/api/parsing/upload':
+            return self._json(404, {'detail': 'Not found'})
+        if self._throttled():
+            return
+
+        state = self.state
+        with state.lock:
+            job_id = uuid.uuid4().hex
+            latency = max(0.0, state.latency + state.rng.uniform(-state.jitter, state.jitter))
+            state.jobs[job_id] = {'ready_at': time.monotonic() + latency, 'seed': len(state.jobs)}
+            state.stats['uploads'] += 1
+        self._json(200, {'id': job_id, 'status': 'PENDING'})
+
+    def do_GET(self):
+        state = self.state
+        if self.path == '/stats':
+            return self._json(200, dict(state.stats, jobs=len(state.jobs)))
+
+        match = re.fullmatch(r'/api/parsing/job/([0-9a-f]+)(/result/(\w+))?', self.path)
+        if not match or match.group(1) not in state.jobs:
+            return self._json(404, {'detail': 'Job not found'})
+        if self._throttled():
+            return
+
+        job = state.jobs[match.group(1)]
+        ready = time.monotonic() >= job['ready_at']
+        if not match.group(2):
+            with state.lock:
+                state.stats['status_polls'] += 1
+            return self._json(200, {'id': match.group(1), 'status': 'SUCCESS' if ready else 'PENDING'})
+
+        if not ready:
+            return self._json(400, {'detail': 'Job not finished'})
+        with state.lock:
+            state.stats['results'] += 1
+        pages = [mock_page(job['seed'], p) for p in range(state.pages)]
+        if match.group(3) == 'json':
+            return self._json(200, {'pages': [{'page': p + 1, 'md': text, 'text': text}
+                                              for p, text in enumerate(pages)]})
+        self._json(200, {match.group(3): PAGE_SEPARATOR.join(pages)})
+
+
+def start_mock_server(port=0, **options):
+    """
+    Start the mock server in a background thread
+
+    Returns:
+        tuple: (server, base_url); call server.shutdown() to stop it
+    """
+    handler = type('BoundMockHandler', (MockHandler,), {'state': MockState(**options)})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--port', type=int, default=8765)
+    arg_parser.add_argument('--latency', type=float, default=1.0, help='Seconds until a job succeeds')
+    arg_parser.add_argument('--rate-limit', type=float, default=0.0, help='Requests per second before 429 (0 = off)')
+    arg_parser.add_argument('--throttle-probability', type=float, default=0.0)
+    args = arg_parser.parse_args()
+
+    server, base_url = start_mock_server(args.port, latency=args.latency, rate_limit=args.rate_limit,
+                                         throttle_probability=args.throttle_probability)
+    print(f"Mock LlamaParse listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,10 @@
+class MemorySink:
+    """
+    Output sink keeping result files in memory, so only the extraction is timed
+    """
+
+    def __init__(self):
+        self.files = {}
+
+    def write(self, filename, content):
+        self.files[filename] = content
@@ -0,0 +1,225 @@
+"""
+Benchmark suite: end-to-end and per-function throughput on synthetic
+amino-acid papers, stored as JSON so runs can be compared between commits.
+
+    python -m bench.suite --size small
+    python -m bench.suite --size medium --pages 32 --superscripts --output bench/results/medium.json
+    python -m bench.suite --size small --compare bench/results/<baseline>.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.sinks import MemorySink
+from bench.synthetic_markdown import synthetic_documents
+from bench.synthetic_pdf import table_lines, write_table_pdf
+
+SIZES = {
+    'small': {'pages': 4, 'tables_per_page': 1, 'rows': 20, 'cols': 8},
+    'medium': {'pages': 16, 'tables_per_page': 2, 'rows': 40, 'cols': 10},
+    'large': {'pages': 48, 'tables_per_page': 2, 'rows': 80, 'cols': 14},
+}
+
+# Git-ignored; pass --output to keep a run elsewhere
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def text_table(rows, cols, seed=0, letters=True):
+    """
+    Whitespace-separated table text as process_table_content receives it
+    """
+    _, lines = table_lines(random.Random(seed), 1, rows, cols, letters)
+    return '\n'.join(' '.join(cells) for cells in lines)
+
+
+def measure(name, fn, units, unit_name, repeat):
+    """
+    Run fn repeat times (stdout silenced) and summarise the timings
+
+    Returns:
+        dict: Best and mean seconds and throughput in unit_name per second
+    """
+    timings = []
+    for i in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn(i)
+            timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    result = {
+        'name': name,
+        'repeat': repeat,
+        'best_seconds': best,
+        'mean_seconds': statistics.mean(timings),
+        'units': units,
+        'unit_name': unit_name,
+        'throughput': units / best if best else None,
+    }
+    print(f"{name:<32} best={best:.4f}s mean={result['mean_seconds']:.4f}s "
+          f"{result['throughput']:.1f} {unit_name}/s")
+    return result
+
+
+def run_suite(config, repeat, work_dir):
+    # main reads its settings at import time, so it (and bench_cleaning, which
+    # imports it) must only be imported once the environment is prepared
+    import main as service
+    from bench.bench_cleaning import synthetic_table
+    from extract_complex_pdf import extract_and_save_tables, process_table_content
+
+    results = []
+    data_rows = config['rows']
+
+    df = synthetic_table(rows=data_rows, cols=config['cols'])
+    results.append(measure('validate_and_clean_table_data',
+                           lambda i: service.validate_and_clean_table_data(df, doi='10.1/x', title='T'),
+                           data_rows, 'rows', repeat))
+    results.append(measure('identify_column_headers', lambda i: service.identify_column_headers(df),
+                           data_rows, 'rows', repeat))
+
+    table_text = text_table(data_rows, config['cols'])
+    results.append(measure('process_table_content', lambda i: process_table_content(table_text),
+                           data_rows, 'rows', repeat))
+
+    documents = synthetic_documents(count=config['pages'], tables=config['tables_per_page'],
+                                    rows=data_rows, cols=config['cols'])
+    table_count = config['pages'] * config['tables_per_page']
+    results.append(measure('extract_and_save_tables',
+                           lambda i: extract_and_save_tables(documents, doi='10.1/x', sink=MemorySink()),
+                           table_count, 'tables', repeat))
+
+    # Distinct PDFs per repetition, so the result cache never answers
+    pdf_paths = []
+    for i in range(repeat):
+        pdf_path = os.path.join(work_dir, f"paper_{i}.pdf")
+        write_table_pdf(pdf_path, pages=config['pages'], tables_per_page=config['tables_per_page'],
+                        rows=data_rows, cols=config['cols'], seed=i, superscripts=config['superscripts'])
+        pdf_paths.append(pdf_path)
+
+    client = service.app.test_client()
+
+    def extract_tables(i):
+        with open(pdf_paths[i], 'rb') as f:
+            response = client.post('/extract-tables', data={'file': (f, 'paper.pdf')})
+            body = response.get_data()
+        if response.status_code != 200 or response.headers.get('X-Cache') != 'MISS':
+            raise RuntimeError(f"/extract-tables answered {response.status_code} "
+                               f"(X-Cache: {response.headers.get('X-Cache')})")
+
+    results.append(measure('extract_tables (end-to-end)', extract_tables, config['pages'], 'pages', repeat))
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                              ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current, threshold):
+    """
+    Print the throughput change of every benchmark against a baseline run
+
+    Returns:
+        list: Names of benchmarks slower than the baseline by more than threshold
+    """
+    base = {r['name']: r for r in baseline['results']}
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('revision')} ({baseline['meta'].get('timestamp')}):")
+    for result in current['results']:
+        old = base.get(result['name'])
+        if not old or not old['throughput'] or not result['throughput']:
+            continue
+        change = result['throughput'] / old['throughput'] - 1
+        flag = ''
+        if change < -threshold:
+            flag = '  REGRESSION'
+            regressions.append(result['name'])
+        print(f"  {result['name']:<32} {old['throughput']:10.1f} -> {result['throughput']:10.1f} "
+              f"{result['unit_name']}/s ({change:+.1%}){flag}")
+    if baseline['config'] != current['config']:
+        print("  (note: the runs used different configurations)")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    arg_parser.add_argument('--pages', type=int, help='Override the page count of the size preset')
+    arg_parser.add_argument('--tables-per-page', type=int)
+    arg_parser.add_argument('--rows', type=int)
+    arg_parser.add_argument('--cols', type=int)
+    arg_parser.add_argument('--superscripts', action='store_true',
+                            help='Typeset significance letters as superscripts in the PDFs')
+    arg_parser.add_argument('--backend', default='camelot',
+                            help='PARSER_BACKEND used end-to-end (default: camelot, runs offline)')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--output', help='Results JSON (default: bench/results/<revision>-<size>.json)')
+    arg_parser.add_argument('--compare', help='Baseline results JSON to compare against')
+    arg_parser.add_argument('--threshold', type=float, default=0.10,
+                            help='Throughput drop reported as a regression (default: 0.10)')
+    args = arg_parser.parse_args()
+
+    config = dict(SIZES[args.size])
+    for key in ('pages', 'tables_per_page', 'rows', 'cols'):
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+    config['superscripts'] = args.superscripts
+    config['backend'] = args.backend
+
+    work_dir = tempfile.mkdtemp()
+    os.environ['PARSER_BACKEND'] = args.backend
+    # Caches and indexes start empty on every run, so a repeat run with the
+    # same seeds measures the same work as the first
+    os.environ['RESULT_CACHE_DIR'] = os.path.join(work_dir, 'cache')
+    os.environ['PAGE_CACHE'] = '0'
+    os.environ['DOC_INDEX_PATH'] = os.path.join(work_dir, 'doc-index.sqlite')
+    for name in ('LAYOUT_TEMPLATES_PATH', 'TABLE_STORE_DIR'):
+        os.environ.pop(name, None)
+    try:
+        results = run_suite(config, args.repeat, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    revision = git_revision()
+    run = {
+        'meta': {
+            'revision': revision,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'config': dict(config, size=args.size, repeat=args.repeat),
+        'results': results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{revision or 'unknown'}-{args.size}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(run, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            regressions = compare(json.load(f), run, args.threshold)
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
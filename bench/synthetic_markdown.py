@@ -0,0 +1,51 @@
+import random
+
+from bench.synthetic_pdf import AMINO_ACIDS, format_value, prose_lines
+from parser_backends import ParsedDocument
+
+
+def markdown_table(rng, table_number, rows, cols):
+    """
+    One markdown table in LlamaParse style, with caption, abbreviations and note lines
+    """
+    header = ['A.A.', 'Ref.*'] + [f"BC.{i + 1}" for i in range(cols - 2)]
+    lines = [
+        f"Table {table_number}. Amino acid composition of samples (g/100 g protein)",
+        '',
+        '|' + '|'.join(header) + '|',
+        '|' + '|'.join('---' for _ in header) + '|',
+    ]
+    for r in range(rows):
+        cells = [AMINO_ACIDS[r % len(AMINO_ACIDS)], str(rng.randint(10, 99))]
+        cells += [format_value(rng) for _ in range(cols - 2)]
+        lines.append('|' + '|'.join(cells) + '|')
+    lines += [
+        '',
+        'Abbreviations: A.A., amino acid; BC, bean cultivar.',
+        'Note: Values are mean ± SD (n = 3); different letters indicate significant differences.',
+    ]
+    return '\n'.join(lines)
+
+
+def synthetic_markdown(tables=10, rows=20, cols=8, prose_paragraphs=1, seed=0, first_table=1):
+    """
+    Markdown text of one parsed page/document containing the given number of tables
+    """
+    rng = random.Random(seed)
+    blocks = ['# Results']
+    for t in range(tables):
+        for _ in range(prose_paragraphs):
+            blocks.append(' '.join(prose_lines(rng, 3)))
+        blocks.append(markdown_table(rng, first_table + t, rows, cols))
+    return '\n\n'.join(blocks) + '\n'
+
+
+def synthetic_documents(count=10, tables=2, rows=20, cols=8, seed=0):
+    """
+    List of ParsedDocument objects, one per page as LlamaParse returns them
+    """
+    documents = []
+    for i in range(count):
+        text = synthetic_markdown(tables=tables, rows=rows, cols=cols, seed=seed + i, first_table=i * tables + 1)
+        documents.append(ParsedDocument(text, {'page_label': i + 1}))
+    return documents
@@ -0,0 +1,314 @@
+import random
+import re
+
+AMINO_ACIDS = [
+    'His', 'Ile', 'Leu', 'Lys', 'Met', 'Phe', 'Thr', 'Trp', 'Val', 'Arg',
+    'Cys', 'Tyr', 'Ala', 'Asp', 'Glu', 'Gly', 'Pro', 'Ser', 'Asn', 'Gln',
+]
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+FONT_SIZE = 8
+LINE_HEIGHT = 12
+
+
+def _escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def _text_op(x, y, text, size=FONT_SIZE):
+    return f"BT /F1 {size} Tf {x:.1f} {y:.1f} Td ({_escape(text)}) Tj ET"
+
+
+SUPERSCRIPT_SIZE = 5
+SUPERSCRIPT_RISE = 3
+# Approximate Helvetica advance width as a fraction of the font size
+CHAR_WIDTH = 0.55
+
+
+def _cell_ops(x, y, cell, superscripts):
+    """
+    Draw one table cell; with superscripts, trailing significance letters
+    (1.85±0.04b) are set smaller and raised as in typeset papers
+    """
+    match = re.match(r'^(.*\d)([a-z]+)$', cell) if superscripts else None
+    if not match:
+        return [_text_op(x, y, cell)]
+    value, letters = match.groups()
+    return [_text_op(x, y, value),
+            _text_op(x + len(value) * FONT_SIZE * CHAR_WIDTH, y + SUPERSCRIPT_RISE, letters, SUPERSCRIPT_SIZE)]
+
+
+def format_value(rng, letters=True):
+    """
+    Random mean±SD cell in the style of amino-acid composition tables, e.g. 1.85±0.04b
+    """
+    value = f"{rng.uniform(0.1, 9.9):.2f}±{rng.uniform(0.0, 0.2):.2f}"
+    if letters:
+        value += rng.choice(['a', 'b', 'c', 'd', 'e', 'f', 'g', 'ab', 'cd', 'de'])
+    return value
+
+
+def table_lines(rng, table_number, rows, cols, letters=True, captions=None):
+    """
+    Build the caption and the rows (as lists of cells) of one synthetic table.
+    captions optionally lists the caption subjects tables cycle through.
+    """
+    subject = captions[(table_number - 1) % len(captions)] if captions else \
+        'Amino acid composition of samples (g/100 g protein)'
+    caption = f"Table {table_number}. {subject}"
+    header = ['A.A.', 'Ref.*'] + [f"BC.{i + 1}" for i in range(cols - 2)]
+    body = []
+    for r in range(rows):
+        name = AMINO_ACIDS[r % len(AMINO_ACIDS)]
+        if r >= len(AMINO_ACIDS):
+            name = f"{name}{r // len(AMINO_ACIDS)}"
+        body.append([name, str(rng.randint(10, 99))] + [format_value(rng, letters) for _ in range(cols - 2)])
+    return caption, [header] + body
+
+
+def prose_lines(rng, count):
+    words = ['protein', 'amino', 'acid', 'sample', 'analysis', 'digestibility', 'the', 'of',
+             'was', 'determined', 'using', 'method', 'results', 'were', 'significant', 'and']
+    return [' '.join(rng.choice(words) for _ in range(rng.randint(8, 14))).capitalize() + '.'
+            for _ in range(count)]
+
+
+def reference_lines(rng, count):
+    """
+    Numbered reference list entries, numeric-heavy text that is not a table
+    """
+    authors = ['Smith J', 'Wang L', 'Kumar R', 'Garcia M', 'Müller K', 'Sato T']
+    lines = []
+    for i in range(count):
+        year = rng.randint(1985, 2023)
+        volume, first = rng.randint(1, 120), rng.randint(1, 900)
+        lines.append(f"{i + 1}. {rng.choice(authors)}, {rng.choice(authors)} ({year}) J Agric Food Chem "
+                     f"{volume}:{first}-{first + rng.randint(3, 15)}")
+    return lines
+
+
+def methods_lines(rng, count):
+    """
+    Methods prose with inline quantities (temperatures, times, concentrations)
+    """
+    return [f"Samples ({rng.randint(1, 50)} mg) were hydrolysed in {rng.randint(2, 12)} M HCl at "
+            f"{rng.choice([105, 110, 115])} °C for {rng.choice([18, 22, 24])} h and analysed at "
+            f"{rng.randint(200, 600)} nm." for _ in range(count)]
+
+
+def grid_ops(rng, rows=60, cols=12, size=3):
+    """
+    A page-filling grid of tiny numbers, positioned one by one like a scanned
+    data sheet's text layer. Camelot's stream parser needs several seconds for
+    such a page (about 9s for 60 x 12 cells), which makes it a stand-in for a
+    pathological page.
+    """
+    ops = [f"BT /F1 {size} Tf"]
+    for r in range(rows):
+        y = PAGE_HEIGHT - 20 - r * (PAGE_HEIGHT - 40) / rows
+        for c in range(cols):
+            x = 10 + c * (PAGE_WIDTH - 20) / cols
+            ops.append(f"1 0 0 1 {x:.2f} {y:.2f} Tm ({rng.uniform(0, 9):.2f}) Tj")
+    ops.append('ET')
+    return ops
+
+
+def _page_stream(rng, page_spec, table_counter, rows, cols, letters, superscripts=False, captions=None):
+    ops = []
+    y = PAGE_HEIGHT - 60
+    left = 50
+    col_width = (PAGE_WIDTH - 2 * left) / max(cols, 1)
+
+    for block in page_spec:
+        if block == 'grid':
+            ops += grid_ops(rng)
+            continue
+        if block in ('prose', 'references', 'methods'):
+            text_lines = {'prose': prose_lines, 'references': reference_lines, 'methods': methods_lines}[block]
+            for line in text_lines(rng, 6 if block == 'prose' else 20):
+                ops.append(_text_op(left, y, line))
+                y -= LINE_HEIGHT
+            y -= LINE_HEIGHT
+            continue
+
+        # 'table' is captioned with mean±SD cells, 'plain_table' has neither
+        table_counter[0] += 1
+        plain = block == 'plain_table'
+        caption, lines = table_lines(rng, table_counter[0], rows, cols, letters and not plain, captions)
+        if plain:
+            lines = [lines[0]] + [[cell.split('±')[0] for cell in row] for row in lines[1:]]
+        else:
+            ops.append(_text_op(left, y, caption))
+        y -= LINE_HEIGHT * 1.5
+        for cells in lines:
+            for c, cell in enumerate(cells):
+                ops += _cell_ops(left + c * col_width, y, cell, superscripts)
+            y -= LINE_HEIGHT
+        y -= LINE_HEIGHT * 2
+
+    return '\n'.join(ops)
+
+
+def build_pdf(page_streams, xmp=None, info=None, forms=()):
+    """
+    Assemble a minimal PDF from per-page content streams using the built-in
+    Helvetica font, so no PDF library is needed to generate fixtures.
+    xmp (XML text) and info (dict of strings) add document metadata. forms
+    are content streams of form XObjects every page can draw as /Fm0, /Fm1...
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    xobjects = b''
+    for i, form in enumerate(forms):
+        data = form.encode('cp1252')
+        form_id = add(b"<< /Type /XObject /Subtype /Form /BBox [0 0 %d %d] /Resources << /Font << /F1 %d 0 R >> >> "
+                      b"/Length %d >>\nstream\n" % (PAGE_WIDTH, PAGE_HEIGHT, font_id, len(data)) + data + b"\nendstream")
+        xobjects += b" /Fm%d %d 0 R" % (i, form_id)
+    if xobjects:
+        xobjects = b" /XObject <<" + xobjects + b" >>"
+    pages_id = len(objects) + 1 + 2 * len(page_streams)
+    page_ids = []
+    for stream in page_streams:
+        data = stream.encode('cp1252')
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R >>%s >> /Contents %d 0 R >>"
+            % (pages_id, PAGE_WIDTH, PAGE_HEIGHT, font_id, xobjects, content_id)
+        ))
+    kids = b' '.join(b"%d 0 R" % pid for pid in page_ids)
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+    metadata_ref = b''
+    if xmp:
+        data = xmp.encode('utf-8')
+        metadata_ref = b" /Metadata %d 0 R" % add(
+            b"<< /Type /Metadata /Subtype /XML /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+    info_ref = b''
+    if info:
+        entries = b' '.join(b"/%s (%s)" % (key.encode('ascii'), _escape(value).encode('cp1252'))
+                            for key, value in info.items())
+        info_ref = b" /Info %d 0 R" % add(b"<< " + entries + b" >>")
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R%s >>" % (pages_id, metadata_ref))
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R%s >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, info_ref, xref_offset)
+    return bytes(out)
+
+
+def write_paper_pdf(path, title=None, front_lines=(), pages=4, reference_dois=(), xmp=None, info=None, seed=0,
+                    page_lines=None):
+    """
+    Write a synthetic paper without tables: a title set in a large font and
+    front matter lines (e.g. a DOI line) on page 1, prose pages and a closing
+    reference list citing reference_dois. page_lines maps 1-based page
+    numbers to extra lines printed at the top of that page.
+    """
+    rng = random.Random(seed)
+    streams = []
+    for page in range(pages):
+        ops = []
+        y = PAGE_HEIGHT - 60
+        lines = list((page_lines or {}).get(page + 1, [])) + prose_lines(rng, 10)
+        if page == 0:
+            if title:
+                ops.append(_text_op(50, y, title, size=16))
+                y -= LINE_HEIGHT * 2
+            lines = list(front_lines) + lines
+        elif page == pages - 1 and pages > 1:
+            lines = reference_lines(rng, 10) + [f"{i + 11}. Doe A (2020) Food Chem. https://doi.org/{doi}"
+                                                for i, doi in enumerate(reference_dois)]
+        for line in lines:
+            ops.append(_text_op(50, y, line))
+            y -= LINE_HEIGHT
+        streams.append('\n'.join(ops))
+    with open(path, 'wb') as f:
+        f.write(build_pdf(streams, xmp=xmp, info=info))
+
+
+def write_form_pdf(path, lines):
+    """
+    Write a one-page PDF whose content stream only draws a form XObject
+    holding lines, so PDFs with different text share the same page content
+    """
+    y = PAGE_HEIGHT - 60
+    form = '\n'.join(_text_op(50, y - i * LINE_HEIGHT, line) for i, line in enumerate(lines))
+    with open(path, 'wb') as f:
+        f.write(build_pdf(['q /Fm0 Do Q'], forms=[form]))
+
+
+def write_mixed_pdf(path, page_kinds, rows=12, cols=6, seed=0, page_seeds=None):
+    """
+    Write a synthetic paper with one block per page
+
+    Args:
+        path (str): Output PDF path
+        page_kinds (list): Per page one of 'table', 'plain_table', 'prose',
+            'references', 'methods' or 'grid' (see grid_ops)
+        rows (int): Data rows per table
+        cols (int): Columns per table
+        seed (int): Random seed
+        page_seeds (list): Optional seed per page instead, so single pages can
+            be changed while the others stay byte-identical
+
+    Returns:
+        list: 1-based page numbers that contain tables
+    """
+    rng = random.Random(seed)
+    table_counter = [0]
+    streams = [_page_stream(random.Random(page_seeds[i]) if page_seeds else rng, [kind], table_counter, rows, cols,
+                            True) for i, kind in enumerate(page_kinds)]
+    with open(path, 'wb') as f:
+        f.write(build_pdf(streams))
+    return [i + 1 for i, kind in enumerate(page_kinds) if kind.endswith('table')]
+
+
+def write_table_pdf(path, pages=8, tables_per_page=1, rows=20, cols=8, prose_every=0, letters=True, seed=0,
+                    superscripts=False, captions=None):
+    """
+    Write a synthetic amino-acid paper to path
+
+    Args:
+        path (str): Output PDF path
+        pages (int): Number of pages
+        tables_per_page (int): Tables drawn on each table page
+        rows (int): Data rows per table
+        cols (int): Columns per table, including the amino acid and reference columns
+        prose_every (int): If > 0, every n-th page holds only prose (no table)
+        letters (bool): Append significance letters (e.g. 'b') to values
+        seed (int): Random seed, so fixtures are reproducible
+        superscripts (bool): Typeset the significance letters as superscripts
+        captions (list): Optional caption subjects the tables cycle through
+
+    Returns:
+        list: 1-based page numbers that contain tables
+    """
+    rng = random.Random(seed)
+    table_counter = [0]
+    streams = []
+    table_pages = []
+    for page in range(1, pages + 1):
+        if prose_every and page % prose_every == 0:
+            spec = ['prose']
+        else:
+            spec = ['table'] * tables_per_page
+            table_pages.append(page)
+        streams.append(_page_stream(rng, spec, table_counter, rows, cols, letters, superscripts, captions))
+
+    with open(path, 'wb') as f:
+        f.write(build_pdf(streams))
+    return table_pages
@@ -0,0 +1,265 @@
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+from pdfminer.pdftypes import resolve1
+
+from page_cache import private_dir
+
+# DOIs written as a doi.org / dx.doi.org link or after a "doi:" / "DOI" label,
+# e.g. "https://doi.org/10.1016/j.foodchem.2020.127", "DOI: 10.3390/foods9010001"
+DOI_PATTERN = re.compile(
+    r'(?:https?://(?:dx\.)?doi\.org/|\bdoi:?\s*)(10\.\d{4,9}/[^\s"<>]+)',
+    re.IGNORECASE
+)
+# A bare DOI, only trusted inside document metadata
+BARE_DOI_PATTERN = re.compile(r'\b(10\.\d{4,9}/[^\s"<>]+)')
+DOI_TRAILING = '.,;:)]}\'"'
+
+# Later pages hold the references, whose DOIs belong to other papers, so only
+# the first few pages are searched
+DOI_SEARCH_PAGES = int(os.getenv('DOI_SEARCH_PAGES', '3'))
+
+JUNK_TITLE_PATTERN = re.compile(r'^(?:microsoft word|untitled|document\d*$)|\.(?:docx?|pdf|tex|dvi)$', re.IGNORECASE)
+MIN_TITLE_LENGTH = 10
+
+XMP_NAMESPACES = {
+    'x': 'adobe:ns:meta/',
+    'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+    'prism': 'http://prismstandard.org/namespaces/basic/2.0/',
+    'prism21': 'http://prismstandard.org/namespaces/basic/2.1/',
+    'pdfx': 'http://ns.adobe.com/pdfx/1.3/',
+}
+
+
+def clean_doi(doi):
+    return doi.rstrip(DOI_TRAILING) if doi else None
+
+
+def find_doi(text):
+    """
+    First DOI in text written as a link or after a DOI label, without the
+    prefix and trailing punctuation
+
+    Returns:
+        str: DOI such as '10.1016/j.foodchem.2020.127', or None
+    """
+    match = DOI_PATTERN.search(text or '')
+    return clean_doi(match.group(1)) if match else None
+
+
+def xmp_fields(pdf):
+    """
+    DOI and title from a pdfplumber PDF's XMP metadata stream
+
+    Returns:
+        dict: 'doi' and 'title' (either may be None)
+    """
+    fields = {'doi': None, 'title': None}
+    stream = resolve1(pdf.doc.catalog.get('Metadata'))
+    if stream is None:
+        return fields
+    try:
+        root = ET.fromstring(stream.get_data())
+    except (ET.ParseError, AttributeError, TypeError):
+        return fields
+
+    for path in ('.//prism:doi', './/prism21:doi', './/pdfx:doi'):
+        element = root.find(path, XMP_NAMESPACES)
+        if element is not None and element.text:
+            fields['doi'] = find_doi(f"doi:{element.text.strip()}")
+            break
+    if fields['doi'] is None:
+        for element in root.findall('.//dc:identifier', XMP_NAMESPACES):
+            match = BARE_DOI_PATTERN.search(''.join(element.itertext()))
+            if match:
+                fields['doi'] = clean_doi(match.group(1))
+                break
+
+    title = root.find('.//dc:title', XMP_NAMESPACES)
+    if title is not None:
+        fields['title'] = ' '.join(''.join(title.itertext()).split()) or None
+    return fields
+
+
+def plausible_title(title):
+    return bool(title) and len(title) >= MIN_TITLE_LENGTH and not JUNK_TITLE_PATTERN.search(title.strip())
+
+
+def largest_text_line(page):
+    """
+    Text set in the largest font on a pdfplumber page, which on the first page
+    of a paper is usually its title
+    """
+    words = page.extract_words(extra_attrs=['size'])
+    if not words:
+        return None
+    largest = max(word['size'] for word in words)
+    title = ' '.join(word['text'] for word in words if word['size'] >= largest - 0.5)
+    return title[:300] or None
+
+
+def extract_document_metadata(session, max_pages=None):
+    """
+    DOI, title and page count of the PDF open in a PdfSession. The DOI is taken
+    from the first page's text, then the XMP and document info metadata, then
+    the following pages up to max_pages; the title from the metadata when it
+    looks real, otherwise from the largest text on the first page.
+
+    Returns:
+        dict: 'doi', 'doi_source', 'title' and 'page_count'
+    """
+    max_pages = DOI_SEARCH_PAGES if max_pages is None else max_pages
+    page_count = session.page_count
+    info = {key: value for key, value in session.pdf.metadata.items() if isinstance(value, str)}
+    xmp = xmp_fields(session.pdf)
+
+    doi, doi_source = None, None
+    if page_count:
+        doi = find_doi(session.page_text(1))
+        doi_source = 'page 1' if doi else None
+    if doi is None:
+        for source, value in (('xmp', xmp['doi']), ('info', info.get('doi') or info.get('DOI'))):
+            if value:
+                match = BARE_DOI_PATTERN.search(value)
+                if match:
+                    doi, doi_source = clean_doi(match.group(1)), source
+                    break
+    if doi is None:
+        for page_number in range(2, min(max_pages, page_count) + 1):
+            doi = find_doi(session.page_text(page_number))
+            if doi:
+                doi_source = f"page {page_number}"
+                break
+
+    title = next((t for t in (xmp['title'], info.get('Title')) if plausible_title(t)), None)
+    if title is None and page_count:
+        title = largest_text_line(session.page(1))
+
+    return {'doi': doi, 'doi_source': doi_source, 'title': title, 'page_count': page_count}
+
+
+class DocumentIndex:
+    """
+    Persistent SQLite index of processed PDFs: file hash -> DOI, title and
+    page count. Repeat uploads skip metadata extraction, and files with the
+    same DOI (e.g. a publisher and a preprint copy) are found by an indexed
+    lookup. Connections are kept per thread and process, so the index can be
+    shared by request threads and worker processes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS documents ('
+                ' file_hash TEXT PRIMARY KEY,'
+                ' doi TEXT COLLATE NOCASE,'
+                ' doi_source TEXT,'
+                ' title TEXT,'
+                ' page_count INTEGER,'
+                ' filename TEXT,'
+                ' first_seen REAL,'
+                ' last_seen REAL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS documents_doi ON documents (doi)')
+
+    def _connect(self):
+        # One connection per thread and process (connections must not cross a fork)
+        pid, connection = getattr(self._local, 'connection', (None, None))
+        if connection is None or pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            self._local.connection = (os.getpid(), connection)
+        return connection
+
+    def get(self, file_hash):
+        """
+        Indexed metadata of a file, or None
+        """
+        row = self._connect().execute('SELECT * FROM documents WHERE file_hash = ?', (file_hash,)).fetchone()
+        return dict(row) if row else None
+
+    def put(self, file_hash, metadata, filename=None):
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT INTO documents (file_hash, doi, doi_source, title, page_count, filename, first_seen, last_seen)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?)'
+                ' ON CONFLICT (file_hash) DO UPDATE SET doi = excluded.doi, doi_source = excluded.doi_source,'
+                ' title = excluded.title, page_count = excluded.page_count,'
+                ' filename = COALESCE(excluded.filename, filename), last_seen = excluded.last_seen',
+                (file_hash, metadata.get('doi'), metadata.get('doi_source'), metadata.get('title'),
+                 metadata.get('page_count'), filename, now, now)
+            )
+
+    def touch(self, file_hash):
+        with self._connect() as connection:
+            connection.execute('UPDATE documents SET last_seen = ? WHERE file_hash = ?', (time.time(), file_hash))
+
+    def find_by_doi(self, doi):
+        """
+        All indexed files with this DOI (case-insensitive), oldest first
+        """
+        rows = self._connect().execute('SELECT * FROM documents WHERE doi = ? ORDER BY first_seen',
+                                       (doi,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self):
+        row = self._connect().execute(
+            'SELECT COUNT(*) AS documents, COUNT(doi) AS with_doi, COUNT(DISTINCT doi) AS distinct_dois'
+            ' FROM documents').fetchone()
+        return dict(row)
+
+    def lookup(self, session, filename=None):
+        """
+        Metadata of the PDF open in session, extracted only if the file is not
+        indexed yet
+
+        Returns:
+            dict: 'doi', 'doi_source', 'title', 'page_count', 'cached' and
+            'duplicates' (other indexed files with the same DOI)
+        """
+        file_hash = session.file_hash
+        metadata = self.get(file_hash)
+        cached = metadata is not None
+        if cached:
+            self.touch(file_hash)
+        else:
+            metadata = extract_document_metadata(session)
+            self.put(file_hash, metadata, filename)
+
+        duplicates = []
+        if metadata.get('doi'):
+            duplicates = [{'file_hash': row['file_hash'], 'filename': row['filename']}
+                          for row in self.find_by_doi(metadata['doi']) if row['file_hash'] != file_hash]
+        return {'doi': metadata.get('doi'), 'doi_source': metadata.get('doi_source'),
+                'title': metadata.get('title'), 'page_count': metadata.get('page_count'),
+                'cached': cached, 'duplicates': duplicates}
+
+
+def configured_document_index():
+    """
+    DocumentIndex at DOC_INDEX_PATH, by default in a directory private to this
+    user (so no other user can plant or lock the database), or None when
+    DOC_INDEX=0 or the default directory is not private
+    """
+    if os.getenv('DOC_INDEX', '1') == '0':
+        return None
+    path = os.getenv('DOC_INDEX_PATH')
+    if not path:
+        try:
+            index_dir = private_dir(os.path.join(tempfile.gettempdir(), f"amino-doc-index-{os.getuid()}"))
+        except PermissionError as e:
+            print(f"Warning: document index disabled - {str(e)}")
+            return None
+        path = os.path.join(index_dir, 'index.sqlite')
+    return DocumentIndex(path)
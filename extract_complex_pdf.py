@@ -1,16 +1,20 @@
 from dotenv import load_dotenv
 import pprint
-from llama_parse import LlamaParse
-from llama_index.core import SimpleDirectoryReader
-import nest_asyncio
+import bisect
 import os
 import re
 import csv
-import tabula
+import io
 import pandas as pd
 import string
+import sys
 import json
 
+from doc_index import find_doi
+from metrics import span, timed
+from table_store import PARQUET_FILENAME, ParquetTableWriter, long_table
+from value_parser import split_value_columns
+
 load_dotenv()
 
 def process_table_content(table_text):
@@ -98,77 +102,272 @@ def extract_doi(text):
         text (str): Full document text
 
     Returns:
-        str: Extracted DOI or None if not found
+        str: Extracted DOI (without a doi.org or "DOI:" prefix) or None if not found
+    """
+    return find_doi(text)
+
+# Markdown-like table structures as produced by LlamaParse
+TABLE_PATTERN = re.compile(
+    r"(?<=\n)\|(?:[^|\n]+\|)+\n\|(?:[-:]+\|)+\n(?:\|(?:[^|\n]+\|)+\n)+",
+    re.MULTILINE
+)
+TITLE_NUMBER_PATTERN = re.compile(r'^\d+\.')
+TITLE_WORDS = ['table', 'of', 'scores', 'composition']
+NOTE_PATTERN = re.compile(r'(?:Note:|^a\s|The\s).*', re.MULTILINE)
+ABBREVIATIONS_PATTERN = re.compile(r'a?\s*[Aa]bbreviations?:?\s*(.*)', re.MULTILINE)
+
+def find_table_title(text, table_start_index):
+    """
+    Title of the table starting at table_start_index, looked up in the
+    previous 3 lines without splitting the text before the table
+
+    Args:
+        text (str): Full document text
+        table_start_index (int): Starting index of the table in the text
+
+    Returns:
+        str: Title line or None if not found
+    """
+    end = table_start_index
+    for _ in range(3):
+        newline = text.rfind('\n', 0, end)
+        line = text[newline + 1:end]
+        # Check for title-like lines (start with a number or have descriptive words)
+        if TITLE_NUMBER_PATTERN.match(line) or any(word in line.lower() for word in TITLE_WORDS):
+            return line.strip()
+        if newline == -1:
+            break
+        end = newline
+    return None
+
+def _first_match_from(pattern, text, matches, match_ends, position):
+    """
+    Leftmost match of pattern starting at or after position, looked up in the
+    precomputed non-overlapping matches of the whole text
+    """
+    i = bisect.bisect_right(match_ends, position)
+    if i == len(matches):
+        return None
+    if matches[i].start() >= position:
+        return matches[i]
+    # The match straddles position, so a match hidden inside it may start later
+    return pattern.search(text, position)
+
+def scan_tables(text):
+    """
+    Locate every markdown table of a document together with its title, note
+    and abbreviations. Each pattern is matched once over the whole text and
+    tables look up their metadata by position, so the cost is linear in the
+    text length rather than in text length times table count.
+
+    Args:
+        text (str): Full document text
+
+    Returns:
+        list: (table match, metadata dict) pairs in document order
     """
-    # Pattern to match DOI formats
-    doi_match = re.search(r'http://dx\.doi\.org/[^\s]+', text)
-    if not doi_match:
-        # Backup patterns
-        doi_match = re.search(r'(?:doi:|DOI:|https?://doi\.org/)[^\s]+', text)
+    tables = list(TABLE_PATTERN.finditer(text))
+    if not tables:
+        return []
 
-    doi = doi_match.group(0) if doi_match else None
-    return doi
+    notes = list(NOTE_PATTERN.finditer(text))
+    note_ends = [m.end() for m in notes]
+    abbreviations = list(ABBREVIATIONS_PATTERN.finditer(text))
+    abbreviation_ends = [m.end() for m in abbreviations]
+
+    results = []
+    for table_match in tables:
+        start = table_match.start()
+        metadata = {
+            'title': find_table_title(text, start),
+            'note': None,
+            'abbreviations': None
+        }
+
+        # Search for notes or explanations after the table
+        note_match = _first_match_from(NOTE_PATTERN, text, notes, note_ends, start)
+        if note_match:
+            metadata['note'] = note_match.group(0).strip()
+
+        # Look for abbreviations section
+        abbr_match = _first_match_from(ABBREVIATIONS_PATTERN, text, abbreviations, abbreviation_ends, start)
+        if abbr_match:
+            metadata['abbreviations'] = abbr_match.group(1).strip()
+
+        results.append((table_match, metadata))
+    return results
 
 def extract_table_metadata(text, table_start_index):
     """
     Extract metadata associated with a table, including title and additional notes.
+    Use scan_tables when processing every table of a document.
 
     Args:
         text (str): Full document text
-        table_start_index (int): Starting index of the table in the text
+        table_start_index (int): Starting index of the table in the text (a line start)
 
     Returns:
         dict: Metadata associated with the table
     """
     metadata = {
-        'title': None,
+        'title': find_table_title(text, table_start_index),
         'note': None,
         'abbreviations': None
     }
 
-    # Search for potential title before the table (look at preceding lines)
-    title_search_range = text[:table_start_index].split('\n')[-3:]  # Look at previous 3 lines
-    for line in reversed(title_search_range):
-        # Check for title-like lines (start with a number or have descriptive words)
-        if re.match(r'^\d+\.', line) or any(word in line.lower() for word in ['table', 'of', 'scores', 'composition']):
-            metadata['title'] = line.strip()
-            break
-
-    # Search for notes or explanations after the table
-    note_pattern = r'(?:Note:|^a\s|The\s)'
-    note_match = re.search(f'{note_pattern}.*', text[table_start_index:], re.MULTILINE)
+    note_match = NOTE_PATTERN.search(text, table_start_index)
     if note_match:
         metadata['note'] = note_match.group(0).strip()
 
-    # Look for abbreviations section
-    abbr_match = re.search(r'a?\s*[Aa]bbreviations?:?\s*(.*)', text[table_start_index:], re.MULTILINE)
+    abbr_match = ABBREVIATIONS_PATTERN.search(text, table_start_index)
     if abbr_match:
         metadata['abbreviations'] = abbr_match.group(1).strip()
 
     return metadata
 
-def extract_and_save_tables(documents, doi, output_dir='output', ):
+class DirectorySink:
+    """
+    Output sink writing each result file into a directory
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, filename, content):
+        if isinstance(content, bytes):
+            with open(os.path.join(self.output_dir, filename), 'wb') as f:
+                f.write(content)
+            return
+        with open(os.path.join(self.output_dir, filename), 'w', newline='', encoding='utf-8') as f:
+            f.write(content)
+
+def rows_to_csv(rows):
+    """
+    Render table rows as CSV text
     """
-    Extract tables from documents with enhanced metadata and save them as CSV files
+    csv_stream = io.StringIO()
+    csv.writer(csv_stream).writerows(rows)
+    return csv_stream.getvalue()
+
+@timed('cleaning')
+def build_table_rows(table, metadata, doi):
+    """
+    Turn one markdown table into CSV rows with a "Sample" first header, Title
+    and DOI columns and trailing abbreviation and note rows
 
     Args:
-        documents (list): List of document objects
-        output_dir (str): Directory to save CSV files
+        table (str): Markdown table text
+        metadata (dict): Title, note and abbreviations of the table
+        doi (str): DOI added to the first data row
+
+    Returns:
+        list: Rows of cells
+    """
+    # Split the markdown rows into cells
+    rows = [row.strip().split('|')[1:-1] for row in table.strip().split('\n')]
+
+    # Remove alignment rows
+    rows = [row for row in rows if not all(set(cell.strip()) <= {'-', ':'} for cell in row)]
+
+    # Ensure first column header is "Sample"
+    if rows:
+        headers = rows[0]
+        headers[0] = "Sample"
+        # Add Title and DOI columns
+        headers.extend(["Title", "DOI"])
+        rows[0] = headers
+
+        # Add metadata to first data row
+        if len(rows) > 1:
+            rows[1].extend([metadata['title'] if metadata['title'] else '', doi if doi else ''])
+
+        # Add empty rows for spacing
+        rows.append([''] * len(headers))  # Empty row for spacing
+
+        # Add abbreviations if available
+        if metadata['abbreviations']:
+            rows.append(['Abbreviations:', metadata['abbreviations']] + [''] * (len(headers) - 2))
+
+        # Add notes if available
+        if metadata['note']:
+            rows.append(['Note:', metadata['note']] + [''] * (len(headers) - 2))
+
+    return rows
+
+def markdown_table_rows(table):
+    """
+    Stripped cells of a markdown table without its alignment row, padded to
+    the width of the widest row
+    """
+    rows = [[cell.strip() for cell in row.strip().split('|')[1:-1]] for row in table.strip().split('\n')]
+    rows = [row for row in rows if not all(set(cell) <= {'-', ':'} for cell in row)]
+
+    width = max(len(row) for row in rows)
+    return [row + [''] * (width - len(row)) for row in rows]
+
+@timed('values')
+def typed_table_frame(table, metadata, doi):
+    """
+    Parse one markdown table into a typed DataFrame: mean±SD cells become
+    float32 '<column>_mean'/'<column>_sd' columns plus a categorical
+    '<column>_letters' column, and every row carries Title and DOI
+
+    Returns:
+        pd.DataFrame: Typed table
+    """
+    rows = markdown_table_rows(table)
+    headers = ['Sample'] + rows[0][1:]
+
+    # Repeated or empty headers would merge columns
+    seen = {}
+    for i, header in enumerate(headers):
+        header = header or 'Column'
+        seen[header] = seen.get(header, -1) + 1
+        headers[i] = f"{header}_{seen[header]}" if seen[header] else header
+
+    frame = split_value_columns(pd.DataFrame(rows[1:], columns=headers))
+    frame['Title'] = metadata['title'] if metadata['title'] else ''
+    frame['DOI'] = doi if doi else ''
+    return frame
+
+def document_page(doc, default):
     """
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
+    1-based page number of a parsed document as reported by its backend
+    (metadata 'page_label'), or default
+    """
+    metadata = getattr(doc, 'metadata', None) or {}
+    label = str(metadata.get('page_label', ''))
+    return int(label) if label.isdigit() else default
+
+def save_tables_iter(documents, doi, sink, output_mode='text', output_format='csv', store=None, file_hash=None):
+    """
+    Extract tables from documents with enhanced metadata and write them to sink,
+    yielding the base filename after each table so callers can stream output
+    as it is produced
 
+    Args:
+        documents (list): List of document objects
+        doi (str): DOI added to every table
+        sink: Object with a write(filename, content) method
+        output_mode (str): 'text' writes the cells as extracted, 'typed' splits
+            mean±SD cells into numeric mean/SD and significance-letter columns
+        output_format (str): 'csv' writes a CSV and a metadata JSON per table,
+            'parquet' writes all tables into one tables.parquet (one row group
+            per table, metadata as columns) once the last table is done
+        store (table_store.TableStore): Optional consolidated store the tables
+            are appended to
+        file_hash (str): SHA-256 of the PDF, so the store replaces the tables
+            appended for it before instead of adding them again
+    """
     print("DOI of extract", doi)
 
-    # Define a pattern to detect Markdown-like table structures
-    table_pattern = re.compile(
-        r"(?<=\n)\|(?:[^|\n]+\|)+\n\|(?:[-:]+\|)+\n(?:\|(?:[^|\n]+\|)+\n)+",
-        re.MULTILINE
-    )
+    parquet = ParquetTableWriter() if output_format == 'parquet' or store is not None else None
 
     for doc_index, doc in enumerate(documents):
-        text = doc.text
-        tables = list(table_pattern.finditer(text))
+        page = document_page(doc, doc_index + 1)
+        with span('table_scan'):
+            tables = scan_tables(doc.text)
 
         if tables:
             print(f"Document {doc_index+1} contains {len(tables)} table(s)")
@@ -176,66 +375,84 @@ def extract_and_save_tables(documents, doi, output_dir='output', ):
             # Use alphabetic suffixes for multiple tables on the same page
             table_suffixes = string.ascii_lowercase
 
-            for table_index, table_match in enumerate(tables):
+            for table_index, (table_match, metadata) in enumerate(tables):
                 # Get the full table match
                 table = table_match.group(0)
 
-                # Extract metadata
-                metadata = extract_table_metadata(text, table_match.start())
-
                 # Prepare filename
                 suffix = table_suffixes[table_index] if len(tables) > 1 else ''
-                base_filename = f"{doc_index+1}{suffix}"
-
-                rows = process_table_content(table)
-
-                # Process table into CSV
-                rows = [row.strip().split('|')[1:-1] for row in table.strip().split('\n')]
+                base_filename = f"{page}{suffix}"
 
-                # Remove alignment rows
-                rows = [row for row in rows if not all(set(cell.strip()) <= {'-', ':'} for cell in row)]
+                if parquet is not None:
+                    with span('parquet'):
+                        rows = markdown_table_rows(table)
+                        parquet.write_table(long_table(['Sample'] + rows[0][1:], rows[1:], metadata, doi,
+                                                       page, base_filename))
 
-                # Ensure first column header is "Sample"
-                if rows:
-                    headers = rows[0]
-                    headers[0] = "Sample"
-                    # Add Title and DOI columns
-                    headers.extend(["Title", "DOI"])
-                    rows[0] = headers
+                if output_format == 'parquet':
+                    yield base_filename
+                    continue
 
-                    # Add metadata to first data row
-                    if len(rows) > 1:
-                        rows[1].extend([metadata['title'] if metadata['title'] else '', doi if doi else ''])
+                if output_mode == 'typed':
+                    frame = typed_table_frame(table, metadata, doi)
+                else:
+                    rows = build_table_rows(table, metadata, doi)
 
-                    # Add empty rows for spacing
-                    rows.append([''] * len(headers))  # Empty row for spacing
-
-                    # Add abbreviations if available
-                    if metadata['abbreviations']:
-                        rows.append(['Abbreviations:', metadata['abbreviations']] + [''] * (len(headers) - 2))
-
-                    # Add notes if available
-                    if metadata['note']:
-                        rows.append(['Note:', metadata['note']] + [''] * (len(headers) - 2))
-
-                # Write table to CSV
-                csv_filepath = os.path.join(output_dir, f"{base_filename}.csv")
-                with open(csv_filepath, 'w', newline='', encoding='utf-8') as csvfile:
-                    csv_writer = csv.writer(csvfile)
-                    csv_writer.writerows(rows)
-
-                # Write metadata to JSON
-                metadata_filepath = os.path.join(output_dir, f"{base_filename}_metadata.json")
-                with open(metadata_filepath, 'w', encoding='utf-8') as jsonfile:
+                with span('csv'):
+                    csv_text = frame.to_csv(index=False) if output_mode == 'typed' else rows_to_csv(rows)
                     metadata['doi'] = doi  # Add DOI to metadata
-                    json.dump(metadata, jsonfile, indent=2)
+                    metadata_json = json.dumps(metadata, indent=2)
+
+                # Write table to CSV and metadata to JSON
+                sink.write(f"{base_filename}.csv", csv_text)
+                sink.write(f"{base_filename}_metadata.json", metadata_json)
 
                 print(f"Saved table to {base_filename}.csv")
                 print(f"Saved metadata to {base_filename}_metadata.json")
+                yield base_filename
         else:
             print(f"Document {doc_index+1} does not contain any tables")
 
+    if parquet is not None:
+        with span('parquet'):
+            content = parquet.getvalue()
+            if store is not None:
+                store.append(parquet.combined(), source=doi, file_hash=file_hash)
+        if output_format == 'parquet':
+            sink.write(PARQUET_FILENAME, content)
+            print(f"Saved {len(parquet.tables)} table(s) to {PARQUET_FILENAME}")
+
+def extract_and_save_tables(documents, doi, output_dir='output', sink=None, output_mode='text',
+                            output_format='csv', store=None, file_hash=None):
+    """
+    Extract tables from documents with enhanced metadata and save them as CSV
+    (or Parquet) files
+
+    Args:
+        documents (list): List of document objects
+        output_dir (str): Directory to save CSV files
+        sink: Optional output sink (e.g. a zip_stream.ZipSink) used instead of output_dir
+        output_mode (str): 'text' or 'typed' (see save_tables_iter)
+        output_format (str): 'csv' or 'parquet' (see save_tables_iter)
+        store (table_store.TableStore): Optional consolidated store the tables are appended to
+        file_hash (str): SHA-256 of the PDF (see save_tables_iter)
+    """
+    if sink is None:
+        # Create output directory if it doesn't exist
+        sink = DirectorySink(output_dir)
+
+    for _ in save_tables_iter(documents, doi, sink, output_mode=output_mode, output_format=output_format,
+                              store=store, file_hash=file_hash):
+        pass
+
 if __name__ == '__main__':
+    # For whole directories of PDFs use batch.py instead
+    input_files = sys.argv[1:] or ['sample1.pdf']
+
+    from llama_parse import LlamaParse
+    from llama_index.core import SimpleDirectoryReader
+    import nest_asyncio
+
     parser = LlamaParse(
         result_type="markdown"  # "markdown" and "text" are available
     )
@@ -243,7 +460,7 @@ if __name__ == '__main__':
     file_extractor = {".pdf": parser}
 
     nest_asyncio.apply()
-    documents = SimpleDirectoryReader(input_files=['sample1.pdf'], file_extractor=file_extractor).load_data()
+    documents = SimpleDirectoryReader(input_files=input_files, file_extractor=file_extractor).load_data()
 
     pprint.pprint(documents)
-    extract_and_save_tables(documents)
+    extract_and_save_tables(documents, doi=None)
@@ -0,0 +1,35 @@
+"""
+gunicorn settings for production serving:
+
+    gunicorn -c gunicorn.conf.py
+
+The app is loaded and warmed up once in the master process (preload_app), so
+Camelot, OpenCV and the parser backend's libraries are imported before the
+workers are forked and shared between them.
+"""
+import os
+
+wsgi_app = 'main:create_app()'
+bind = os.getenv('BIND', '0.0.0.0:5000')
+preload_app = True
+
+# One worker process by default: the job queue (/jobs/<id> must reach the
+# worker that accepted the job), the result cache index and /metrics are per
+# process, and the job pool already starts one extraction process per core.
+# Threads serve requests waiting on LlamaParse or streaming a download.
+# More workers need sticky routing of /jobs and give every worker its own
+# job pool; see "Production Serving" in the Readme.
+workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+threads = int(os.getenv('GUNICORN_THREADS', str(max(4, 2 * (os.cpu_count() or 1)))))
+
+# Large PDFs take minutes to extract
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '600'))
+graceful_timeout = 30
+
+# Recycling a worker returns memory fragmented by large PDFs but loses its
+# in-memory job table (unfinished and finished /jobs then give 404), so it is
+# off by default; PAGE_WINDOW bounds the memory of large PDFs instead
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
@@ -0,0 +1,239 @@
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+
+class QueueFullError(Exception):
+    """
+    Raised when the job queue is at capacity and a new job must be rejected
+    """
+
+
+def _run_job(worker_fn, pdf_path, result_path):
+    """
+    Executed inside a pool process: run the extraction and record its timings
+    """
+    started_at = time.time()
+    result = worker_fn(pdf_path, result_path)
+    return {
+        'started_at': started_at,
+        'finished_at': time.time(),
+        'result': result,
+    }
+
+
+class JobManager:
+    """
+    Queue of extraction jobs executed by a bounded process pool.
+
+    Each job owns a directory under jobs_dir holding the uploaded PDF and, once
+    finished, the result ZIP, so results are streamed from disk rather than
+    passed back through the pool.
+    """
+
+    def __init__(self, worker_fn, jobs_dir, max_workers=None, max_pending=16, retention_seconds=3600,
+                 on_complete=None):
+        self.worker_fn = worker_fn
+        self.on_complete = on_complete
+        self.jobs_dir = jobs_dir
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.RLock()
+        os.makedirs(jobs_dir, exist_ok=True)
+
+    def _get_executor(self):
+        if self._executor is None:
+            # Started by a fork server, not forked from the threaded web worker
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('forkserver'))
+        return self._executor
+
+    def _pending_count(self):
+        return sum(1 for job in self._jobs.values() if job['status'] in ('queued', 'running'))
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['finished_at'] and job['finished_at'] < cutoff]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            shutil.rmtree(job['job_dir'], ignore_errors=True)
+
+    def job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+
+    def new_job_id(self):
+        return uuid.uuid4().hex
+
+    def submit(self, job_id, pdf_path, filename, cache_key=None, worker_fn=None):
+        """
+        Enqueue a PDF that has already been saved inside the job's directory.
+        worker_fn replaces the manager's worker_fn for this job.
+
+        Raises:
+            QueueFullError: If max_pending jobs are already queued or running
+        """
+        with self._lock:
+            self._prune()
+            if self._pending_count() >= self.max_pending:
+                raise QueueFullError(f"Job queue is full ({self.max_pending} pending jobs)")
+
+            job = {
+                'id': job_id,
+                'filename': filename,
+                'status': 'queued',
+                'job_dir': self.job_dir(job_id),
+                'result_path': os.path.join(self.job_dir(job_id), 'result.zip'),
+                'download_name': None,
+                'error': None,
+                'cached': False,
+                'cache_key': cache_key,
+                'queued_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'future': None,
+            }
+            self._jobs[job_id] = job
+
+            worker_fn = worker_fn or self.worker_fn
+            try:
+                future = self._get_executor().submit(_run_job, worker_fn, pdf_path, job['result_path'])
+            except BrokenProcessPool:
+                # A crashed worker poisons the whole pool; start a fresh one
+                self._executor = None
+                future = self._get_executor().submit(_run_job, worker_fn, pdf_path, job['result_path'])
+
+            job['future'] = future
+            future.add_done_callback(partial(self._on_done, job_id))
+            return job_id
+
+    def add_completed(self, job_id, filename, source, download_name):
+        """
+        Register a job whose result was already available (e.g. from the result cache).
+        The result is copied from the open binary file source into the job
+        directory so cache eviction cannot remove it.
+        """
+        result_path = os.path.join(self.job_dir(job_id), 'result.zip')
+        os.makedirs(self.job_dir(job_id), exist_ok=True)
+        with open(result_path, 'wb') as f:
+            shutil.copyfileobj(source, f)
+
+        now = time.time()
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = {
+                'id': job_id,
+                'filename': filename,
+                'status': 'done',
+                'job_dir': self.job_dir(job_id),
+                'result_path': result_path,
+                'download_name': download_name,
+                'error': None,
+                'cached': True,
+                'cache_key': None,
+                'queued_at': now,
+                'started_at': now,
+                'finished_at': now,
+                'future': None,
+            }
+        return job_id
+
+    def _on_done(self, job_id, future):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+
+            try:
+                outcome = future.result()
+            except Exception as e:
+                job['status'] = 'failed'
+                job['error'] = str(e)
+                job['finished_at'] = time.time()
+                return
+
+            job['started_at'] = outcome['started_at']
+            job['finished_at'] = outcome['finished_at']
+            result = outcome['result']
+            if result is None:
+                job['status'] = 'empty'
+            else:
+                job['status'] = 'done'
+                job['download_name'] = result.get('download_name')
+                job['doi'] = result.get('doi')
+                job['page_parses'] = result.get('page_parses')
+                job['pages_reused'] = result.get('pages_reused')
+                job['page_tiers'] = result.get('page_tiers')
+                job['pages_timed_out'] = result.get('pages_timed_out')
+                job['stages'] = result.get('stages')
+                if self.on_complete:
+                    try:
+                        self.on_complete(dict(job))
+                    except Exception as e:
+                        print(f"Warning: job completion hook failed for {job_id} - {str(e)}")
+
+    def get(self, job_id):
+        """
+        Snapshot of a job's state and timings, or None if the job is unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+
+            status = job['status']
+            if status == 'queued' and job['future'] is not None and job['future'].running():
+                status = 'running'
+
+            snapshot = {key: value for key, value in job.items()
+                        if key not in ('future', 'job_dir', 'cache_key', 'result_path')}
+            snapshot['status'] = status
+            snapshot['timings'] = self._timings(job)
+            return snapshot
+
+    @staticmethod
+    def _timings(job):
+        timings = {'wait_seconds': None, 'run_seconds': None, 'total_seconds': None}
+        if job['started_at']:
+            timings['wait_seconds'] = job['started_at'] - job['queued_at']
+        if job['started_at'] and job['finished_at']:
+            timings['run_seconds'] = job['finished_at'] - job['started_at']
+            timings['total_seconds'] = job['finished_at'] - job['queued_at']
+        return timings
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            run_times = []
+            for job in self._jobs.values():
+                status = job['status']
+                if status == 'queued' and job['future'] is not None and job['future'].running():
+                    status = 'running'
+                counts[status] = counts.get(status, 0) + 1
+                run_seconds = self._timings(job)['run_seconds']
+                if run_seconds is not None and not job['cached']:
+                    run_times.append(run_seconds)
+
+            # The pool hands one extra call to its workers ahead of time, so cap
+            # "running" at the worker count and treat the overflow as queued
+            running = min(counts.get('running', 0), self.max_workers)
+            queue_depth = counts.get('queued', 0) + counts.get('running', 0) - running
+
+            return {
+                'workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'queue_depth': queue_depth,
+                'running': running,
+                'jobs': counts,
+                'avg_run_seconds': sum(run_times) / len(run_times) if run_times else None,
+                'max_run_seconds': max(run_times) if run_times else None,
+            }
@@ -0,0 +1,304 @@
+import bisect
+import hashlib
+import json
+import os
+import re
+import threading
+
+from metrics import REGISTRY
+
+# Tables matching a learned layout template take their header rows from it
+# instead of the row-scoring heuristics of identify_column_headers
+LAYOUT_TEMPLATES = os.getenv('LAYOUT_TEMPLATES', '1') == '1'
+
+# Optional JSON file templates are loaded from on start and saved to as they are learned
+LAYOUT_TEMPLATES_PATH = os.getenv('LAYOUT_TEMPLATES_PATH') or None
+
+# Tables with the same layout and header rows seen before it becomes a template
+LAYOUT_TEMPLATE_MIN_SEEN = int(os.getenv('LAYOUT_TEMPLATE_MIN_SEEN', '2'))
+
+# Column left edges of a table and a layout match within this many points
+COLUMN_TOLERANCE = 4.0
+
+# Leading rows (caption and header rows) a template can cover
+MAX_TEMPLATE_ROWS = 4
+
+# Version of the JSON file written to LAYOUT_TEMPLATES_PATH
+FILE_FORMAT = 2
+
+DIGITS = re.compile(r'\d+')
+
+
+def token_pattern(cells):
+    """
+    Layout pattern of a header row: runs of digits replaced by '#',
+    e.g. ['A.A.', 'Ref.*', 'BC.1'] -> 'A.A.,Ref.*,BC.#'
+    """
+    return ','.join(DIGITS.sub('#', cell) for cell in cells)
+
+
+def cell_classes(cells):
+    """
+    Shape of a data row: per cell 'n' (holds a digit), 't' (other text) or '-' (empty)
+    """
+    return ''.join('-' if not cell else 'n' if any(c.isdigit() for c in cell) else 't' for cell in cells)
+
+
+def column_edges(columns):
+    """
+    Left edges of a Camelot table's columns (table.cols), or None for tables
+    without positions
+    """
+    if not columns:
+        return None
+    return [round(float(x0), 1) for x0, _ in columns]
+
+
+def column_mapping(edges, layout_edges):
+    """
+    Index of the layout column each of a table's columns falls in, or None
+    when the table does not fit the layout. Every layout column must start
+    where a table column starts (within COLUMN_TOLERANCE); a table column
+    starting inside a layout column is a piece of it that Camelot split off.
+    """
+    mapping = []
+    starts = {}
+    for x0 in edges:
+        i = bisect.bisect_right(layout_edges, x0 + COLUMN_TOLERANCE) - 1
+        if i < 0:
+            return None
+        mapping.append(i)
+        starts.setdefault(i, x0)
+    if len(starts) != len(layout_edges) or any(abs(x0 - layout_edges[i]) > COLUMN_TOLERANCE
+                                               for i, x0 in starts.items()):
+        return None
+    return mapping
+
+
+def merge_row(cells, mapping):
+    """
+    Cells of a row in layout columns: the pieces of a split column joined with a space
+    """
+    merged = [[] for _ in range(mapping[-1] + 1)] if mapping else []
+    for cell, i in zip(cells, mapping):
+        if cell:
+            merged[i].append(cell)
+    return [' '.join(parts) for parts in merged]
+
+
+def layout_key(layout, rows, header_start, header_end):
+    """
+    Fingerprint of a table of a known layout whose header spans the row
+    positions header_start..header_end: the token pattern of every header row
+    and the shape of the first data row. Caption rows above the header vary
+    from table to table and are left out.
+    """
+    return json.dumps([layout, header_start, [token_pattern(row) for row in rows[header_start:header_end + 1]],
+                       cell_classes(rows[header_end + 1])])
+
+
+class LayoutTemplateRegistry:
+    """
+    Table layouts of known journal formats, learned from the header rows the
+    heuristics pick. A layout is a set of column left edges (table.cols); a
+    table fits it when its columns start at the same positions, or when
+    Camelot split a layout column in two, in which case the pieces are merged.
+    Tables of one layout with the same header rows seen min_seen times make a
+    template; later tables with that fingerprint take their header rows
+    straight from it. Templates whose tables the heuristics split differently
+    are never used. Safe to share between request threads; pool processes get
+    a read-only copy (see snapshot).
+    """
+
+    def __init__(self, path=None, min_seen=LAYOUT_TEMPLATE_MIN_SEEN, read_only=False):
+        self.path = path
+        self.min_seen = min_seen
+        self.read_only = read_only
+        self._layouts = []
+        self._templates = {}
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('format') == FILE_FORMAT:
+                self._load(saved)
+            else:
+                print(f"Warning: ignoring layout templates of an older format in {path}")
+
+    def _load(self, saved):
+        self._layouts = [dict(layout, spans=[tuple(span) for span in layout['spans']])
+                         for layout in saved['layouts']]
+        self._templates = saved['templates']
+
+    def snapshot(self):
+        """
+        Copy of the layouts and templates with their version, for
+        from_snapshot in a pool process
+        """
+        with self._lock:
+            return json.loads(json.dumps({'version': self._current_version(), 'min_seen': self.min_seen,
+                                          'layouts': self._layouts, 'templates': self._templates}))
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """
+        Read-only registry of a snapshot: it matches tables against the
+        snapshot's templates but learns nothing and writes no file, so a pool
+        process gives the results of the snapshot's version
+        """
+        registry = cls(min_seen=snapshot['min_seen'], read_only=True)
+        registry._load(snapshot)
+        return registry
+
+    def _fits(self, n_cols, edges):
+        """
+        (layout index, column mapping) of every layout a table fits
+        """
+        for index, layout in enumerate(self._layouts):
+            if edges is None or layout['edges'] is None:
+                # Without positions only the column count can be compared
+                if edges is None and layout['edges'] is None and layout['n_cols'] == n_cols:
+                    yield index, list(range(n_cols))
+                continue
+            mapping = column_mapping(edges, layout['edges'])
+            if mapping is not None:
+                yield index, mapping
+
+    def _active(self, template):
+        return template is not None and not template['conflict'] and template['seen'] >= self.min_seen
+
+    def match(self, rows, columns=None):
+        """
+        Template of a table given its first rows (cleaned cell strings, at
+        least one more than the template's header), or None. The template
+        holds the header_start and header_end row positions, the layout's
+        column edges and the mapping of the table's columns onto them
+        (identical unless Camelot split a layout column).
+        """
+        if not rows:
+            return None
+        with self._lock:
+            for index, mapping in self._fits(len(rows[0]), column_edges(columns)):
+                merged = [merge_row(row, mapping) for row in rows]
+                for header_start, header_end in sorted(self._layouts[index]['spans']):
+                    if header_end + 1 >= len(rows):
+                        continue
+                    template = self._templates.get(layout_key(index, merged, header_start, header_end))
+                    if self._active(template):
+                        return dict(template, edges=self._layouts[index]['edges'], mapping=mapping)
+        return None
+
+    def learn(self, rows, columns, header_start, header_end):
+        """
+        Record the header rows the heuristics found for a table
+        """
+        if self.read_only or header_end + 1 >= len(rows):
+            return
+        edges = column_edges(columns)
+        with self._lock:
+            index = next((i for i, mapping in self._fits(len(rows[0]), edges)
+                          if mapping == list(range(len(rows[0])))), None)
+            if index is None:
+                index = len(self._layouts)
+                self._layouts.append({'edges': edges, 'n_cols': len(rows[0]), 'spans': []})
+            layout = self._layouts[index]
+
+            # A template of another header span fitting this table would have
+            # claimed it, but the heuristics disagree
+            for span in layout['spans']:
+                if span != (header_start, header_end) and span[1] + 1 < len(rows):
+                    other = self._templates.get(layout_key(index, rows, *span))
+                    if other is not None and not other['conflict']:
+                        other['conflict'] = True
+                        self._changed()
+
+            key = layout_key(index, rows, header_start, header_end)
+            template = self._templates.get(key)
+            if template is None:
+                template = {'header_start': header_start, 'header_end': header_end, 'seen': 0, 'conflict': False}
+                self._templates[key] = template
+                layout['spans'].append((header_start, header_end))
+            template['seen'] += 1
+            if template['seen'] == self.min_seen and not template['conflict']:
+                print(f"Learned table layout template: {key}")
+                self._changed()
+
+    def _changed(self):
+        self._version = None
+        self._save()
+
+    def version(self):
+        """
+        Short hash of the templates in use. Learned templates change header
+        detection, so results are cached per version.
+        """
+        with self._lock:
+            return self._current_version()
+
+    def _current_version(self):
+        if self._version is None:
+            active = sorted((key, self._layouts[json.loads(key)[0]]['edges'])
+                            for key, template in self._templates.items() if self._active(template))
+            self._version = hashlib.sha256(json.dumps(active).encode('utf-8')).hexdigest()[:16]
+        return self._version
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'format': FILE_FORMAT, 'layouts': self._layouts, 'templates': self._templates}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def record(self, hit, seconds):
+        """
+        Count a lookup and the time spent finding the table's header rows
+        """
+        with self._lock:
+            if hit:
+                self.hits += 1
+                self.hit_seconds += seconds
+            else:
+                self.misses += 1
+                self.miss_seconds += seconds
+        REGISTRY.inc('amino_layout_template_lookups_total', 'Header detections by layout template result',
+                      result='hit' if hit else 'miss')
+
+    def stats(self):
+        """
+        Template count, hit rate and the header detection time saved by hits
+        (estimated from the mean time of a heuristic detection)
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            mean_hit = self.hit_seconds / self.hits if self.hits else None
+            mean_miss = self.miss_seconds / self.misses if self.misses else None
+            saved = self.hits * (mean_miss - mean_hit) if mean_hit is not None and mean_miss is not None else 0.0
+            return {
+                'templates': sum(1 for t in self._templates.values() if self._active(t)),
+                'layouts_seen': len(self._templates),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'mean_hit_ms': mean_hit * 1000 if mean_hit is not None else None,
+                'mean_miss_ms': mean_miss * 1000 if mean_miss is not None else None,
+                'saved_ms_per_table': saved / lookups * 1000 if lookups else 0.0,
+                'saved_seconds': saved,
+            }
+
+
+def configured_layout_templates():
+    """
+    LayoutTemplateRegistry per the LAYOUT_TEMPLATES settings, or None when
+    LAYOUT_TEMPLATES=0
+    """
+    if not LAYOUT_TEMPLATES:
+        return None
+    return LayoutTemplateRegistry(LAYOUT_TEMPLATES_PATH)
@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import httpx
+from dotenv import load_dotenv
+
+from doc_index import DOI_SEARCH_PAGES, find_doi
+from extract_complex_pdf import DirectorySink, extract_and_save_tables
+from parser_backends import ParsedDocument
+
+load_dotenv()
+
+DEFAULT_BASE_URL = 'https://api.cloud.llamaindex.ai'
+
+# Field of a page in the JSON result holding the text of each result type
+PAGE_FIELDS = {'markdown': 'md', 'text': 'text'}
+
+
+class ParseError(Exception):
+    """
+    Raised when a document cannot be parsed after all retries
+    """
+
+
+class RateLimiter:
+    """
+    Token bucket limiting how many requests per second are sent
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        if not self.rate:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncLlamaParseSubmitter:
+    """
+    Submits many PDFs to the LlamaParse REST API concurrently over one pooled
+    HTTP client, bounded by an in-flight limit and a requests/second budget.
+    Throttled (429), failed (5xx) and dropped requests are retried with
+    exponential backoff, honouring Retry-After.
+
+    Use as an async context manager:
+
+        async with AsyncLlamaParseSubmitter(max_in_flight=8) as submitter:
+            await submitter.parse_many(pdf_paths, on_complete=handle)
+    """
+
+    def __init__(self, api_key=None, base_url=None, max_in_flight=8, requests_per_second=5.0,
+                 max_retries=5, backoff_base=0.5, backoff_max=30.0, poll_interval=1.0, timeout=600.0,
+                 result_type='markdown', parse_options=None):
+        self.api_key = api_key or os.getenv('LLAMA_CLOUD_API_KEY', '')
+        self.base_url = (base_url or os.getenv('LLAMA_CLOUD_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.result_type = result_type
+        self.parse_options = parse_options if parse_options is not None else {'do_not_unroll_columns': True}
+        self._limiter = RateLimiter(requests_per_second)
+        self._client = None
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'requests': 0,
+                      'retries': 0, 'throttled': 0, 'server_errors': 0, 'transport_errors': 0}
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={'Authorization': f"Bearer {self.api_key}"},
+            limits=httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight),
+            timeout=httpx.Timeout(60.0),
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self._client.aclose()
+        self._client = None
+
+    def _backoff(self, attempt, retry_after):
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    async def _request(self, method, url, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            await self._limiter.acquire()
+            self.stats['requests'] += 1
+            retry_after = None
+            try:
+                response = await self._client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                self.stats['transport_errors'] += 1
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code == 429:
+                    self.stats['throttled'] += 1
+                elif response.status_code >= 500:
+                    self.stats['server_errors'] += 1
+                else:
+                    response.raise_for_status()
+                    return response
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get('Retry-After')
+
+            if attempt == self.max_retries:
+                raise ParseError(f"{method} {url} failed after {attempt + 1} attempts ({error})")
+            self.stats['retries'] += 1
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+
+    async def parse(self, pdf_path):
+        """
+        Parse one PDF
+
+        Returns:
+            list: One ParsedDocument per page
+        """
+        with open(pdf_path, 'rb') as f:
+            content = f.read()
+
+        files = {'file': (os.path.basename(pdf_path), content, 'application/pdf')}
+        data = {key: str(value) for key, value in self.parse_options.items()}
+        response = await self._request('POST', '/api/parsing/upload', files=files, data=data)
+        job_id = response.json()['id']
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            status = (await self._request('GET', f"/api/parsing/job/{job_id}")).json()['status']
+            if status == 'SUCCESS':
+                break
+            if status != 'PENDING':
+                raise ParseError(f"Job {job_id} for {os.path.basename(pdf_path)} ended with status {status}")
+            if time.monotonic() > deadline:
+                raise ParseError(f"Timeout while parsing {os.path.basename(pdf_path)} (job {job_id})")
+
+        # The JSON result lists the pages separately, so page breaks never
+        # have to be guessed from the text (which may hold '---' rules)
+        result = (await self._request('GET', f"/api/parsing/job/{job_id}/result/json")).json()
+        field = PAGE_FIELDS[self.result_type]
+        return [ParsedDocument(page.get(field) or '', {'file_path': pdf_path, 'page_label': page.get('page', i + 1),
+                                                       'job_id': job_id})
+                for i, page in enumerate(result['pages'])]
+
+    async def parse_many(self, pdf_paths, on_complete=None):
+        """
+        Parse PDFs concurrently, at most max_in_flight at a time
+
+        Args:
+            pdf_paths (list): PDFs to parse
+            on_complete (callable): Called as on_complete(pdf_path, documents, error)
+                in a worker thread as soon as each document finishes, so
+                post-processing overlaps with the remaining uploads
+
+        Returns:
+            dict: pdf_path -> list of documents, or the exception that failed it
+        """
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        results = {}
+
+        async def run(pdf_path):
+            async with semaphore:
+                self.stats['submitted'] += 1
+                try:
+                    documents = await self.parse(pdf_path)
+                except Exception as e:
+                    self.stats['failed'] += 1
+                    results[pdf_path] = e
+                    if on_complete:
+                        await asyncio.to_thread(on_complete, pdf_path, None, e)
+                    return
+
+            self.stats['completed'] += 1
+            results[pdf_path] = documents
+            if on_complete:
+                await asyncio.to_thread(on_complete, pdf_path, documents, None)
+
+        await asyncio.gather(*(run(pdf_path) for pdf_path in pdf_paths))
+        return results
+
+
+def extract_to_directory(output_dir):
+    """
+    on_complete callback writing each parsed document's tables into
+    output_dir/<pdf stem>/ with extract_and_save_tables
+    """
+    def on_complete(pdf_path, documents, error):
+        name = os.path.splitext(os.path.basename(pdf_path))[0]
+        if error is not None:
+            print(f"Failed to parse {name}: {error}")
+            return
+        # Like doc_index, only the first pages are searched, not the references
+        doi = find_doi('\n'.join(doc.text for doc in documents[:DOI_SEARCH_PAGES]))
+        extract_and_save_tables(documents, doi=doi, sink=DirectorySink(os.path.join(output_dir, name)))
+
+    return on_complete
+
+
+async def submit_and_extract(pdf_paths, output_dir, **options):
+    """
+    Parse all PDFs concurrently and extract their tables as they complete
+
+    Returns:
+        dict: Submitter statistics including documents per second
+    """
+    start = time.perf_counter()
+    async with AsyncLlamaParseSubmitter(**options) as submitter:
+        await submitter.parse_many(pdf_paths, on_complete=extract_to_directory(output_dir))
+    elapsed = time.perf_counter() - start
+    return dict(submitter.stats, seconds=elapsed,
+                documents_per_second=submitter.stats['completed'] / elapsed if elapsed else None)
+
+
+if __name__ == '__main__':
+    # Standalone: every page goes to LlamaParse, without the tiers, document
+    # index or table store of the service pipeline (see batch.py for those)
+    arg_parser = argparse.ArgumentParser(description='Parse PDFs concurrently with LlamaParse and extract their tables')
+    arg_parser.add_argument('input_dir', help='Directory of PDFs')
+    arg_parser.add_argument('output_dir', help='Directory receiving one sub-directory of tables per PDF')
+    arg_parser.add_argument('--in-flight', type=int, default=8, help='Maximum documents parsed at once')
+    arg_parser.add_argument('--rps', type=float, default=5.0, help='Request budget per second (0 = unlimited)')
+    arg_parser.add_argument('--retries', type=int, default=5)
+    arg_parser.add_argument('--base-url', default=None, help='LlamaParse API base URL (e.g. a local mock server)')
+    args = arg_parser.parse_args()
+
+    pdf_paths = sorted(os.path.join(args.input_dir, f) for f in os.listdir(args.input_dir)
+                       if f.lower().endswith('.pdf'))
+    stats = asyncio.run(submit_and_extract(
+        pdf_paths, args.output_dir,
+        base_url=args.base_url, max_in_flight=args.in_flight,
+        requests_per_second=args.rps, max_retries=args.retries
+    ))
+    print(stats)
@@ -1,75 +1,172 @@
-import pprint
-
-from flask import Flask, request, jsonify, send_file, make_response, render_template
+from flask import Flask, Response, request, jsonify, send_file, render_template, url_for, g
+from werkzeug.exceptions import RequestEntityTooLarge
 from dotenv import load_dotenv
-import camelot
 import pandas as pd
 import numpy as np
 import os
+import shutil
 import tempfile
 import zipfile
-import io
 import re
-import pdfplumber
-from extract_complex_pdf import extract_and_save_tables
-from llama_parse import LlamaParse
-from llama_index.core import SimpleDirectoryReader
-import nest_asyncio
+import time
+import itertools
+import threading
+import weakref
+import multiprocessing
+from functools import partial
+from extract_complex_pdf import save_tables_iter
+from table_store import configured_store
+from result_cache import ResultCache, make_cache_key
+from jobs import JobManager, QueueFullError
+from pdf_session import PdfSession
+from page_cache import configured_page_cache, private_dir
+from doc_index import configured_document_index, extract_document_metadata
+from layout_templates import MAX_TEMPLATE_ROWS, LayoutTemplateRegistry, configured_layout_templates, merge_row
+from page_filter import PAGE_FILTER_ENABLED, PAGE_FILTER_THRESHOLD
+from value_parser import numeric_mask
+from parser_backends import (ParsedDocument, configured_backend_name, get_backend, parse_document_pages,
+                             parse_document_windows, parse_documents, table_to_markdown)
+from memory_guard import MAX_RSS_BYTES, PAGE_WINDOW
+from zip_stream import ZipSink, iter_zip, write_directory
+from table_events import TableEventSink, sse_event, zip_table_payloads
+from uploads import MAX_BATCH_UPLOAD_BYTES, MAX_UPLOAD_BYTES, UploadRequest, UploadWorkspace, upload_hash
+from batch import run_batch, unpack_pdf_archive
+import metrics
+from metrics import span, timed
 
 load_dotenv()
 
-def extract_doi(pdf_path):
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            # Get the text from the first page
-            first_page = pdf.pages[0]
-            text = first_page.extract_text()
-
-            if not text:
-                return None  # Return None if no text is found
+# 'text' writes cells as extracted; 'typed' splits mean±SD cells into float
+# mean/SD and significance-letter columns
+OUTPUT_MODE = os.getenv('OUTPUT_MODE', 'text')
+
+# 'csv' writes a CSV and metadata JSON per table; 'parquet' writes one
+# tables.parquet per PDF. /extract-tables accepts a per-request ?format=
+OUTPUT_FORMATS = ('csv', 'parquet')
+OUTPUT_FORMAT = os.getenv('OUTPUT_FORMAT', 'csv')
+
+# Optional append-only Parquet dataset collecting every extracted table
+table_store = configured_store()
+
+# Tiered extraction: pages whose Camelot tables pass table scoring are taken
+# from Camelot, only the other candidate pages go to the markdown parser
+# backend. 0 hands whole documents to the backend instead.
+TIERED_EXTRACTION = os.getenv('TIERED_EXTRACTION', '1') == '1'
+# Camelot tables with a larger share of empty cells (percent) are not accepted
+CAMELOT_MAX_WHITESPACE = float(os.getenv('CAMELOT_MAX_WHITESPACE', '50'))
+# Parser backend retrying the candidate pages Camelot gave up on after
+# PAGE_TIMEOUT / DOCUMENT_TIMEOUT (e.g. 'pdfplumber'); empty leaves them out
+PAGE_TIMEOUT_RETRY = os.getenv('PAGE_TIMEOUT_RETRY', '')
+
+# Rows that are mostly measured values with significance letters ('9.77±0.11g')
+# are data, never header rows. Header detection before tiered extraction took
+# them as headers, which made validate_and_clean_table_data reject such tables.
+# 0 restores the earlier header detection (bench.bench_cleaning compares both).
+HEADER_SKIP_VALUE_ROWS = os.getenv('HEADER_SKIP_VALUE_ROWS', '1') == '1'
+
+# Pages parsed per window by /extract-tables/stream before their tables are sent
+STREAM_PAGE_WINDOW = int(os.getenv('STREAM_PAGE_WINDOW', '1'))
+
+# Everything that changes the produced artefacts must be part of the cache key
+EXTRACTION_SETTINGS = {
+    'camelot_flavor': 'stream',
+    'parser': configured_backend_name(),
+    'result_type': 'markdown',
+    'do_not_unroll_columns': True,
+    'page_filter_threshold': PAGE_FILTER_THRESHOLD if PAGE_FILTER_ENABLED else None,
+    'camelot_max_whitespace': CAMELOT_MAX_WHITESPACE if TIERED_EXTRACTION else None,
+    'header_skip_value_rows': HEADER_SKIP_VALUE_ROWS,
+    'output_mode': OUTPUT_MODE,
+    'output_format': OUTPUT_FORMAT,
+}
+
+# Per-page results keyed by page content hash, reused when a revised PDF is uploaded
+page_cache = configured_page_cache()
+
+# File hash -> DOI/title/page count of every processed PDF
+doc_index = configured_document_index()
+
+# Header rows of known journal table layouts, learned as tables are cleaned
+layout_templates = configured_layout_templates()
+
+def extraction_settings(**overrides):
+    """
+    EXTRACTION_SETTINGS plus the version of the learned layout templates,
+    which change the header rows picked for matching tables
+    """
+    settings = dict(EXTRACTION_SETTINGS, layout_templates=layout_templates.version() if layout_templates else None)
+    settings.update(overrides)
+    return settings
 
-            # Combine all patterns into one for efficiency
-            patterns = [
-                r'http://dx\.doi\.org/[^\s]+',               # Pattern 1: dx.doi.org URL
-                r'(?:doi:|DOI:|https?://doi\.org/)[^\s]+',   # Pattern 2: General DOI patterns
-                r'DOI:\s*10\.\d{4,9}/[^\s]+'                 # Pattern 3: DOI with prefix "DOI: 10."
-            ]
+def result_cache_dir():
+    """
+    RESULT_CACHE_DIR, by default a directory of this user's in the temp
+    directory. Cached ZIPs are served for later uploads, so no other user may
+    be able to plant files in it (see page_cache.private_dir); when the
+    default is taken by someone else a new private directory is used.
+    """
+    cache_dir = os.getenv('RESULT_CACHE_DIR')
+    if cache_dir:
+        return private_dir(cache_dir)
+    try:
+        return private_dir(os.path.join(tempfile.gettempdir(), f"amino-extract-cache-{os.getuid()}"))
+    except PermissionError as e:
+        print(f"Warning: {str(e)}, caching results in a new directory")
+        return tempfile.mkdtemp(prefix='amino-extract-cache-')
 
-            # Compile a single regex pattern
-            combined_pattern = '|'.join(patterns)
-            doi_match = re.search(combined_pattern, text)
+result_cache = ResultCache(
+    cache_dir=result_cache_dir(),
+    max_bytes=int(os.getenv('RESULT_CACHE_MAX_MB', '512')) * 1024 * 1024
+)
 
-            doi = doi_match.group(0) if doi_match else None
-            return doi
+def document_metadata(session, filename=None):
+    """
+    DOI, title and page count of the PDF open in session, looked up in the
+    document index by file hash before anything is extracted
 
+    Returns:
+        dict: See doc_index.DocumentIndex.lookup ('cached' and 'duplicates'
+        are only meaningful with the index enabled)
+    """
+    try:
+        if doc_index is not None:
+            return doc_index.lookup(session, filename)
+        return dict(extract_document_metadata(session), cached=False, duplicates=[])
     except Exception as e:
         print(f"Error extracting DOI and title: {str(e)}")
-        return None, None
+        return {'doi': None, 'doi_source': None, 'title': None, 'page_count': None, 'cached': False,
+                'duplicates': []}
 
-def validate_and_clean_table_data(df, doi=None, title=None):
+def extract_doi(session):
+    return document_metadata(session)['doi']
+
+@timed('cleaning')
+def validate_and_clean_table_data(df, doi=None, title=None, columns=None):
     """
     Enhanced validation and cleaning for complex table data with Sample column
-    and additional DOI and Title columns
+    and additional DOI and Title columns. columns are the optional Camelot
+    column boundaries used to match layout templates.
     """
     if df is None or df.empty:
         return None
 
-    # Make a copy to avoid modifying the original
-    df = df.copy()
-
-    # Clean all cell values
-    for col in df.columns:
-        df[col] = df[col].apply(clean_special_characters)
+    # Clean all cell values in one vectorised pass (also copies the frame)
+    df = clean_frame(df)
 
     # Remove completely empty rows and columns
     df = df.dropna(how='all', axis=0)
+    if columns is not None:
+        columns = [bounds for bounds, kept in zip(columns, df.notna().any(axis=0)) if kept]
     df = df.dropna(how='all', axis=1)
 
     if df.shape[0] < 3 or df.shape[1] < 2:
         return None
 
+    # Columns Camelot split inside a learned layout column are joined again
+    df, columns = apply_layout_columns(df, columns)
+
     # Identify and set headers
-    headers, header_idx = identify_column_headers(df)
+    headers, header_idx = identify_column_headers(df, columns)
 
     # Ensure first column is named "Sample"
     headers[0] = "Sample"
@@ -99,8 +196,40 @@ def validate_and_clean_table_data(df, doi=None, title=None):
 
     return data_df
 
-def extract_table_metadata(pdf_path, page_number):
-    tables = camelot.read_pdf(pdf_path, pages=str(page_number), flavor='stream')
+def leading_rows(df):
+    """
+    Cleaned cell strings of the first rows of a table, as layout templates see them
+    """
+    return [[clean_special_characters(str(v)) for v in row]
+            for row in df.iloc[:MAX_TEMPLATE_ROWS + 1].to_numpy(dtype=object)]
+
+def apply_layout_columns(df, columns):
+    """
+    Merge the pieces of a column Camelot split in two, when the table matches
+    a learned layout template whose column boundaries put them in one column
+
+    Returns:
+        tuple: The table and its column boundaries, unchanged unless merged
+    """
+    if layout_templates is None or not columns or df.empty:
+        return df, columns
+    template = layout_templates.match(leading_rows(df), columns)
+    if template is None or template['mapping'] == list(range(df.shape[1])):
+        return df, columns
+
+    mapping = template['mapping']
+    values = [merge_row(['' if pd.isna(v) else str(v) for v in row], mapping)
+              for row in df.to_numpy(dtype=object)]
+    merged = pd.DataFrame(values, index=df.index)
+    bounds = [(min(x0 for (x0, _), i in zip(columns, mapping) if i == column),
+               max(x1 for (_, x1), i in zip(columns, mapping) if i == column))
+              for column in range(len(template['edges']))]
+    print(f"Merged {df.shape[1]} table columns into {merged.shape[1]} per a layout template")
+    return merged, bounds
+
+def extract_table_metadata(session, page_number):
+    # Reuses the session's Camelot tables instead of re-parsing the page
+    tables = session.tables_on_page(page_number)
     if not tables:
         return None, None
 
@@ -127,6 +256,22 @@ def is_category_row(row):
     # Check if all other cells are empty
     return row.iloc[1:].isna().all() or (row.iloc[1:].astype(str).str.strip() == '').all()
 
+def category_row_mask(cleaned):
+    """
+    Vectorised is_category_row over a frame of cleaned cell strings
+
+    Returns:
+        numpy.ndarray: Boolean mask with one entry per row
+    """
+    values = cleaned.to_numpy(dtype=object)
+    if values.shape[1] == 0:
+        return np.zeros(values.shape[0], dtype=bool)
+
+    # Cleaned cells are already stripped and never missing
+    first_filled = values[:, 0] != ''
+    rest_empty = (values[:, 1:] == '').all(axis=1)
+    return first_filled & rest_empty
+
 def is_potential_table(df):
     """
     Enhanced check to determine if a DataFrame is likely to be a genuine table
@@ -145,9 +290,10 @@ def is_potential_table(df):
         row_consistency = non_empty_cells / len(df) > 0.3
         return row_consistency.mean() > 0.5
 
-    # Check for numeric content
+    # Check for numeric content: cells holding a number or a mean±SD value,
+    # found in one pass over the frame instead of coercing column by column
     def has_numeric_content(df):
-        numeric_ratio = df.apply(lambda x: pd.to_numeric(x, errors='coerce')).notna().mean().mean()
+        numeric_ratio = numeric_mask(df).mean(axis=0).mean()
         return numeric_ratio > 0.3
 
     # Combined checks
@@ -156,6 +302,19 @@ def is_potential_table(df):
             not df.iloc[:, 1:].isna().all().all())
 
 app = Flask(__name__)
+# Uploads are hashed while they are received and kept in memory when small
+app.request_class = UploadRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+
+PLUS_MINUS_PATTERN = r'[±\+\-]+'
+WHITESPACE_PATTERN = r'\s+'
+NUMERIC_SYMBOLS_PATTERN = r'^[\d\s±\-\+\.]+$'
+NUMBER_PATTERN = r'^\d*\.?\d+$'
+
+PLUS_MINUS_RE = re.compile(PLUS_MINUS_PATTERN)
+WHITESPACE_RE = re.compile(WHITESPACE_PATTERN)
+# Caption row of a table, e.g. "Table 2. Amino acid composition of ..."
+TABLE_CAPTION_RE = re.compile(r'Table\s+\d+\b', re.IGNORECASE)
 
 def clean_special_characters(text):
     """
@@ -166,11 +325,46 @@ def clean_special_characters(text):
 
     text = str(text).strip()
     # Replace various forms of plus-minus symbol
-    text = re.sub(r'[±\+\-]+', '±', text)
+    text = PLUS_MINUS_RE.sub('±', text)
     # Remove multiple spaces
-    text = re.sub(r'\s+', ' ', text)
+    text = WHITESPACE_RE.sub(' ', text)
     return text
 
+def clean_series(series):
+    """
+    Vectorised clean_special_characters over a Series of cell values
+
+    Returns:
+        pandas.Series: Cleaned strings (object dtype), '' for missing values
+    """
+    missing = series.isna().to_numpy()
+    cleaned = (series.astype(str)
+               .str.strip()
+               .str.replace(PLUS_MINUS_PATTERN, '±', regex=True)
+               .str.replace(WHITESPACE_PATTERN, ' ', regex=True))
+    values = cleaned.to_numpy(dtype=object)
+    values[missing] = ''
+    return pd.Series(values, index=series.index, dtype=object)
+
+def clean_frame(df, stringify=False):
+    """
+    Apply clean_special_characters to every cell of a DataFrame in one pass over
+    the flattened values instead of once per cell
+
+    Args:
+        df (pd.DataFrame): Table to clean
+        stringify (bool): Convert cells with astype(str) first, as the header and
+            category heuristics do row by row
+
+    Returns:
+        pd.DataFrame: New frame with the same index and columns
+    """
+    flat = pd.Series(df.to_numpy(dtype=object).ravel(), dtype=object)
+    if stringify:
+        flat = flat.astype(str)
+    values = clean_series(flat).to_numpy(dtype=object).reshape(df.shape)
+    return pd.DataFrame(values, index=df.index, columns=df.columns)
+
 def make_unique_headers(headers):
     """
     Ensure headers are unique by adding numbers to duplicates
@@ -192,187 +386,987 @@ def make_unique_headers(headers):
 
     return unique_headers
 
-def identify_column_headers(df):
+def combine_header_rows(rows):
+    """
+    Merge consecutive header rows cell by cell ('Amino' above 'acid' -> 'Amino acid')
     """
-    Enhanced function to identify column headers from complex tables
+    combined_headers = list(rows[0])
+    for values in rows[1:]:
+        for i, val in enumerate(values):
+            if val.strip() and combined_headers[i].strip():
+                combined_headers[i] = f"{combined_headers[i]} {val}".strip()
+            elif val.strip():
+                combined_headers[i] = val.strip()
+    return combined_headers
+
+def identify_column_headers(df, columns=None):
     """
+    Enhanced function to identify column headers from complex tables. Tables
+    whose layout matches a learned template (see layout_templates) take their
+    header rows from it; the others are scored row by row, and the result
+    teaches the template registry their layout.
+
+    Args:
+        df (pd.DataFrame): Table cells
+        columns (list): Optional Camelot column boundaries (table.cols), part
+            of the layout fingerprint
+    """
+    n_rows, n_cols = df.shape
     header_candidates = []
     header_idx = -1
 
-    # First pass: look for multiple header rows that might need to be combined
-    for idx, row in df.iterrows():
-        if row.isna().all():
-            continue
-
-        values = row.astype(str).apply(clean_special_characters)
-
-        # Skip rows that are mostly numbers or symbols
-        if values.str.match(r'^[\d\s\±\-\+\.]+$').mean() > 0.7:
-            continue
-
-        non_empty_ratio = values.str.len().gt(0).mean()
-        non_numeric_ratio = (~values.str.match(r'^\d*\.?\d+$')).mean()
-        avg_length = values.str.len().mean()
+    start = time.perf_counter()
+    leading = None
+    if layout_templates is not None and n_rows and n_cols:
+        leading = leading_rows(df)
+        template = layout_templates.match(leading, columns)
+        if template is not None and template['mapping'] == list(range(n_cols)):
+            headers = combine_header_rows(leading[template['header_start']:template['header_end'] + 1])
+            headers = make_unique_headers([clean_special_characters(h) for h in headers])
+            layout_templates.record(True, time.perf_counter() - start)
+            return headers, df.index[template['header_end']]
+
+    if n_rows and n_cols:
+        # Score every row at once on the flattened, cleaned cell values
+        cleaned = clean_frame(df, stringify=True)
+        flat = pd.Series(cleaned.to_numpy(dtype=object).ravel(), dtype=object)
+        lengths = flat.str.len().to_numpy(dtype=float).reshape(n_rows, n_cols)
+        symbols = flat.str.match(NUMERIC_SYMBOLS_PATTERN).to_numpy(dtype=bool).reshape(n_rows, n_cols)
+        numeric = flat.str.match(NUMBER_PATTERN).to_numpy(dtype=bool).reshape(n_rows, n_cols)
+
+        is_candidate = (
+            ~df.isna().all(axis=1).to_numpy() &
+            # Skip rows that are mostly numbers or symbols
+            ~(symbols.mean(axis=1) > 0.7) &
+            ((lengths > 0).mean(axis=1) > 0.3) &
+            ((~numeric).mean(axis=1) > 0.5) &
+            (lengths.mean(axis=1) < 50)
+        )
+        if HEADER_SKIP_VALUE_ROWS:
+            # ... or measured values with significance letters ('2.45±0.05b')
+            is_candidate &= ~(numeric_mask(cleaned).mean(axis=1) > 0.5)
 
-        if (non_empty_ratio > 0.3 and
-                non_numeric_ratio > 0.5 and
-                avg_length < 50):
-            header_candidates.append((idx, values))
+        rows = cleaned.to_numpy(dtype=object)
+        header_candidates = [(pos, df.index[pos], rows[pos].tolist()) for pos in np.flatnonzero(is_candidate)]
 
     if header_candidates:
-        # If we have multiple header rows, try to combine them
-        if len(header_candidates) > 1:
-            # Combine consecutive header rows
-            combined_headers = []
-            prev_idx = None
-            for idx, values in header_candidates:
-                if prev_idx is not None and idx - prev_idx > 1:
-                    break
-                if not combined_headers:
-                    combined_headers = values.tolist()
-                else:
-                    for i, val in enumerate(values):
-                        if val.strip() and combined_headers[i].strip():
-                            combined_headers[i] = f"{combined_headers[i]} {val}".strip()
-                        elif val.strip():
-                            combined_headers[i] = val.strip()
-                prev_idx = idx
-            header_idx = header_candidates[-1][0]
-            headers = combined_headers
-        else:
-            header_idx = header_candidates[0][0]
-            headers = header_candidates[0][1].tolist()
+        # Combine consecutive header rows
+        run = header_candidates[:1]
+        for candidate in header_candidates[1:]:
+            if candidate[1] - run[-1][1] > 1:
+                break
+            run.append(candidate)
+        headers = combine_header_rows([values for _, _, values in run])
+        header_idx = header_candidates[-1][1]
+
+        # Layouts whose header is one block of leading rows can become templates
+        if leading is not None and len(run) == len(header_candidates):
+            first, last = run[0][0], run[-1][0]
+            if last - first == len(run) - 1 and last < MAX_TEMPLATE_ROWS:
+                layout_templates.learn(leading, columns, int(first), int(last))
 
         # Clean and make headers unique
         headers = [clean_special_characters(h) for h in headers]
         headers = make_unique_headers(headers)
+    else:
+        # If no clear headers found, generate default ones
+        headers = make_unique_headers([f'Column_{i+1}' for i in range(df.shape[1])])
 
-        return headers, header_idx
-
-    # If no clear headers found, generate default ones
-    return make_unique_headers([f'Column_{i+1}' for i in range(df.shape[1])]), -1
+    if leading is not None:
+        layout_templates.record(False, time.perf_counter() - start)
+    return headers, header_idx
 
 def process_categories(df):
     """
-    Enhanced category processing with better error handling
+    Enhanced category processing with better error handling. Category rows are
+    detected for the whole frame at once and their label is forward-filled onto
+    the rows below them.
     """
     try:
-        processed_rows = []
-        current_category = None
+        if df.shape[1] == 0:
+            return df
 
-        for idx, row in df.iterrows():
-            row_values = row.astype(str).apply(clean_special_characters)
+        row_values = clean_frame(df, stringify=True)
+        is_category = category_row_mask(row_values)
+        if is_category.all():
+            return df
 
-            if is_category_row(row_values):
-                current_category = row_values.iloc[0].strip()
-                continue
+        # Category label in effect for every row (None before the first category)
+        categories = pd.Series(
+            np.where(is_category, row_values.iloc[:, 0].to_numpy(dtype=object), None),
+            dtype=object
+        ).ffill().to_numpy(dtype=object)
 
-            if current_category and not row_values.isna().all():
-                new_row = row.copy()
-                first_val = clean_special_characters(new_row.iloc[0])
-                if first_val:
-                    new_row.iloc[0] = f"{current_category} - {first_val}"
-                processed_rows.append(new_row)
-            elif not row_values.isna().all():
-                processed_rows.append(row)
-
-        if processed_rows:
-            result_df = pd.DataFrame(processed_rows)
-            result_df.columns = df.columns
-            return result_df
-        return df
+        result_df = df.loc[~is_category].copy()
+        categories = categories[~is_category]
+        first_vals = clean_series(result_df.iloc[:, 0]).to_numpy(dtype=object)
+
+        prefixed = pd.notna(categories) & (first_vals != '')
+        if prefixed.any():
+            first_col = result_df.iloc[:, 0].to_numpy(dtype=object).copy()
+            first_col[prefixed] = [f"{category} - {value}"
+                                   for category, value in zip(categories[prefixed], first_vals[prefixed])]
+            result_df.isetitem(0, first_col)
+
+        return result_df
 
     except Exception as e:
         print(f"Warning: Error in category processing - {str(e)}")
         return df
 
 
-@app.route('/extract-tables', methods=['POST'])
-def extract_tables():
+def parse_pdf(pdf_path, file_hash=None):
+    """
+    Run the parsing stages of the pipeline (page filter, Camelot, the markdown
+    parser backend and DOI detection) on a saved PDF. file_hash is the PDF's
+    SHA-256 if already known (see uploads.upload_hash), so it is not hashed again.
+
+    Returns:
+        dict: 'download_name', 'doi', 'page_parses', page filter, page reuse
+        and per-tier page counts and the parsed 'documents', or None if no
+        tables or structured data were found
+    """
+    if PAGE_WINDOW and (TIERED_EXTRACTION or get_backend().windowed):
+        parsed = _parse_pdf_windowed(pdf_path, PAGE_WINDOW, file_hash=file_hash)
+        # Parse windows until the first document, so that a PDF without any
+        # gives None as with a whole-document parse
+        documents = parsed['documents']
+        first = next(documents, None)
+        if first is None:
+            return None
+        parsed['documents'] = itertools.chain([first], documents)
+        return parsed
+
+    with PdfSession(pdf_path, page_cache=page_cache, file_hash=file_hash) as session:
+        parsed = _parse_pdf(session)
+        _record_session_counts(session, parsed if parsed is not None else {})
+        return parsed
+
+
+def _record_session_counts(session, parsed):
+    """
+    Log and export how much parse work a session cost and add the counts to parsed
+    """
+    reuse = session.reuse_counts
+    print(f"Page parses for {os.path.basename(session.pdf_path)}: {session.parse_counts}, "
+          f"pre-filter: {session.screen_counts}, reused pages: {reuse['pages_reused']}/{session.page_count}")
+    metrics.REGISTRY.inc('amino_pages_total', 'Pages of processed PDFs', session.page_count)
+    metrics.REGISTRY.inc('amino_pages_reused_total', 'Pages whose results came from the page cache',
+                         reuse['pages_reused'])
+    parsed['page_parses'] = session.page_parses
+    parsed['pages_timed_out'] = session.timed_out_pages
+    parsed.update(session.screen_counts)
+    parsed.update(reuse)
+
+
+def accepted_camelot_frame(table):
+    """
+    Cleaned frame of a Camelot table trusted without the markdown parser (it
+    looks like a data table, is not mostly empty cells and survives
+    cleaning), or None
+    """
+    df = table.df
+    if not is_potential_table(df):
+        return None
+    if table.parsing_report.get('whitespace', 0) > CAMELOT_MAX_WHITESPACE:
+        return None
+    return validate_and_clean_table_data(df, columns=table.cols)
+
+
+def camelot_table_caption(df):
+    """
+    Caption row ("Table 1. ...") among the first rows of a Camelot table, or None
+    """
+    for row in leading_rows(df):
+        line = ' '.join(cell for cell in row if cell)
+        if TABLE_CAPTION_RE.match(line):
+            return line
+    return None
+
+
+def camelot_table_markdown(table, frame):
+    """
+    Markdown of an accepted Camelot table: its caption line, where
+    extract_and_save_tables looks for the title, followed by the cleaned
+    frame (Sample header, categories applied) without the empty DOI and Title
+    columns, which are added when the table is saved
+    """
+    frame = frame.iloc[:, :-2]
+    markdown = table_to_markdown([list(frame.columns)] + frame.to_numpy(dtype=object).tolist())
+    caption = camelot_table_caption(table.df)
+    return f"{caption}\n{markdown}" if caption else markdown
+
+
+def tiered_documents(session, pages=None):
+    """
+    Page documents of the given pages (default: all), from the cheapest tier
+    that handles each page well:
+    - pages the pre-filter rejects are skipped, except pages without a text
+      layer (scanned pages), which go to the markdown parser backend for OCR,
+    - candidate pages whose Camelot tables all pass accepted_camelot_frame are
+      rendered from the cleaned tables (after the page text, for notes),
+    - the remaining candidate pages go to the markdown parser backend,
+    - candidate pages Camelot gave up on (see PdfSession.timed_out) go to the
+      PAGE_TIMEOUT_RETRY backend, or are left out when it is not set.
+
+    Returns:
+        tuple: (documents in page order, pages per tier {'camelot', 'parser',
+        'retry', 'timed_out', 'skipped'})
+    """
+    pages = list(pages) if pages is not None else list(range(1, session.page_count + 1))
+    candidates = session.candidate_pages(pages)
+
+    tables_by_page = {page: [] for page in candidates}
+    for table in session.read_candidate_tables(flavor='stream', pages=pages):
+        tables_by_page[int(table.page)].append(table)
+
+    accepted, rejected = [], []
+    frames_by_page = {}
+    timed_out = [page for page in candidates if page in session.timed_out]
+    with span('table_scoring'):
+        for page in candidates:
+            tables = tables_by_page[page]
+            if page in session.timed_out:
+                continue
+            frames = []
+            for table in tables:
+                frame = accepted_camelot_frame(table)
+                if frame is None:
+                    break
+                frames.append(frame)
+            if tables and len(frames) == len(tables):
+                accepted.append(page)
+                frames_by_page[page] = frames
+            else:
+                rejected.append(page)
+
+    documents = []
+    for page in accepted:
+        markdown = '\n\n'.join(camelot_table_markdown(table, frame)
+                                 for table, frame in zip(tables_by_page[page], frames_by_page[page]))
+        documents.append(ParsedDocument(session.page_text(page) + '\n\n' + markdown,
+                                        {'page_label': page, 'tier': 'camelot'}))
+    textless = session.textless_pages(pages)
+    parsed_pages = sorted(rejected + textless)
+    if parsed_pages:
+        documents.extend(parse_document_pages(session.pdf_path, parsed_pages, session))
+    retried = timed_out if PAGE_TIMEOUT_RETRY else []
+    if retried:
+        documents.extend(parse_document_pages(session.pdf_path, retried, session, backend=PAGE_TIMEOUT_RETRY))
+    documents.sort(key=lambda document: int(document.metadata.get('page_label', 0)))
+
+    tiers = {'camelot': len(accepted), 'parser': len(parsed_pages), 'retry': len(retried),
+             'timed_out': len(timed_out) - len(retried), 'skipped': len(pages) - len(candidates) - len(textless)}
+    for tier, count in tiers.items():
+        metrics.REGISTRY.inc('amino_tier_pages_total', 'Pages handled by each extraction tier', count, tier=tier)
+    return documents, tiers
+
+
+def _parse_pdf_windowed(pdf_path, window, file_hash=None):
+    """
+    Bounded-memory variant of parse_pdf: 'documents' is a generator parsing
+    window pages at a time while the result is being written, releasing
+    each window before the next one is loaded. The page counts are only known
+    (and filled in) once the generator is exhausted, and a PDF without tables
+    gives no documents instead of None (parse_pdf checks for that).
+    """
+    session = PdfSession(pdf_path, page_cache=page_cache, file_hash=file_hash)
+    try:
+        with span('doi'):
+            metadata = document_metadata(session, os.path.basename(pdf_path))
+    except Exception:
+        session.close()
+        raise
+
+    parsed = {'download_name': 'llama_extracted_tables.zip', 'doi': metadata['doi'], 'title': metadata['title'],
+              'duplicates': metadata['duplicates'], 'file_hash': store_file_hash(session), 'page_parses': None,
+              'pages_screened': None, 'pages_parsed': None, 'pages_reused': None, 'page_reuse_ratio': None,
+              'page_tiers': None, 'pages_timed_out': None}
+
+    tiers = {'camelot': 0, 'parser': 0, 'retry': 0, 'timed_out': 0, 'skipped': 0}
+
+    def parse_window(pages):
+        documents, window_tiers = tiered_documents(session, pages)
+        for tier, count in window_tiers.items():
+            tiers[tier] += count
+        return documents
+
+    def documents():
+        try:
+            yield from parse_document_windows(pdf_path, session, window, MAX_RSS_BYTES,
+                                              parse=parse_window if TIERED_EXTRACTION else None)
+            _record_session_counts(session, parsed)
+            if TIERED_EXTRACTION:
+                parsed['page_tiers'] = tiers
+        finally:
+            session.close()
+
+    parsed['documents'] = documents()
+    return parsed
+
+
+def store_file_hash(session):
+    """
+    Hash of the session's PDF its tables are stored under in the table store
+    (None without a store, so the file is not hashed for nothing)
+    """
+    return session.file_hash if table_store is not None else None
+
+
+def _parse_pdf(session):
+    pdf_path = session.pdf_path
+
+    if TIERED_EXTRACTION:
+        documents, tiers = tiered_documents(session)
+    else:
+        documents, tiers = parse_documents(pdf_path, session), None
+
+    with span('doi'):
+        metadata = document_metadata(session, os.path.basename(pdf_path))
+    doi = metadata['doi']
+
+    print(doi)
+    if tiers is not None:
+        print(f"Pages per tier: {tiers}")
+    if metadata['duplicates']:
+        print(f"DOI {doi} was already extracted from: "
+              f"{', '.join(d['filename'] or d['file_hash'] for d in metadata['duplicates'])}")
+
+    if not documents:
+        return None
+
+    return {'download_name': 'llama_extracted_tables.zip', 'doi': doi, 'title': metadata['title'],
+            'duplicates': metadata['duplicates'], 'file_hash': store_file_hash(session), 'documents': documents,
+            'page_tiers': tiers}
+
+
+def write_result(parsed, sink, output_format=OUTPUT_FORMAT):
+    """
+    Write the result files of a parsed PDF into sink, yielding after each table
+    so the output can be streamed while it is produced
+    """
+    yield from save_tables_iter(parsed['documents'], parsed['doi'], sink, output_mode=OUTPUT_MODE,
+                                output_format=output_format, store=table_store, file_hash=parsed['file_hash'])
+
+
+def run_extraction(pdf_path, sink, output_format=OUTPUT_FORMAT, file_hash=None):
+    """
+    Run the full extraction pipeline on a saved PDF, writing the result files
+    into sink (file_hash: see parse_pdf)
+
+    Returns:
+        dict: 'download_name', 'doi', 'page_parses' and the seconds spent per
+        pipeline 'stages' of the result, or None if no tables or structured
+        data were found
+    """
+    with metrics.collect_stages() as stages:
+        parsed = parse_pdf(pdf_path, file_hash=file_hash)
+        if parsed is None:
+            return None
+
+        for _ in write_result(parsed, sink, output_format=output_format):
+            pass
+    return {'download_name': parsed['download_name'], 'doi': parsed['doi'], 'page_parses': parsed['page_parses'],
+            'pages_screened': parsed['pages_screened'], 'pages_parsed': parsed['pages_parsed'],
+            'pages_reused': parsed['pages_reused'], 'page_reuse_ratio': parsed['page_reuse_ratio'],
+            'page_tiers': parsed['page_tiers'], 'pages_timed_out': parsed['pages_timed_out'],
+            'title': parsed['title'], 'duplicates': parsed['duplicates'], 'stages': stages}
+
+
+def run_extraction_job(pdf_path, result_path, file_hash=None):
+    """
+    Job worker entry point: run the pipeline in a pool process and write the
+    ZIP next to the job's PDF instead of sending it back through the pool
+    """
+    with open(result_path, 'wb') as f, ZipSink(f) as sink:
+        result = run_extraction(pdf_path, sink, file_hash=file_hash)
+
+    if result is None:
+        os.remove(result_path)
+    return result
+
+
+def with_layout_templates(snapshot, extract_fn, *args, **kwargs):
+    """
+    Run extract_fn in a pool process with a read-only copy of the layout
+    templates of the process that submitted it (None without templates)
+    """
+    global layout_templates
+    layout_templates = LayoutTemplateRegistry.from_snapshot(snapshot) if snapshot is not None else None
+    return extract_fn(*args, **kwargs)
+
+
+def pool_extraction(extract_fn):
+    """
+    extract_fn bound to a snapshot of this process's layout templates, so
+    that pool processes neither learn templates of their own (nor overwrite
+    LAYOUT_TEMPLATES_PATH) nor give results of another template version than
+    their cache key
+
+    Returns:
+        tuple: (picklable function, its extraction settings for the cache key)
+    """
+    snapshot = layout_templates.snapshot() if layout_templates is not None else None
+    settings = extraction_settings(layout_templates=snapshot['version'] if snapshot else None)
+    return partial(with_layout_templates, snapshot, extract_fn), settings
+
+
+def stream_result(parsed, cache_key, output_format=OUTPUT_FORMAT):
+    """
+    Stream the result ZIP of a parsed PDF chunk by chunk, teeing it into the
+    result cache once it is complete. Results missing pages that timed out are
+    not cached, so the next upload tries those pages again.
+    """
+    sink = ZipSink()
+    fd, tmp_path = tempfile.mkstemp(suffix='.zip', dir=result_cache.cache_dir)
+    try:
+        with os.fdopen(fd, 'wb') as cache_file:
+            for chunk in iter_zip(sink, write_result(parsed, sink, output_format=output_format)):
+                cache_file.write(chunk)
+                yield chunk
+        if not parsed['pages_timed_out']:
+            result_cache.put_file(cache_key, tmp_path, parsed['download_name'], {'doi': parsed['doi']})
+    finally:
+        os.remove(tmp_path)
+
+
+def stream_table_events(pdf_path, cache_key, file_hash=None):
+    """
+    Server-Sent Events of a saved PDF: a 'table' event per table as soon as
+    the STREAM_PAGE_WINDOW pages holding it are parsed, then a 'summary' event
+    (or an 'error' event). The same files go into a CSV result ZIP that is
+    stored in the result cache once complete.
+    """
+    start = time.perf_counter()
+    fd, tmp_path = tempfile.mkstemp(suffix='.zip', dir=result_cache.cache_dir)
+    # Owned by a file object at once, so the finally closes it even when
+    # parsing fails before the ZIP is written
+    f = os.fdopen(fd, 'wb')
+    try:
+        with metrics.collect_stages() as stages:
+            parsed = _parse_pdf_windowed(pdf_path, STREAM_PAGE_WINDOW, file_hash=file_hash)
+            tables = 0
+            first_table_seconds = None
+            with f, ZipSink(f) as zip_sink:
+                sink = TableEventSink(zip_sink)
+                for base_filename in save_tables_iter(parsed['documents'], parsed['doi'], sink,
+                                                      output_mode=OUTPUT_MODE, output_format='csv',
+                                                      store=table_store, file_hash=parsed['file_hash']):
+                    if first_table_seconds is None:
+                        first_table_seconds = time.perf_counter() - start
+                    tables += 1
+                    yield sse_event('table', sink.pop_table(base_filename))
+
+        # Like /extract-tables, a PDF without tables or with pages that timed
+        # out is not cached
+        if tables and not parsed['pages_timed_out']:
+            result_cache.put_file(cache_key, tmp_path, parsed['download_name'], {'doi': parsed['doi']})
+        summary = {key: parsed[key] for key in ('doi', 'title', 'duplicates', 'page_parses', 'pages_screened',
+                                                'pages_parsed', 'pages_reused', 'page_reuse_ratio', 'page_tiers',
+                                                'pages_timed_out')}
+        summary.update(tables=tables, cached=False, seconds=time.perf_counter() - start,
+                       first_table_seconds=first_table_seconds, stages=stages)
+        yield sse_event('summary', summary)
+    except Exception as e:
+        yield sse_event('error', {'error': str(e)})
+    finally:
+        f.close()
+        os.remove(tmp_path)
+
+
+def replay_table_events(cached):
+    """
+    Server-Sent Events of a result served from the result cache
+    """
+    tables = 0
+    with cached['file']:
+        for payload in zip_table_payloads(cached['file']):
+            tables += 1
+            yield sse_event('table', payload)
+    yield sse_event('summary', {'doi': cached['metadata'].get('doi'), 'tables': tables, 'cached': True})
+
+
+def cache_job_result(job):
+    """
+    Store a finished job's ZIP in the result cache and record the stage
+    timings measured in the pool process
+    """
+    metrics.observe_stages(job.get('stages'))
+    if job['cache_key'] and not job.get('pages_timed_out'):
+        result_cache.put_file(job['cache_key'], job['result_path'], job['download_name'], {'doi': job.get('doi')})
+
+
+BATCH_DIR = os.getenv('BATCH_DIR', os.path.join(tempfile.gettempdir(), 'amino-extract-batches'))
+
+# Identical archives share a resumable working directory, one request at a time
+_batch_locks = weakref.WeakValueDictionary()
+_batch_locks_lock = threading.Lock()
+
+
+def batch_lock(batch_hash):
+    """
+    Lock of the working directory of one batch archive
+    """
+    with _batch_locks_lock:
+        lock = _batch_locks.get(batch_hash)
+        if lock is None:
+            lock = _batch_locks[batch_hash] = threading.Lock()
+        return lock
+
+job_manager = JobManager(
+    worker_fn=run_extraction_job,
+    jobs_dir=os.getenv('JOBS_DIR', os.path.join(tempfile.gettempdir(), 'amino-extract-jobs')),
+    max_workers=int(os.getenv('JOB_WORKERS', '0')) or None,
+    max_pending=int(os.getenv('JOB_QUEUE_SIZE', '16')),
+    on_complete=cache_job_result
+)
+
+
+def get_uploaded_pdf():
+    """
+    Validate the uploaded file of the current request
+
+    Returns:
+        tuple: (file, None) on success or (None, error response)
+    """
     if 'file' not in request.files:
-        return jsonify({"error": "No file provided"}), 400
+        return None, (jsonify({"error": "No file provided"}), 400)
 
     file = request.files['file']
     if file.filename == '':
-        return jsonify({"error": "No selected file"}), 400
+        return None, (jsonify({"error": "No selected file"}), 400)
 
     if not file.filename.endswith('.pdf'):
-        return jsonify({"error": "File format not supported, please upload a PDF"}), 400
+        return None, (jsonify({"error": "File format not supported, please upload a PDF"}), 400)
+
+    return file, None
 
+
+def profiling_requested():
+    """
+    Whether the current request asked for a cProfile dump (only honoured when
+    PROFILE_DIR is set)
+    """
+    return request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    limit = request.max_content_length
+    return jsonify({"error": f"Upload exceeds the {limit // (1024 * 1024)} MB limit"}), 413
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or 'unknown'
+    metrics.REGISTRY.inc('amino_http_requests_total', 'HTTP requests by endpoint and status',
+                         endpoint=endpoint, method=request.method, status=response.status_code)
+    started = g.get('request_started')
+    if started is not None:
+        metrics.REGISTRY.histogram('amino_http_request_duration_seconds',
+                                   'Time until the response is returned (streamed bodies excluded)',
+                                   endpoint=endpoint).observe(time.perf_counter() - started)
+    return response
+
+
+@app.route('/extract-tables', methods=['POST'])
+def extract_tables():
+    file, error = get_uploaded_pdf()
+    if error:
+        return error
+
+    output_format = request.values.get('format', OUTPUT_FORMAT)
+    if output_format not in OUTPUT_FORMATS:
+        return jsonify({"error": f"Unsupported format '{output_format}', use one of {', '.join(OUTPUT_FORMATS)}"}), 400
+
+    profile = metrics.start_profile(profiling_requested())
+    streaming = False
+    workspace = None
     try:
-        # Save the file temporarily
-        temp_pdf_path = os.path.join(tempfile.gettempdir(), file.filename)
-        file.save(temp_pdf_path)
-
-        # First, try extracting tables using Camelot
-        tables = camelot.read_pdf(temp_pdf_path, pages='all', flavor='stream')
-
-        flag = False
-        if flag and tables and len(tables) > 0:
-            temp_zip_stream = io.BytesIO()
-            with zipfile.ZipFile(temp_zip_stream, 'w') as temp_zip:
-                for i, table in enumerate(tables):
-                    try:
-                        df = table.df
-                        csv_stream = io.StringIO()
-                        df.to_csv(csv_stream, index=False)
-                        csv_stream.seek(0)
-                        csv_filename = f"Table_{i + 1}.csv"
-                        temp_zip.writestr(csv_filename, csv_stream.read())
-                    except Exception as e:
-                        print(f"Error processing Table {i+1}: {str(e)}")
-                        continue
-            temp_zip_stream.seek(0)
-            return send_file(
-                temp_zip_stream,
+        # Serve repeat uploads of the same PDF straight from the result cache,
+        # without writing the upload to disk
+        with span('cache_lookup'):
+            settings = extraction_settings(output_format=output_format)
+            file_hash = upload_hash(file)
+            cache_key = make_cache_key(file_hash, settings)
+            cached = result_cache.get(cache_key)
+        if cached:
+            response = send_file(
+                cached['file'],
                 mimetype='application/zip',
                 as_attachment=True,
-                download_name='camelot_tables.zip'
+                download_name=cached['download_name']
             )
+            response.headers['X-Cache'] = 'HIT'
+            return response
 
-        print("Exectuing LLAma")
-        # If no tables are found, fallback to Llama-based extraction
-        parser = LlamaParse(do_not_unroll_columns=True, result_type="markdown")
-        nest_asyncio.apply()
-        documents = SimpleDirectoryReader(input_files=[temp_pdf_path], file_extractor={".pdf": parser}).load_data()
-        pprint.pprint(documents)
+        # Save the file into a directory of its own
+        workspace = UploadWorkspace()
+        with span('upload_save'):
+            pdf_path = workspace.save(file)
 
-        doi = extract_doi(temp_pdf_path)
+        parsed = parse_pdf(pdf_path, file_hash=file_hash)
+        if parsed is None:
+            return jsonify({"message": "No tables or structured data found in the PDF"}), 200
 
-        print(doi)
+        # The archive is built while it is sent, one table at a time
+        body = stream_result(parsed, cache_key, output_format=output_format)
+        if parsed['page_parses'] is None:
+            # Bounded-memory mode only knows the page counts once every window
+            # is parsed, so its archive is spooled to disk and sent after that
+            spooled = tempfile.TemporaryFile(suffix='.zip', dir=result_cache.cache_dir)
+            try:
+                for chunk in body:
+                    spooled.write(chunk)
+                spooled.seek(0)
+            except Exception:
+                spooled.close()
+                raise
+            response = send_file(spooled, mimetype='application/zip', as_attachment=True,
+                                 download_name=parsed['download_name'])
+        else:
+            if profile:
+                body = metrics.profile_iter(profile, body, file.filename)
+                streaming = True
+            response = Response(body, mimetype='application/zip')
+            response.headers['Content-Disposition'] = f"attachment; filename={parsed['download_name']}"
+        response.headers['X-Cache'] = 'MISS'
+        response.headers['X-Page-Parses'] = str(parsed['page_parses'])
+        response.headers['X-Pages-Screened'] = str(parsed['pages_screened'])
+        response.headers['X-Pages-Parsed'] = str(parsed['pages_parsed'])
+        response.headers['X-Pages-Reused'] = str(parsed['pages_reused'])
+        response.headers['X-Page-Reuse-Ratio'] = f"{parsed['page_reuse_ratio']:.3f}"
+        if parsed['page_tiers'] is not None:
+            response.headers['X-Page-Tiers'] = ', '.join(f"{tier}={count}"
+                                                         for tier, count in parsed['page_tiers'].items())
+        if parsed['pages_timed_out']:
+            response.headers['X-Pages-Timed-Out'] = ', '.join(f"{page['page']}={page['reason']}"
+                                                              for page in parsed['pages_timed_out'])
+        if parsed['doi']:
+            response.headers['X-DOI'] = parsed['doi']
+        if parsed['duplicates']:
+            response.headers['X-Duplicate-Of'] = ', '.join(d['file_hash'] for d in parsed['duplicates'])
+
+        # The body may still read the PDF (bounded-memory mode), so the
+        # workspace is removed once the response is closed, even if the
+        # client disconnects mid-download
+        response.call_on_close(workspace.cleanup)
+        workspace = None
+        return response
 
-        if not documents:
-            return jsonify({"message": "No tables or structured data found in the PDF"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if workspace is not None:
+            workspace.cleanup()
+        if profile:
+            # A streamed body keeps profiling until it is exhausted
+            if streaming:
+                profile.disable()
+            else:
+                metrics.dump_profile(profile, file.filename)
+
+
+@app.route('/extract-tables/stream', methods=['POST'])
+def extract_tables_stream():
+    """
+    Server-Sent Events variant of /extract-tables: each cleaned table is sent
+    as JSON rows with its metadata as soon as its page is done, followed by a
+    summary event, instead of one ZIP once the whole document is done
+    """
+    file, error = get_uploaded_pdf()
+    if error:
+        return error
 
-        output_dir = tempfile.mkdtemp()
-        extract_and_save_tables(documents, output_dir=output_dir, doi=doi)
-
-        # Zip the extracted tables
-        temp_zip_stream = io.BytesIO()
-        with zipfile.ZipFile(temp_zip_stream, 'w') as temp_zip:
-            for root, _, files in os.walk(output_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    temp_zip.write(file_path, os.path.relpath(file_path, output_dir))
-
-        temp_zip_stream.seek(0)
-        return send_file(
-            temp_zip_stream,
-            mimetype='application/zip',
-            as_attachment=True,
-            download_name='llama_extracted_tables.zip'
-        )
+    workspace = None
+    try:
+        settings = extraction_settings(output_format='csv')
+        file_hash = upload_hash(file)
+        cache_key = make_cache_key(file_hash, settings)
+        cached = result_cache.get(cache_key)
+        if cached:
+            body = replay_table_events(cached)
+        else:
+            workspace = UploadWorkspace()
+            with span('upload_save'):
+                pdf_path = workspace.save(file)
+            body = stream_table_events(pdf_path, cache_key, file_hash=file_hash)
+
+        response = Response(body, mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        # Keep reverse proxies (nginx) from buffering the events
+        response.headers['X-Accel-Buffering'] = 'no'
+        response.headers['X-Cache'] = 'HIT' if cached else 'MISS'
+        if cached:
+            # Closed even if the client leaves before the events start
+            response.call_on_close(cached['file'].close)
+        if workspace is not None:
+            response.call_on_close(workspace.cleanup)
+            workspace = None
+        return response
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
-        if os.path.exists(temp_pdf_path):
-            os.remove(temp_pdf_path)
+        if workspace is not None:
+            workspace.cleanup()
+
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    file, error = get_uploaded_pdf()
+    if error:
+        return error
+
+    job_id = job_manager.new_job_id()
+    job_dir = job_manager.job_dir(job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    pdf_path = os.path.join(job_dir, 'input.pdf')
+
+    try:
+        worker_fn, settings = pool_extraction(run_extraction_job)
+        file_hash = upload_hash(file)
+        cache_key = make_cache_key(file_hash, settings)
+        cached = result_cache.get(cache_key)
+        if cached:
+            with cached['file']:
+                job_manager.add_completed(job_id, file.filename, cached['file'], cached['download_name'])
+        else:
+            with span('upload_save'):
+                file.save(pdf_path)
+            job_manager.submit(job_id, pdf_path, file.filename, cache_key=cache_key,
+                               worker_fn=partial(worker_fn, file_hash=file_hash))
+    except QueueFullError as e:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        response = jsonify({"error": str(e), "queue": job_manager.stats()})
+        response.headers['Retry-After'] = '5'
+        return response, 429
+    except Exception as e:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        return jsonify({"error": str(e)}), 500
+
+    response = jsonify(job_manager.get(job_id))
+    response.headers['Location'] = url_for('get_job', job_id=job_id)
+    return response, 202
+
+
+@app.route('/jobs', methods=['GET'])
+def job_stats():
+    return jsonify(job_manager.stats())
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+
+    if job['status'] in ('queued', 'running'):
+        return jsonify(job), 202
+    if job['status'] == 'failed':
+        return jsonify({"error": job['error']}), 500
+    if job['status'] == 'empty':
+        return jsonify({"message": "No tables or structured data found in the PDF"}), 200
+
+    return send_file(
+        os.path.join(job_manager.job_dir(job_id), 'result.zip'),
+        mimetype='application/zip',
+        as_attachment=True,
+        download_name=job['download_name']
+    )
+
+
+@app.route('/extract-batch', methods=['POST'])
+def extract_batch():
+    # Archives of many PDFs may exceed the single-PDF upload limit
+    request.max_content_length = MAX_BATCH_UPLOAD_BYTES
+    if 'file' not in request.files:
+        return jsonify({"error": "No file provided"}), 400
+
+    file = request.files['file']
+    if not file.filename.lower().endswith('.zip'):
+        return jsonify({"error": "Please upload a ZIP archive of PDFs"}), 400
+
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    fd, archive_path = tempfile.mkstemp(suffix='.zip', dir=BATCH_DIR)
+    os.close(fd)
+
+    result_dir = None
+    try:
+        with span('upload_save'):
+            file.save(archive_path)
+
+        # Re-uploading the same archive after an interruption (e.g. a restart)
+        # resumes the batch; identical uploads in flight wait for each other
+        batch_hash = upload_hash(file)[:16]
+        batch_dir = os.path.join(BATCH_DIR, batch_hash)
+        with batch_lock(batch_hash):
+            input_dir = os.path.join(batch_dir, 'input')
+            output_dir = os.path.join(batch_dir, 'output')
+            if unpack_pdf_archive(archive_path, input_dir) == 0:
+                shutil.rmtree(batch_dir, ignore_errors=True)
+                return jsonify({"error": "The archive does not contain any PDF"}), 400
+
+            # The pool is started by a fork server, not forked from this threaded worker
+            manifest = run_batch(input_dir, output_dir, pool_extraction(run_extraction)[0],
+                                 max_workers=job_manager.max_workers,
+                                 mp_context=multiprocessing.get_context('forkserver'))
+
+            # The finished output moves to a directory owned by this response
+            result_dir = tempfile.mkdtemp(prefix='result-', dir=BATCH_DIR)
+            os.replace(output_dir, os.path.join(result_dir, 'output'))
+            shutil.rmtree(batch_dir, ignore_errors=True)
+    except zipfile.BadZipFile:
+        return jsonify({"error": "File is not a valid ZIP archive"}), 400
+    except Exception as e:
+        if result_dir is not None:
+            shutil.rmtree(result_dir, ignore_errors=True)
+        return jsonify({"error": str(e)}), 500
+    finally:
+        os.remove(archive_path)
+
+    def generate():
+        sink = ZipSink()
+        yield from iter_zip(sink, write_directory(os.path.join(result_dir, 'output'), sink))
+
+    response = Response(generate(), mimetype='application/zip')
+    response.headers['Content-Disposition'] = 'attachment; filename=batch_extracted_tables.zip'
+    rate = manifest['stats']['documents_per_second']
+    if rate:
+        response.headers['X-Documents-Per-Second'] = f"{rate:.3f}"
+    # Removed once the response is closed, even if the client disconnects
+    response.call_on_close(lambda: shutil.rmtree(result_dir, ignore_errors=True))
+    return response
+
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+
+@app.route('/templates/stats', methods=['GET'])
+def template_stats():
+    if layout_templates is None:
+        return jsonify({"error": "Layout templates are disabled (LAYOUT_TEMPLATES=0)"}), 404
+    return jsonify(layout_templates.stats())
+
+
+@app.route('/documents', methods=['GET'])
+def documents_lookup():
+    """
+    Look up the document index by ?doi= (every file with that DOI) or ?hash=
+    (one file's SHA-256); without either, return index statistics
+    """
+    if doc_index is None:
+        return jsonify({"error": "The document index is disabled (DOC_INDEX=0)"}), 404
+
+    doi = request.args.get('doi')
+    file_hash = request.args.get('hash')
+    if doi:
+        return jsonify({'doi': doi, 'documents': doc_index.find_by_doi(doi)})
+    if file_hash:
+        document = doc_index.get(file_hash)
+        if document is None:
+            return jsonify({"error": "Unknown file hash"}), 404
+        return jsonify(document)
+    return jsonify(doc_index.stats())
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    cache = result_cache.stats()
+    jobs = job_manager.stats()
+    samples = [
+        ('amino_cache_hits_total', 'counter', 'Result cache hits', cache['hits']),
+        ('amino_cache_misses_total', 'counter', 'Result cache misses', cache['misses']),
+        ('amino_cache_evictions_total', 'counter', 'Results evicted from the cache', cache['evictions']),
+        ('amino_cache_entries', 'gauge', 'Results held in the result cache', cache['entries']),
+        ('amino_cache_size_bytes', 'gauge', 'Size of the result cache', cache['size_bytes']),
+        ('amino_jobs_queue_depth', 'gauge', 'Jobs waiting for a worker', jobs['queue_depth']),
+        ('amino_jobs_running', 'gauge', 'Jobs being executed', jobs['running']),
+        ('amino_jobs_workers', 'gauge', 'Size of the job process pool', jobs['workers']),
+    ]
+    if layout_templates is not None:
+        templates = layout_templates.stats()
+        samples += [
+            ('amino_layout_templates', 'gauge', 'Learned table layout templates', templates['templates']),
+            ('amino_layout_template_saved_seconds', 'gauge',
+             'Header detection time saved by layout template hits (estimated)', templates['saved_seconds']),
+        ]
+    return Response(metrics.REGISTRY.render(samples), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """
+    Readiness probe: 200 once create_app has imported the configured backend,
+    503 before that or if the backend could not be loaded
+    """
+    status = dict(warm_state, backend=configured_backend_name())
+    return jsonify(status), 200 if warm_state['ready'] else 503
 
 
 @app.route('/', methods=['GET'])
 def index():
     return render_template("index.html")
 
+
+# Filled in by warm_up and reported by /ready
+warm_state = {'ready': False, 'warm_up_seconds': None, 'error': None}
+
+
+def warm_up():
+    """
+    Import Camelot and the configured parser backend's libraries and create the
+    backend, so the first request does not pay for them. Run before the server
+    forks its workers, the imported modules are shared by every worker.
+    """
+    start = time.perf_counter()
+    try:
+        import parallel_camelot  # noqa: F401 (Camelot and OpenCV)
+        get_backend()
+    except Exception as e:
+        print(f"Warm-up failed, the parser backend will be loaded on the first request - {str(e)}")
+        warm_state.update(ready=False, error=str(e))
+    else:
+        warm_state.update(ready=True, error=None)
+    warm_state['warm_up_seconds'] = time.perf_counter() - start
+    return warm_state['ready']
+
+
+def create_app():
+    """
+    Application factory for WSGI servers, e.g. gunicorn 'main:create_app()'
+    (see gunicorn.conf.py). Warms the process up once before returning the app.
+    """
+    if not warm_state['ready']:
+        warm_up()
+    return app
+
+
+def create_asgi_app():
+    """
+    ASGI wrapper of create_app for ASGI servers, e.g.
+    uvicorn --factory main:create_asgi_app (requires asgiref)
+    """
+    from asgiref.wsgi import WsgiToAsgi
+
+    return WsgiToAsgi(create_app())
+
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # Development server; use gunicorn (gunicorn.conf.py) in production
+    create_app().run(debug=os.getenv('FLASK_DEBUG', '1') == '1')
\ No newline at end of file
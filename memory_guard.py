@@ -0,0 +1,75 @@
+import gc
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Pages processed per window in bounded-memory mode (0 = whole document at once)
+PAGE_WINDOW = int(os.getenv('PAGE_WINDOW', '0'))
+
+# Resident memory ceiling for a worker in bounded-memory mode (0 = no ceiling)
+MAX_RSS_BYTES = int(os.getenv('MAX_RSS_MB', '0')) * 1024 * 1024
+
+
+class MemoryLimitExceeded(Exception):
+    """
+    Raised when a document cannot be processed within the memory ceiling, even
+    one page at a time
+    """
+
+
+def peak_rss():
+    """
+    Highest resident set size of this process so far, in bytes
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def current_rss():
+    """
+    Current resident set size of this process in bytes (the peak where the
+    current value is not available)
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+
+def next_window(window, max_rss_bytes=MAX_RSS_BYTES):
+    """
+    Size of the next page window: unchanged while the process stays under the
+    ceiling, otherwise halved after a garbage collection did not bring it back.
+    The ceiling applies to the whole worker process, not to one request: with
+    several requests in flight (gunicorn threads), a large one can shrink the
+    windows of the others or make them raise MemoryLimitExceeded.
+
+    Raises:
+        MemoryLimitExceeded: Single-page windows already exceed the ceiling
+    """
+    if not max_rss_bytes:
+        return window
+
+    rss = current_rss()
+    if rss is None or rss <= max_rss_bytes:
+        return window
+
+    gc.collect()
+    rss = current_rss()
+    if rss <= max_rss_bytes:
+        return window
+    if window <= 1:
+        raise MemoryLimitExceeded(f"Resident memory {rss / 2**20:.0f} MB exceeds the "
+                                  f"{max_rss_bytes / 2**20:.0f} MB ceiling with single-page windows")
+
+    print(f"Resident memory {rss / 2**20:.0f} MB above the {max_rss_bytes / 2**20:.0f} MB ceiling, "
+          f"shrinking the page window from {window} to {window // 2}")
+    return window // 2
@@ -0,0 +1,276 @@
+import bisect
+import cProfile
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# When set, requests sent with ?profile=1 (or an X-Profile: 1 header) are run
+# under cProfile and their stats are dumped into this directory
+PROFILE_DIR = os.getenv('PROFILE_DIR') or None
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class LatencyHistogram:
+    """
+    Cumulative latency histogram with fixed bucket bounds in seconds
+    """
+
+    BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def quantile(self, q):
+        """
+        Upper bucket bound below which a fraction q of the observations fall
+        """
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float('inf')
+
+    def cumulative(self):
+        """
+        (upper bound, observations <= bound) pairs ending with +Inf, as
+        Prometheus expects them
+        """
+        with self._lock:
+            pairs = []
+            seen = 0
+            for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+                seen += count
+                pairs.append((bound, seen))
+            return pairs
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'sum_seconds': self.sum,
+            'mean_seconds': self.sum / self.count if self.count else None,
+            'p50_le': self.quantile(0.5),
+            'p95_le': self.quantile(0.95),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts)),
+        }
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and histograms, rendered in the Prometheus text
+    exposition format
+    """
+
+    def __init__(self):
+        self._help = {}
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help_text, buckets=STAGE_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            if key not in self._histograms:
+                self._histograms[key] = LatencyHistogram(buckets)
+            return self._histograms[key]
+
+    def inc(self, name, help_text, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def render(self, samples=None):
+        """
+        Args:
+            samples (list): Optional (name, type, help text, value) tuples for
+                values sampled by the caller, e.g. cache and queue sizes
+
+        Returns:
+            str: All metrics in the Prometheus text format
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+            help_texts = dict(self._help)
+
+        lines = []
+        seen = set()
+
+        def header(name, kind, help_text):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, 'counter', help_texts[name])
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for (name, labels), histogram in histograms:
+            header(name, 'histogram', help_texts[name])
+            for bound, count in histogram.cumulative():
+                bucket_labels = labels + (('le', _format_value(bound)),)
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        for name, kind, help_text, value in samples or []:
+            if value is None:
+                continue
+            header(name, kind, help_text)
+            lines.append(f"{name} {_format_value(value)}")
+
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+_local = threading.local()
+
+
+def _stage_histogram(stage):
+    return REGISTRY.histogram('amino_stage_duration_seconds', 'Time spent in each extraction pipeline stage',
+                              stage=stage)
+
+
+def observe_stage(stage, seconds):
+    _stage_histogram(stage).observe(seconds)
+    trace = getattr(_local, 'stages', None)
+    if trace is not None:
+        trace[stage] = trace.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage):
+    """
+    Time a pipeline stage into amino_stage_duration_seconds{stage=...} and,
+    inside collect_stages(), into the collected per-stage totals
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        REGISTRY.inc('amino_stage_errors_total', 'Extraction pipeline stages that raised', stage=stage)
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def timed(stage):
+    """
+    Decorator running the whole function inside span(stage)
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def collect_stages():
+    """
+    Collect the total seconds per stage of the spans run by this thread, so
+    pool workers can send their timings back with their result
+    """
+    previous = getattr(_local, 'stages', None)
+    _local.stages = {}
+    try:
+        yield _local.stages
+    finally:
+        _local.stages = previous
+
+
+def observe_stages(stages):
+    """
+    Record stage totals collected in another process (see collect_stages)
+    """
+    for stage, seconds in (stages or {}).items():
+        _stage_histogram(stage).observe(seconds)
+
+
+def start_profile(enabled):
+    """
+    Start a cProfile profile for the current request if profiling was
+    requested and PROFILE_DIR is configured
+
+    Returns:
+        cProfile.Profile: The running profile, or None
+    """
+    if not (enabled and PROFILE_DIR):
+        return None
+    profile = cProfile.Profile()
+    profile.enable()
+    return profile
+
+
+def dump_profile(profile, name):
+    """
+    Stop profile and write its stats to PROFILE_DIR (open with pstats or snakeviz)
+
+    Returns:
+        str: Path of the written .prof file
+    """
+    profile.disable()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    safe_name = re.sub(r'[^\w.-]+', '_', name)
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{safe_name}.prof")
+    profile.dump_stats(path)
+    print(f"Profile written to {path}")
+    return path
+
+
+def profile_iter(profile, iterator, name):
+    """
+    Continue profile while a streamed response body is produced, dumping it
+    once the body is exhausted
+    """
+    try:
+        while True:
+            profile.enable()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                profile.disable()
+            yield chunk
+    finally:
+        dump_profile(profile, name)
@@ -0,0 +1,204 @@
+import hashlib
+import os
+import pickle
+import stat
+import tempfile
+import threading
+
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+from pdfminer.psparser import PSLiteral
+
+from result_cache import make_cache_key
+
+# Returned by PageCache.get on a miss (None and [] are valid cached results)
+MISSING = object()
+
+
+def _update_digest(digest, obj, memo, visiting):
+    """
+    Feed a PDF object into digest. Referenced objects are hashed on their
+    own (once per document, through memo) and contribute their digest.
+    """
+    if isinstance(obj, PDFObjRef):
+        digest.update(_object_digest(obj, memo, visiting))
+    elif isinstance(obj, PDFStream):
+        digest.update(b'S')
+        _update_digest(digest, obj.attrs, memo, visiting)
+        data = obj.get_rawdata()
+        digest.update(obj.get_data() if data is None else data)
+    elif isinstance(obj, dict):
+        digest.update(b'{')
+        for key in sorted(obj, key=str):
+            # Back-references up the page tree are not part of the page
+            if key != 'Parent':
+                digest.update(repr(key).encode('utf-8'))
+                _update_digest(digest, obj[key], memo, visiting)
+        digest.update(b'}')
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b'[')
+        for item in obj:
+            _update_digest(digest, item, memo, visiting)
+        digest.update(b']')
+    elif isinstance(obj, bytes):
+        digest.update(b'b%d:' % len(obj) + obj)
+    elif isinstance(obj, PSLiteral):
+        digest.update(b'/' + repr(obj.name).encode('utf-8'))
+    else:
+        digest.update(repr(obj).encode('utf-8'))
+
+
+def _object_digest(ref, memo, visiting):
+    if ref.objid in memo:
+        return memo[ref.objid]
+    if ref.objid in visiting:
+        return b'cycle'
+    visiting.add(ref.objid)
+    digest = hashlib.sha256()
+    _update_digest(digest, ref.resolve(), memo, visiting)
+    visiting.discard(ref.objid)
+    memo[ref.objid] = digest.digest()
+    return memo[ref.objid]
+
+
+def page_fingerprint(page, memo=None):
+    """
+    SHA-256 of a pdfplumber page's content streams, media box, rotation and
+    resources: the fonts, images and form XObjects it draws, followed
+    recursively. Computed from the raw PDF objects, so the page layout is
+    never parsed.
+
+    Args:
+        page: pdfplumber page
+        memo (dict): Digests of the document's objects by object id, shared
+            between the pages of one document so common fonts are hashed once
+    """
+    memo = {} if memo is None else memo
+    page_obj = page.page_obj
+    digest = hashlib.sha256(repr((list(page_obj.mediabox), page_obj.rotate)).encode('utf-8'))
+    for content in page_obj.contents:
+        stream = resolve1(content)
+        if stream is not None:
+            digest.update(stream.get_data())
+    _update_digest(digest, page_obj.resources, memo, set())
+    return digest.hexdigest()
+
+
+def private_dir(path):
+    """
+    Create path readable and writable by this user only, or check that an
+    existing directory is owned by this user and not writable by anyone else.
+    Cached pages are unpickled, so no other user may be able to plant files.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o022:
+        raise PermissionError(f"{path} must be a directory owned by this user and not writable by others")
+    return path
+
+
+class PageCache:
+    """
+    On-disk cache of per-page extraction results (page filter scores, Camelot
+    tables, backend documents) keyed by the page's content hash, the stage and
+    its settings. A revised PDF only needs its changed pages re-processed.
+    Entries are pruned oldest first once the cache grows past max_bytes.
+    cache_dir must be private to this user (see private_dir).
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._written = 0
+        self._lock = threading.Lock()
+        private_dir(cache_dir)
+
+    def _path(self, page_hash, stage, settings):
+        key = make_cache_key(page_hash, dict(settings or {}, stage=stage))
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pkl")
+
+    def get(self, page_hash, stage, settings=None):
+        """
+        Cached result of stage for a page, or MISSING
+        """
+        path = self._path(page_hash, stage, settings)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            with self._lock:
+                self.misses += 1
+            return MISSING
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, page_hash, stage, value, settings=None):
+        path = self._path(page_hash, stage, settings)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+            print(f"Warning: could not cache {stage} result of page {page_hash[:12]} - {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._written += size
+            prune = self._written > self.max_bytes / 10
+            if prune:
+                self._written = 0
+        if prune:
+            self.prune()
+
+    def prune(self):
+        """
+        Delete the least recently used entries until the cache fits max_bytes
+        """
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for file in files:
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hit_ratio': self.hits / lookups if lookups else 0.0}
+
+
+def configured_page_cache():
+    """
+    PageCache configured from PAGE_CACHE, PAGE_CACHE_DIR and PAGE_CACHE_MAX_MB,
+    or None when PAGE_CACHE=0 or the directory is not private to this user
+    """
+    if os.getenv('PAGE_CACHE', '1') == '0':
+        return None
+    cache_dir = os.getenv('PAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), f"amino-page-cache-{os.getuid()}"))
+    try:
+        return PageCache(cache_dir=cache_dir, max_bytes=int(os.getenv('PAGE_CACHE_MAX_MB', '256')) * 1024 * 1024)
+    except PermissionError as e:
+        print(f"Warning: page cache disabled - {str(e)}")
+        return None
@@ -0,0 +1,110 @@
+import os
+import re
+from collections import defaultdict
+
+# A page is sent to Camelot when its score reaches PAGE_FILTER_THRESHOLD
+PAGE_FILTER_ENABLED = os.getenv('PAGE_FILTER', '1') != '0'
+PAGE_FILTER_THRESHOLD = float(os.getenv('PAGE_FILTER_THRESHOLD', '1.0'))
+
+CAPTION_RE = re.compile(r'^\s*Table\s+(?:\d+|[IVX]+)\b', re.IGNORECASE | re.MULTILINE)
+NUMERIC_TOKEN_RE = re.compile(r'^[(\[]?[-+−]?\d+(?:[.,]\d+)*%?[)\]]?[a-zA-Z*†‡]{0,3}$')
+PLUS_MINUS_TOKENS = ('±', '+/-', '+-')
+
+# Words whose left or right edges fall in the same bucket are treated as aligned
+ALIGN_TOLERANCE = 3.0
+LINE_TOLERANCE = 3.0
+MIN_COLUMN_ROWS = 3
+
+# Only lines that are mostly numbers count towards columns, so numbers in
+# prose (methods, references) lining up by chance are ignored
+MIN_ROW_NUMBERS = 2
+MIN_ROW_NUMERIC_RATIO = 0.4
+
+CAPTION_WEIGHT = 1.0
+COLUMN_WEIGHT = 0.5
+PLUS_MINUS_WEIGHT = 0.25
+
+# Everything a page score depends on besides the page, for the page cache
+SCORE_SETTINGS = {
+    'align_tolerance': ALIGN_TOLERANCE, 'line_tolerance': LINE_TOLERANCE, 'min_column_rows': MIN_COLUMN_ROWS,
+    'min_row_numbers': MIN_ROW_NUMBERS, 'min_row_numeric_ratio': MIN_ROW_NUMERIC_RATIO,
+    'weights': (CAPTION_WEIGHT, COLUMN_WEIGHT, PLUS_MINUS_WEIGHT),
+    # Scores cached before the word count was added lack it
+    'format': 2,
+}
+
+
+def is_numeric_token(text):
+    return bool(NUMERIC_TOKEN_RE.match(text)) or any(token in text for token in PLUS_MINUS_TOKENS)
+
+
+def aligned_columns(words):
+    """
+    Number of columns of numeric words sharing a left or right edge across at
+    least MIN_COLUMN_ROWS table-like lines
+
+    Args:
+        words (list): pdfplumber word dicts with 'text', 'x0', 'x1' and 'top'
+    """
+    lines = defaultdict(list)
+    for word in words:
+        lines[round(word['top'] / LINE_TOLERANCE)].append(word)
+
+    lines_by_edge = {'x0': defaultdict(set), 'x1': defaultdict(set)}
+    for line, line_words in lines.items():
+        numbers = [word for word in line_words if is_numeric_token(word['text'])]
+        if len(numbers) < MIN_ROW_NUMBERS or len(numbers) < MIN_ROW_NUMERIC_RATIO * len(line_words):
+            continue
+        for word in numbers:
+            for edge, buckets in lines_by_edge.items():
+                buckets[round(word[edge] / ALIGN_TOLERANCE)].add(line)
+
+    return max(sum(1 for rows in buckets.values() if len(rows) >= MIN_COLUMN_ROWS)
+               for buckets in lines_by_edge.values())
+
+
+def score_page(words, text):
+    """
+    Cheap estimate of how likely a page holds a table, from the page's words
+    and text only: aligned numeric columns, ± values and "Table N" captions
+
+    Returns:
+        dict: The features and their weighted 'score'
+    """
+    columns = aligned_columns(words)
+    plus_minus = sum(1 for word in words if any(token in word['text'] for token in PLUS_MINUS_TOKENS))
+    caption = bool(CAPTION_RE.search(text))
+    numeric_words = sum(1 for word in words if is_numeric_token(word['text']))
+
+    score = (CAPTION_WEIGHT * caption +
+             COLUMN_WEIGHT * min(columns, 4) +
+             PLUS_MINUS_WEIGHT * min(plus_minus, 4))
+    return {
+        'caption': caption,
+        'aligned_columns': columns,
+        'plus_minus': plus_minus,
+        'numeric_ratio': numeric_words / len(words) if words else 0.0,
+        'words': len(words),
+        'score': score,
+    }
+
+
+def screen_pages(session, threshold=None, pages=None):
+    """
+    Score the pages (default: every page) of a PdfSession (scores of unchanged
+    pages come from its page cache)
+
+    Returns:
+        list: One score dict per page, with 'page' and 'candidate' added
+    """
+    threshold = PAGE_FILTER_THRESHOLD if threshold is None else threshold
+    scores = []
+    for page_number in pages if pages is not None else range(1, session.page_count + 1):
+        if PAGE_FILTER_ENABLED:
+            score = session.page_score(page_number)
+            score['candidate'] = score['score'] >= threshold
+        else:
+            score = {'score': None, 'candidate': True}
+        score['page'] = page_number
+        scores.append(score)
+    return scores
@@ -0,0 +1,197 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.connection import wait
+
+import camelot
+from camelot.core import TableList
+from camelot.handlers import PDFHandler
+
+# Camelot processes are started by a fork server, a single-threaded process
+# with Camelot preloaded. Forking a threaded gunicorn worker directly could copy
+# a lock another thread holds (logging, metrics, the page cache) into the child
+# and deadlock it.
+MP_CONTEXT = multiprocessing.get_context('forkserver')
+MP_CONTEXT.set_forkserver_preload(['__main__', 'parallel_camelot'])
+
+
+class PageExtractionError(Exception):
+    """
+    Raised when Camelot fails on a page read in an isolated process
+    """
+
+
+def resolve_pages(pdf_path, pages='all', password=None):
+    """
+    Expand a Camelot page specification ('all', '1,3,4-end', ...) into a sorted
+    list of page numbers
+    """
+    return PDFHandler(pdf_path, pages=pages, password=password).pages
+
+
+def shard_pages(page_numbers, num_shards):
+    """
+    Split page numbers into at most num_shards contiguous, similarly sized runs
+    """
+    num_shards = max(1, min(num_shards, len(page_numbers)))
+    size, remainder = divmod(len(page_numbers), num_shards)
+    shards = []
+    start = 0
+    for i in range(num_shards):
+        end = start + size + (1 if i < remainder else 0)
+        shards.append(page_numbers[start:end])
+        start = end
+    return [shard for shard in shards if shard]
+
+
+def _read_shard(pdf_path, page_numbers, flavor, password, kwargs):
+    """
+    Executed inside a pool process: run Camelot on one run of pages
+    """
+    pages = ','.join(str(p) for p in page_numbers)
+    return list(camelot.read_pdf(pdf_path, pages=pages, flavor=flavor, password=password, **kwargs))
+
+
+def read_pdf_parallel(pdf_path, pages='all', flavor='stream', max_workers=None, executor=None,
+                      password=None, **kwargs):
+    """
+    Drop-in replacement for camelot.read_pdf that shards the pages across a
+    process pool. Camelot parses each page independently, so merging the shard
+    results in page order gives the same TableList as the serial call.
+
+    Args:
+        pdf_path (str): Path of the PDF
+        pages (str): Camelot page specification
+        flavor (str): 'stream' or 'lattice'
+        max_workers (int): Number of processes; 1 runs serially in-process
+        executor (ProcessPoolExecutor): Optional pool to reuse across calls
+            (preferably created with mp_context=MP_CONTEXT)
+        kwargs: Passed through to camelot.read_pdf
+
+    Returns:
+        camelot.core.TableList: Tables of all pages, in page order
+    """
+    if max_workers is None:
+        max_workers = int(os.getenv('CAMELOT_WORKERS', '1')) or os.cpu_count() or 1
+
+    page_numbers = resolve_pages(pdf_path, pages, password)
+    shards = shard_pages(page_numbers, max_workers)
+
+    if len(shards) <= 1:
+        return camelot.read_pdf(pdf_path, pages=pages, flavor=flavor, password=password, **kwargs)
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=len(shards), mp_context=MP_CONTEXT)
+
+    try:
+        futures = [executor.submit(_read_shard, pdf_path, shard, flavor, password, kwargs) for shard in shards]
+        tables = []
+        for future in futures:
+            tables.extend(future.result())
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    return TableList(sorted(tables))
+
+
+def _read_page_child(conn, pdf_path, page_number, flavor, password, kwargs):
+    """
+    Executed inside a page process: run Camelot on one page and send back
+    ('ok', tables) or ('error', message)
+    """
+    try:
+        conn.send(('ok', _read_shard(pdf_path, [page_number], flavor, password, kwargs)))
+    except Exception as e:
+        conn.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def _kill(process, conn):
+    conn.close()
+    process.kill()
+    process.join()
+
+
+def read_pages_isolated(pdf_path, page_numbers, flavor='stream', password=None, page_timeout=None, deadline=None,
+                        max_workers=None, **kwargs):
+    """
+    Variant of read_pdf_parallel running Camelot on each page in a process of
+    its own, so a pathological page can be killed instead of holding up the
+    whole document. Up to max_workers pages run at a time, in page order.
+
+    Args:
+        pdf_path (str): Path of the PDF
+        page_numbers (list): 1-based pages to read
+        page_timeout (float): Seconds a single page may take (None: no limit)
+        deadline (float): time.monotonic() value after which every page still
+            running or not started yet is given up (None: no deadline)
+        max_workers (int): Concurrent page processes (default: CAMELOT_WORKERS)
+        kwargs: Passed through to camelot.read_pdf
+
+    Returns:
+        tuple: (camelot.core.TableList of the finished pages in page order,
+        {page: 'page_timeout' or 'document_timeout'} for the pages given up)
+
+    Raises:
+        PageExtractionError: Camelot raised on a page or its process died
+    """
+    if max_workers is None:
+        max_workers = int(os.getenv('CAMELOT_WORKERS', '1')) or os.cpu_count() or 1
+
+    pending = list(page_numbers)
+    running = {}
+    results = {}
+    timed_out = {}
+    try:
+        while pending or running:
+            while pending and len(running) < max_workers:
+                page_number = pending.pop(0)
+                if deadline is not None and time.monotonic() >= deadline:
+                    timed_out[page_number] = 'document_timeout'
+                    continue
+                receiver, sender = MP_CONTEXT.Pipe(duplex=False)
+                process = MP_CONTEXT.Process(target=_read_page_child,
+                                             args=(sender, pdf_path, page_number, flavor, password, kwargs))
+                process.start()
+                sender.close()
+                page_deadline = time.monotonic() + page_timeout if page_timeout else None
+                running[receiver] = (page_number, process, page_deadline)
+            if not running:
+                continue
+
+            limits = [limit for _, _, limit in running.values() if limit is not None]
+            if deadline is not None:
+                limits.append(deadline)
+            timeout = max(0.0, min(limits) - time.monotonic()) if limits else None
+            for receiver in wait(list(running), timeout):
+                page_number, process, _ = running.pop(receiver)
+                try:
+                    status, value = receiver.recv()
+                except EOFError:
+                    status, value = 'error', None
+                receiver.close()
+                process.join()
+                if status != 'ok':
+                    raise PageExtractionError(f"Camelot failed on page {page_number}: "
+                                              f"{value or f'process exited with code {process.exitcode}'}")
+                results[page_number] = value
+
+            now = time.monotonic()
+            for receiver, (page_number, process, page_deadline) in list(running.items()):
+                if deadline is not None and now >= deadline:
+                    timed_out[page_number] = 'document_timeout'
+                elif page_deadline is not None and now >= page_deadline:
+                    timed_out[page_number] = 'page_timeout'
+                else:
+                    continue
+                del running[receiver]
+                _kill(process, receiver)
+    finally:
+        for receiver, (_, process, _) in running.items():
+            _kill(process, receiver)
+
+    return TableList([table for p in page_numbers for table in results.get(p, [])]), timed_out
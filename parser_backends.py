@@ -0,0 +1,342 @@
+import abc
+import json
+import os
+import threading
+import time
+
+from memory_guard import next_window
+from metrics import REGISTRY, LatencyHistogram, span
+from result_cache import hash_file
+
+
+class ParsedDocument:
+    """
+    Minimal document as produced by every backend; extract_and_save_tables only
+    needs .text, so this mirrors llama_index's Document for local backends
+    """
+
+    def __init__(self, text, metadata=None):
+        self.text = text
+        self.metadata = metadata or {}
+
+    def __repr__(self):
+        return f"ParsedDocument(metadata={self.metadata!r}, chars={len(self.text)})"
+
+
+def table_to_markdown(rows):
+    """
+    Render table rows as a markdown table matching the pattern
+    extract_and_save_tables looks for (every cell non-empty, header separator row)
+    """
+    if not rows:
+        return ''
+
+    def cell(value):
+        text = '' if value is None else str(value).replace('|', '/').replace('\n', ' ').strip()
+        return text or ' '
+
+    width = max(len(row) for row in rows)
+    lines = []
+    for i, row in enumerate(rows):
+        cells = [cell(v) for v in row] + [' '] * (width - len(row))
+        lines.append('|' + '|'.join(cells) + '|')
+        if i == 0:
+            lines.append('|' + '|'.join(['---'] * width) + '|')
+    return '\n'.join(lines) + '\n'
+
+
+class ParserBackend(abc.ABC):
+    """
+    Turns a PDF into a list of page documents with markdown tables. Instances
+    are created once per process by get_backend and reused for every request.
+    Subclasses implement parse; windowed ones also override parse_window.
+    """
+
+    name = None
+    # Whether parse_window can parse a subset of the pages on its own
+    windowed = False
+
+    @abc.abstractmethod
+    def parse(self, pdf_path, session=None):
+        """
+        Page documents of every page of the PDF
+        """
+
+    def parse_window(self, session, pages):
+        """
+        Page documents of only these pages of the session's PDF. By default
+        the whole document is parsed and these pages are kept.
+        """
+        return self._keep_pages(self.parse(session.pdf_path, session=session), pages)
+
+    def parse_pages(self, pdf_path, pages, session=None):
+        """
+        Page documents of only these 1-based pages. Backends that cannot parse
+        a subset parse the whole document and keep these pages.
+        """
+        if self.windowed and session is not None:
+            return self.parse_window(session, pages)
+        return self._keep_pages(self.parse(pdf_path, session=session), pages)
+
+    @staticmethod
+    def _keep_pages(documents, pages):
+        pages = set(pages)
+        return [document for i, document in enumerate(documents)
+                if int(document.metadata.get('page_label', i + 1)) in pages]
+
+
+class LlamaParseBackend(ParserBackend):
+    name = 'llamaparse'
+
+    def __init__(self, record_dir=None):
+        from llama_parse import LlamaParse
+        from llama_index.core import SimpleDirectoryReader
+        import nest_asyncio
+
+        nest_asyncio.apply()
+        self._reader_cls = SimpleDirectoryReader
+        self.parser = LlamaParse(do_not_unroll_columns=True, result_type="markdown")
+        self.record_dir = record_dir
+
+    def parse(self, pdf_path, session=None):
+        documents = self._reader_cls(input_files=[pdf_path], file_extractor={".pdf": self.parser}).load_data()
+        if self.record_dir:
+            FixtureBackend.record(self.record_dir, pdf_path, documents)
+        return documents
+
+    def parse_pages(self, pdf_path, pages, session=None):
+        if self.record_dir:
+            # Recordings hold whole documents
+            return super().parse_pages(pdf_path, pages, session)
+
+        # LlamaParse only parses (and bills) the target pages, numbered from 0
+        pages = sorted(pages)
+        parser = self.parser.model_copy(update={'target_pages': ','.join(str(p - 1) for p in pages)})
+        documents = self._reader_cls(input_files=[pdf_path], file_extractor={".pdf": parser}).load_data()
+        for page, document in zip(pages, documents):
+            document.metadata['page_label'] = page
+        return documents
+
+
+class CamelotBackend(ParserBackend):
+    """
+    Local backend rendering the session's Camelot tables as one markdown
+    document per page. Only pages passing the page pre-filter are parsed.
+    """
+
+    name = 'camelot'
+    windowed = True
+
+    def parse(self, pdf_path, session=None):
+        from pdf_session import PdfSession
+
+        own_session = session is None
+        session = session or PdfSession(pdf_path)
+        try:
+            return self.parse_window(session, None)
+        finally:
+            if own_session:
+                session.close()
+
+    def parse_window(self, session, pages):
+        tables_by_page = {}
+        for table in session.read_candidate_tables(flavor='stream', pages=pages):
+            tables_by_page.setdefault(int(table.page), []).append(table_to_markdown(table.df.values.tolist()))
+
+        return [ParsedDocument('\n' + '\n\n'.join(tables), {'page_label': page})
+                for page, tables in sorted(tables_by_page.items())]
+
+
+class PdfplumberBackend(ParserBackend):
+    """
+    Local backend using pdfplumber's table finder, one markdown document per page.
+    Amino-acid tables rarely have ruling lines, so columns and rows are found
+    from text alignment.
+    """
+
+    name = 'pdfplumber'
+    windowed = True
+    TABLE_SETTINGS = {'vertical_strategy': 'text', 'horizontal_strategy': 'text'}
+
+    def _page_markdown(self, session, page_number):
+        tables = []
+        for rows in session.page(page_number).extract_tables(self.TABLE_SETTINGS):
+            rows = [row for row in rows if any(cell for cell in row)]
+            if rows:
+                tables.append(table_to_markdown(rows))
+        return session.page_text(page_number) + '\n\n' + '\n\n'.join(tables)
+
+    def parse(self, pdf_path, session=None):
+        from pdf_session import PdfSession
+
+        own_session = session is None
+        session = session or PdfSession(pdf_path)
+        try:
+            return self.parse_window(session, range(1, session.page_count + 1))
+        finally:
+            if own_session:
+                session.close()
+
+    def parse_window(self, session, pages):
+        documents = []
+        for page_number in pages:
+            text = session.page_result(page_number, 'pdfplumber', self.TABLE_SETTINGS,
+                                       lambda: self._page_markdown(session, page_number))
+            documents.append(ParsedDocument(text, {'page_label': page_number}))
+        return documents
+
+
+class FixtureBackend(ParserBackend):
+    """
+    Offline stand-in for LlamaParse replaying recorded markdown documents.
+
+    A recording is a JSON file holding the list of page texts, named after the
+    SHA-256 of the PDF (or, as a fallback, the PDF's file stem) inside
+    fixture_dir. An optional fixed latency simulates the remote round-trip.
+    """
+
+    name = 'fixture'
+
+    def __init__(self, fixture_dir, latency_seconds=0.0):
+        self.fixture_dir = fixture_dir
+        self.latency_seconds = latency_seconds
+
+    @staticmethod
+    def record(fixture_dir, pdf_path, documents):
+        os.makedirs(fixture_dir, exist_ok=True)
+        path = os.path.join(fixture_dir, f"{hash_file(pdf_path)}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'source': os.path.basename(pdf_path), 'documents': [doc.text for doc in documents]}, f)
+
+    def _fixture_path(self, pdf_path):
+        candidates = [hash_file(pdf_path), os.path.splitext(os.path.basename(pdf_path))[0]]
+        for key in candidates:
+            path = os.path.join(self.fixture_dir, f"{key}.json")
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f"No recorded documents for {os.path.basename(pdf_path)} in {self.fixture_dir}")
+
+    def parse(self, pdf_path, session=None):
+        with open(self._fixture_path(pdf_path), 'r', encoding='utf-8') as f:
+            texts = json.load(f)['documents']
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return [ParsedDocument(text, {'page_label': i + 1}) for i, text in enumerate(texts)]
+
+
+BACKENDS = {
+    'llamaparse': lambda: LlamaParseBackend(record_dir=os.getenv('PARSER_RECORD_DIR') or None),
+    'camelot': CamelotBackend,
+    'pdfplumber': PdfplumberBackend,
+    'fixture': lambda: FixtureBackend(
+        fixture_dir=os.getenv('PARSER_FIXTURE_DIR', 'fixtures'),
+        latency_seconds=float(os.getenv('PARSER_FIXTURE_LATENCY_MS', '0')) / 1000
+    ),
+}
+
+_instances = {}
+_histograms = {}
+_lock = threading.Lock()
+
+
+def configured_backend_name():
+    return os.getenv('PARSER_BACKEND', 'llamaparse')
+
+
+def get_backend(name=None):
+    """
+    Shared backend instance for name (default: the PARSER_BACKEND setting)
+    """
+    name = name or configured_backend_name()
+    with _lock:
+        if name not in _instances:
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown parser backend '{name}', expected one of {sorted(BACKENDS)}")
+            _instances[name] = BACKENDS[name]()
+            _histograms[name] = REGISTRY.histogram('amino_parser_duration_seconds', 'Latency of parser backend calls',
+                                                   buckets=LatencyHistogram.BUCKETS, backend=name)
+        return _instances[name]
+
+
+def parse_documents(pdf_path, session=None, backend=None):
+    """
+    Parse a PDF with the configured backend, recording the call's latency in
+    that backend's histogram
+    """
+    backend = get_backend(backend)
+    start = time.perf_counter()
+    with span('parser'):
+        documents = backend.parse(pdf_path, session=session)
+    _record_latency(backend, time.perf_counter() - start, documents)
+    return documents
+
+
+def parse_document_pages(pdf_path, pages, session=None, backend=None):
+    """
+    Like parse_documents, but parse only these 1-based pages of the PDF
+    """
+    backend = get_backend(backend)
+    start = time.perf_counter()
+    with span('parser'):
+        documents = backend.parse_pages(pdf_path, pages, session=session)
+    _record_latency(backend, time.perf_counter() - start, documents)
+    return documents
+
+
+def _record_latency(backend, elapsed, documents):
+    histogram = _histograms[backend.name]
+    histogram.observe(elapsed)
+    print(f"Parser backend {backend.name}: {elapsed:.3f}s, {len(documents)} document(s) "
+          f"(n={histogram.count}, p50<={histogram.quantile(0.5)}s, p95<={histogram.quantile(0.95)}s)")
+
+
+def parse_document_windows(pdf_path, session, window, max_rss_bytes=0, backend=None, parse=None):
+    """
+    Generator of a PDF's page documents parsed window pages at a time. The
+    next window is only parsed once the caller has consumed (and written out)
+    the documents of the previous one, whose pages are then released from the
+    session, so memory stays bounded by the window instead of the document.
+    Backends that cannot parse page ranges (LlamaParse, fixtures) fall back
+    to parsing the whole document.
+
+    Args:
+        window (int): Pages per window
+        max_rss_bytes (int): Memory ceiling; the window shrinks when it is
+            exceeded (see memory_guard.next_window)
+        parse (callable): Returns the documents of a list of pages (default:
+            the backend's parse_window); any backend can be windowed with it
+    """
+    if parse is None:
+        backend = get_backend(backend)
+        if not backend.windowed:
+            yield from parse_documents(pdf_path, session, backend.name)
+            return
+
+        histogram = _histograms[backend.name]
+
+        def parse(pages):
+            start = time.perf_counter()
+            with span('parser'):
+                documents = backend.parse_window(session, pages)
+            histogram.observe(time.perf_counter() - start)
+            return documents
+
+    page_count = session.page_count
+    first = 1
+    while first <= page_count:
+        pages = list(range(first, min(first + window, page_count + 1)))
+        documents = parse(pages)
+
+        yield from documents
+        del documents
+        session.release_pages(pages)
+        first = pages[-1] + 1
+        window = next_window(window, max_rss_bytes)
+
+
+def latency_stats():
+    """
+    Latency histogram summary per backend used in this process
+    """
+    with _lock:
+        return {name: histogram.summary() for name, histogram in _histograms.items()}
@@ -0,0 +1,294 @@
+import os
+import time
+
+import pdfplumber
+
+from metrics import REGISTRY, span
+from page_cache import MISSING, page_fingerprint
+from page_filter import SCORE_SETTINGS, score_page, screen_pages
+from result_cache import hash_file
+
+# Seconds Camelot may spend on one page, and on all pages of a document,
+# before the page is given up (0 = no limit). Either limit runs every page in
+# a process of its own that can be killed (see parallel_camelot.read_pages_isolated).
+# The document limit stays below GUNICORN_TIMEOUT so a request is answered
+# before its worker would be killed.
+PAGE_TIMEOUT = float(os.getenv('PAGE_TIMEOUT', '120'))
+DOCUMENT_TIMEOUT = float(os.getenv('DOCUMENT_TIMEOUT', '300'))
+
+
+class PdfSession:
+    """
+    A single opened PDF shared by every extraction stage (DOI detection, table
+    metadata, table extraction). Page text and Camelot tables are parsed at most
+    once per page and cached, and parse_counts records how much parse work the
+    document actually cost.
+
+    With a page_cache (see page_cache.PageCache) per-page results are also
+    looked up by the hash of the page content, so re-uploading a revised PDF
+    only re-processes the pages that changed.
+
+    Camelot pages exceeding page_timeout, or still unread once document_timeout
+    seconds have passed since the session was opened, are given up with no
+    tables and listed in timed_out instead of failing the document.
+    """
+
+    def __init__(self, pdf_path, password=None, page_cache=None, page_timeout=PAGE_TIMEOUT,
+                 document_timeout=DOCUMENT_TIMEOUT, file_hash=None):
+        self.pdf_path = pdf_path
+        self.password = password
+        self.page_cache = page_cache
+        self.page_timeout = page_timeout or None
+        self.deadline = time.monotonic() + document_timeout if document_timeout else None
+        self.timed_out = {}
+        self._pdf = None
+        self._pages = {}
+        self._text = {}
+        self._words = {}
+        self._tables = {}
+        self._hashes = {}
+        self._object_hashes = {}
+        self._reused = set()
+        self._recomputed = set()
+        self._scores = {}
+        self._file_hash = file_hash
+        self.parse_counts = {'pdfplumber': 0, 'camelot': 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+        self._pages.clear()
+
+    @property
+    def pdf(self):
+        if self._pdf is None:
+            self._pdf = pdfplumber.open(self.pdf_path, password=self.password)
+        return self._pdf
+
+    @property
+    def file_hash(self):
+        """
+        SHA-256 of the PDF file, computed once unless it was passed in (e.g.
+        the hash computed while the file was uploaded)
+        """
+        if self._file_hash is None:
+            self._file_hash = hash_file(self.pdf_path)
+        return self._file_hash
+
+    @property
+    def page_count(self):
+        return len(self.pdf.pages)
+
+    @property
+    def page_parses(self):
+        return sum(self.parse_counts.values())
+
+    def page(self, page_number):
+        """
+        pdfplumber page object (1-based); its character layout is parsed on first use
+        """
+        if page_number not in self._pages:
+            self._pages[page_number] = self.pdf.pages[page_number - 1]
+            self.parse_counts['pdfplumber'] += 1
+        return self._pages[page_number]
+
+    def page_text(self, page_number):
+        if page_number not in self._text:
+            self._text[page_number] = self.page(page_number).extract_text() or ''
+        return self._text[page_number]
+
+    def page_words(self, page_number):
+        if page_number not in self._words:
+            self._words[page_number] = self.page(page_number).extract_words()
+        return self._words[page_number]
+
+    def page_hash(self, page_number):
+        if page_number not in self._hashes:
+            self._hashes[page_number] = page_fingerprint(self.pdf.pages[page_number - 1], self._object_hashes)
+        return self._hashes[page_number]
+
+    def _cache_get(self, page_number, stage, settings):
+        if self.page_cache is None:
+            return MISSING
+        value = self.page_cache.get(self.page_hash(page_number), stage, settings)
+        if value is not MISSING:
+            self._reused.add(page_number)
+        return value
+
+    def _cache_put(self, page_number, stage, settings, value):
+        if self.page_cache is not None:
+            self._recomputed.add(page_number)
+            self.page_cache.put(self.page_hash(page_number), stage, value, settings)
+
+    def page_result(self, page_number, stage, settings, compute):
+        """
+        Result of compute() for one page, served from the page cache while the
+        page content is unchanged
+
+        Args:
+            page_number (int): 1-based page
+            stage (str): Name of the cached stage
+            settings (dict): Everything besides the page content the result depends on
+            compute (callable): Produces the result when it is not cached
+        """
+        value = self._cache_get(page_number, stage, settings)
+        if value is MISSING:
+            value = compute()
+            self._cache_put(page_number, stage, settings, value)
+        return value
+
+    def page_score(self, page_number):
+        """
+        Page filter score of one page (see page_filter.score_page)
+        """
+        return dict(self.page_result(
+            page_number, 'page_score', SCORE_SETTINGS,
+            lambda: score_page(self.page_words(page_number), self.page_text(page_number))
+        ))
+
+    @property
+    def reuse_counts(self):
+        """
+        Pages whose results all came from the page cache, out of all pages
+        """
+        reused = len(self._reused - self._recomputed)
+        pages = self.page_count
+        return {'pages_reused': reused, 'page_reuse_ratio': reused / pages if pages else 0.0}
+
+    def read_tables(self, pages='all', flavor='stream', **kwargs):
+        """
+        Camelot tables of the requested pages, in page order. Pages already
+        parsed in this session, or unchanged since an earlier upload, are
+        served from the cache.
+
+        Returns:
+            list: camelot.core.Table objects
+        """
+        # Camelot (and OpenCV) are only imported once tables are read
+        from parallel_camelot import read_pages_isolated, read_pdf_parallel, resolve_pages
+
+        page_numbers = resolve_pages(self.pdf_path, pages, self.password)
+        settings = dict(kwargs, flavor=flavor)
+        missing = []
+        for p in page_numbers:
+            if (p, flavor) in self._tables:
+                continue
+            cached = self._cache_get(p, 'camelot', settings)
+            if cached is MISSING:
+                missing.append(p)
+                continue
+            # The page may have moved since the tables were cached
+            for table in cached:
+                table.page = str(p)
+            self._tables[(p, flavor)] = cached
+
+        if missing:
+            with span('camelot'):
+                if self.page_timeout or self.deadline is not None:
+                    tables, timed_out = read_pages_isolated(
+                        self.pdf_path,
+                        missing,
+                        flavor=flavor,
+                        password=self.password,
+                        page_timeout=self.page_timeout,
+                        deadline=self.deadline,
+                        **kwargs
+                    )
+                else:
+                    tables, timed_out = read_pdf_parallel(
+                        self.pdf_path,
+                        pages=','.join(str(p) for p in missing),
+                        flavor=flavor,
+                        password=self.password,
+                        **kwargs
+                    ), {}
+            for p in missing:
+                self._tables[(p, flavor)] = []
+            for table in tables:
+                self._tables[(int(table.page), flavor)].append(table)
+            for p in missing:
+                # A page given up is retried on the next upload rather than cached as empty
+                if p not in timed_out:
+                    self._cache_put(p, 'camelot', settings, self._tables[(p, flavor)])
+            for p, reason in timed_out.items():
+                print(f"Camelot gave up on page {p} of {os.path.basename(self.pdf_path)} ({reason})")
+                REGISTRY.inc('amino_pages_timed_out_total', 'Pages given up after exceeding a time budget',
+                             reason=reason)
+            self.timed_out.update(timed_out)
+            self.parse_counts['camelot'] += len(missing)
+
+        return [table for p in page_numbers for table in self._tables[(p, flavor)]]
+
+    @property
+    def timed_out_pages(self):
+        """
+        Pages given up so far, as [{'page', 'reason'}] in page order
+        """
+        return [{'page': p, 'reason': reason} for p, reason in sorted(self.timed_out.items())]
+
+    def screen_pages(self, pages=None):
+        """
+        Table-likelihood score of the given pages (default: every page, see
+        page_filter), each computed once
+        """
+        pages = list(pages) if pages is not None else list(range(1, self.page_count + 1))
+        missing = [p for p in pages if p not in self._scores]
+        if missing:
+            with span('page_filter'):
+                for score in screen_pages(self, pages=missing):
+                    self._scores[score['page']] = score
+        return [self._scores[p] for p in pages]
+
+    def candidate_pages(self, pages=None):
+        return [score['page'] for score in self.screen_pages(pages) if score['candidate']]
+
+    def textless_pages(self, pages=None):
+        """
+        Pages the pre-filter rejected because they have no text layer at all
+        (scanned or image-only pages), which only an OCR parser can read
+        """
+        return [score['page'] for score in self.screen_pages(pages)
+                if not score['candidate'] and score.get('words') == 0]
+
+    @property
+    def screen_counts(self):
+        """
+        Pages screened by the pre-filter and pages parsed by Camelot so far
+        """
+        return {'pages_screened': len(self._scores), 'pages_parsed': self.parse_counts['camelot']}
+
+    def read_candidate_tables(self, flavor='stream', pages=None, **kwargs):
+        """
+        Camelot tables of the pages (default: all) that pass the pre-filter;
+        the remaining pages are never handed to Camelot
+        """
+        candidates = self.candidate_pages(pages)
+        if not candidates:
+            return []
+        return self.read_tables(pages=','.join(str(p) for p in candidates), flavor=flavor, **kwargs)
+
+    def tables_on_page(self, page_number, flavor='stream'):
+        return self.read_tables(pages=str(page_number), flavor=flavor)
+
+    def release_pages(self, pages):
+        """
+        Drop everything cached for these pages (layout objects, text, words and
+        Camelot tables), so a document processed window by window keeps only
+        one window in memory
+        """
+        pages = set(pages)
+        for p in pages:
+            page = self._pages.pop(p, None)
+            if page is not None:
+                page.close()
+            self._text.pop(p, None)
+            self._words.pop(p, None)
+        for key in [key for key in self._tables if key[0] in pages]:
+            del self._tables[key]
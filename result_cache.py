@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """
+    Compute the SHA-256 hex digest of a file without loading it into memory
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_cache_key(pdf_hash, settings):
+    """
+    Build a cache key from the PDF content hash and the extraction settings,
+    so changing any setting never serves a stale result
+    """
+    settings_blob = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha256(f"{pdf_hash}:{settings_blob}".encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Size-bounded on-disk cache of extraction results (ZIP archives holding the
+    table CSVs and metadata JSON), evicted least recently used first. The
+    index is written when entries are stored or evicted; the access times
+    updated by hits are written along with the next store.
+    """
+
+    INDEX_FILENAME = 'index.json'
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index = self._load_index()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.zip")
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, self.INDEX_FILENAME)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return OrderedDict()
+
+        # Oldest access first, so the front of the dict is the eviction candidate
+        index = OrderedDict()
+        for key, entry in sorted(entries.items(), key=lambda item: item[1].get('last_access', 0)):
+            if os.path.exists(self._entry_path(key)):
+                index[key] = entry
+        return index
+
+    def _save_index(self):
+        tmp_path = f"{self._index_path()}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path())
+
+    def _size(self):
+        return sum(entry['size'] for entry in self._index.values())
+
+    def _evict(self, incoming_size):
+        while self._index and self._size() + incoming_size > self.max_bytes:
+            key, _ = self._index.popitem(last=False)
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+            self.evictions += 1
+
+    def get(self, key):
+        """
+        Look up a cached result. The ZIP is opened before the lock is released,
+        so evicting the entry afterwards does not affect the caller.
+
+        Returns:
+            dict: Entry with 'file', the cached ZIP opened for binary reading
+            (to be closed by the caller), and its stored metadata, or None on
+            a miss
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            try:
+                f = open(self._entry_path(key), 'rb') if entry is not None else None
+            except OSError:
+                f = None
+            if f is None:
+                self._index.pop(key, None)
+                self.misses += 1
+                return None
+
+            entry['last_access'] = time.time()
+            self._index.move_to_end(key)
+            self.hits += 1
+            return dict(entry, file=f)
+
+    def put(self, key, zip_bytes, download_name, metadata=None):
+        """
+        Store a finished result, evicting older entries to stay within max_bytes
+        """
+        def write(f):
+            f.write(zip_bytes)
+
+        self._store(key, len(zip_bytes), write, download_name, metadata)
+
+    def put_file(self, key, zip_path, download_name, metadata=None):
+        """
+        Store a finished result that already lives on disk
+        """
+        def write(f):
+            with open(zip_path, 'rb') as src:
+                shutil.copyfileobj(src, f)
+
+        self._store(key, os.path.getsize(zip_path), write, download_name, metadata)
+
+    def _store(self, key, size, write, download_name, metadata):
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            self._index.pop(key, None)
+            self._evict(size)
+
+            path = self._entry_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+
+            now = time.time()
+            self._index[key] = {
+                'size': size,
+                'download_name': download_name,
+                'metadata': metadata or {},
+                'created': now,
+                'last_access': now,
+            }
+            self._index.move_to_end(key)
+            self._save_index()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._index),
+                'size_bytes': self._size(),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
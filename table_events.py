@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+import re
+import zipfile
+
+METADATA_SUFFIX = '_metadata.json'
+
+
+def sse_event(event, data):
+    """
+    One Server-Sent Events message carrying a JSON payload
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def table_payload(base_filename, csv_text, metadata_json):
+    """
+    Event payload of one result table: its name and page, the CSV rows and the
+    metadata, exactly as they are written into the result ZIP
+    """
+    page = re.match(r'\d+', base_filename)
+    return {'table': base_filename, 'page': int(page.group(0)) if page else None,
+            'rows': list(csv.reader(io.StringIO(csv_text))), 'metadata': json.loads(metadata_json)}
+
+
+class TableEventSink:
+    """
+    Output sink holding the files of each table until the caller turns them
+    into an event with pop_table. Every file is also passed on to an optional
+    inner sink, e.g. a ZipSink building the ZIP for the result cache.
+    """
+
+    def __init__(self, inner=None):
+        self.inner = inner
+        self._files = {}
+
+    def write(self, filename, content):
+        if self.inner is not None:
+            self.inner.write(filename, content)
+        self._files[filename] = content
+
+    def pop_table(self, base_filename):
+        return table_payload(base_filename, self._files.pop(f"{base_filename}.csv"),
+                             self._files.pop(f"{base_filename}{METADATA_SUFFIX}"))
+
+
+def zip_table_payloads(source):
+    """
+    Table payloads of a result ZIP (CSV output, a path or an open binary
+    file), in archive order
+    """
+    with zipfile.ZipFile(source) as archive:
+        names = set(archive.namelist())
+        for name in archive.namelist():
+            base_filename = name[:-len('.csv')]
+            if name.endswith('.csv') and f"{base_filename}{METADATA_SUFFIX}" in names:
+                yield table_payload(base_filename, archive.read(name).decode('utf-8'),
+                                    archive.read(f"{base_filename}{METADATA_SUFFIX}").decode('utf-8'))
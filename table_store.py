@@ -0,0 +1,253 @@
+import argparse
+import io
+import json
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from value_parser import parse_values
+
+PARQUET_FILENAME = 'tables.parquet'
+CATALOG_FILENAME = 'catalog.jsonl'
+
+# One row per table cell, so tables of any shape share a single schema.
+# 'sample' is the row label (first column), 'column' the header of the cell.
+SCHEMA = pa.schema([
+    ('doi', pa.string()),
+    ('title', pa.string()),
+    ('note', pa.string()),
+    ('abbreviations', pa.string()),
+    ('page', pa.int32()),
+    ('table', pa.string()),
+    ('row', pa.int32()),
+    ('sample', pa.string()),
+    ('column', pa.string()),
+    ('value', pa.string()),
+    ('mean', pa.float32()),
+    ('sd', pa.float32()),
+    ('letters', pa.string()),
+])
+
+
+def _repeat(value, size, type=pa.string()):
+    return pa.repeat(pa.scalar(value, type), size)
+
+
+def long_table(headers, rows, metadata, doi, page, table_id):
+    """
+    Arrow table holding one row per filled value cell of an extracted table,
+    with its metadata as columns and mean±SD cells parsed into mean, sd and
+    letters
+
+    Args:
+        headers (list): Column headers, the first one naming the sample column
+        rows (list): Rows of cells (first cell is the sample)
+        metadata (dict): Title, note and abbreviations of the table
+        doi (str): DOI of the paper
+        page (int): Page (document) number the table was found on
+        table_id (str): Table name within the paper, e.g. '3b'
+
+    Returns:
+        pa.Table: Table with SCHEMA
+    """
+    width = len(headers)
+    grid = np.array([[('' if cell is None else str(cell).strip()) for cell in list(row)[:width]]
+                     + [''] * (width - len(row)) for row in rows], dtype=object).reshape(len(rows), width)
+    values = grid[:, 1:]
+    parsed = parse_values(pd.DataFrame(values))
+
+    filled = (values != '').ravel()
+    size = int(filled.sum())
+    n_rows, n_cols = values.shape
+    row_index = np.repeat(np.arange(n_rows, dtype=np.int32), n_cols)[filled]
+    column_index = np.tile(np.arange(n_cols), n_rows)[filled]
+
+    letters = parsed['letters'].ravel()[filled]
+    return pa.table({
+        'doi': _repeat(doi, size),
+        'title': _repeat(metadata.get('title'), size),
+        'note': _repeat(metadata.get('note'), size),
+        'abbreviations': _repeat(metadata.get('abbreviations'), size),
+        'page': _repeat(page, size, pa.int32()),
+        'table': _repeat(table_id, size),
+        'row': pa.array(row_index, pa.int32()),
+        'sample': pa.array(grid[:, 0][row_index], pa.string()),
+        'column': pa.array(np.array([str(header) for header in headers[1:]], dtype=object)[column_index],
+                           pa.string()),
+        'value': pa.array(values.ravel()[filled], pa.string()),
+        'mean': pa.array(parsed['mean'].ravel()[filled], pa.float32(), from_pandas=True),
+        'sd': pa.array(parsed['sd'].ravel()[filled], pa.float32(), from_pandas=True),
+        'letters': pa.array(letters, pa.string()),
+    }, schema=SCHEMA)
+
+
+class ParquetTableWriter:
+    """
+    Collects extracted tables into one in-memory Parquet file, writing every
+    table as its own row group so readers can skip tables by their statistics
+    """
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._writer = pq.ParquetWriter(self._buffer, SCHEMA, compression='zstd')
+        self.tables = []
+
+    def write_table(self, table):
+        self._writer.write_table(table, row_group_size=max(table.num_rows, 1))
+        self.tables.append(table)
+
+    def getvalue(self):
+        """
+        Close the file and return its bytes
+        """
+        self._writer.close()
+        return self._buffer.getvalue()
+
+    def combined(self):
+        """
+        All written tables as one Arrow table
+        """
+        return pa.concat_tables(self.tables) if self.tables else SCHEMA.empty_table()
+
+
+def _keys(values):
+    return sorted({str(value).strip().lower() for value in values if value})
+
+
+class TableStore:
+    """
+    Append-only Parquet dataset of extracted tables shared across runs.
+
+    Every append writes a new part file under data/ and adds one line to
+    catalog.jsonl listing the DOIs and the (lower-cased) sample and column
+    names of that part, so a query only opens the parts that can match.
+    Appends from several processes are safe: part names are unique and each
+    catalog line is written with a single append. Parts appended with the
+    hash of their PDF replace the earlier parts of that PDF, which stay on
+    disk but are no longer queried.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.data_dir = os.path.join(root, 'data')
+        self.catalog_path = os.path.join(root, CATALOG_FILENAME)
+        os.makedirs(self.data_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def append(self, table, source=None, file_hash=None):
+        """
+        Add a table with SCHEMA to the store. With file_hash (SHA-256 of the
+        PDF the table was extracted from) it replaces what was appended for
+        that PDF before, so extracting a PDF again does not duplicate its rows;
+        an empty table then still records that the PDF has no tables.
+
+        Returns:
+            str: Name of the written part, or None for an empty table
+        """
+        if table.num_rows == 0 and file_hash is None:
+            return None
+
+        part = None
+        if table.num_rows:
+            part = f"part-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:12]}.parquet"
+            tmp_path = os.path.join(self.data_dir, f".{part}.tmp")
+            pq.write_table(table, tmp_path, compression='zstd', row_group_size=max(table.num_rows, 1))
+            os.replace(tmp_path, os.path.join(self.data_dir, part))
+
+        entry = {
+            'part': part,
+            'source': source,
+            'file_hash': file_hash,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'rows': table.num_rows,
+            'dois': _keys(pc.unique(table['doi']).to_pylist()),
+            'samples': _keys(pc.unique(table['sample']).to_pylist()),
+            'columns': _keys(pc.unique(table['column']).to_pylist()),
+        }
+        line = json.dumps(entry) + '\n'
+        with self._lock, open(self.catalog_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+        return part
+
+    def catalog(self):
+        """
+        Catalog entries of the parts in use, oldest first: of the entries
+        appended for the same file_hash only the latest counts
+        """
+        try:
+            with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+        except OSError:
+            return []
+
+        latest = {entry['file_hash']: i for i, entry in enumerate(entries) if entry.get('file_hash')}
+        return [entry for i, entry in enumerate(entries)
+                if entry['part'] and latest.get(entry.get('file_hash'), i) == i]
+
+    def query(self, doi=None, amino_acid=None, columns=None):
+        """
+        Rows of the store matching a DOI and/or an amino acid (matched against
+        the sample and the column names, case-insensitively)
+
+        Args:
+            doi (str): DOI to select
+            amino_acid (str): Amino acid name, e.g. 'Leu' or 'Lysine'
+            columns (list): Columns to read, all by default
+
+        Returns:
+            pa.Table: Matching rows
+        """
+        doi_key = doi.strip().lower() if doi else None
+        amino_key = amino_acid.strip().lower() if amino_acid else None
+
+        parts = [entry['part'] for entry in self.catalog()
+                 if (doi_key is None or doi_key in entry['dois']) and
+                 (amino_key is None or amino_key in entry['samples'] or amino_key in entry['columns'])]
+        if not parts:
+            return SCHEMA.empty_table().select(columns) if columns else SCHEMA.empty_table()
+
+        expression = None
+        if doi_key is not None:
+            expression = pc.utf8_lower(ds.field('doi')) == doi_key
+        if amino_key is not None:
+            amino = ((pc.utf8_lower(pc.utf8_trim_whitespace(ds.field('sample'))) == amino_key) |
+                     (pc.utf8_lower(pc.utf8_trim_whitespace(ds.field('column'))) == amino_key))
+            expression = amino if expression is None else expression & amino
+
+        dataset = ds.dataset([os.path.join(self.data_dir, part) for part in parts], schema=SCHEMA,
+                             format='parquet')
+        return dataset.to_table(columns=columns, filter=expression)
+
+
+def configured_store():
+    """
+    TableStore at TABLE_STORE_DIR, or None when the variable is not set
+    """
+    root = os.getenv('TABLE_STORE_DIR')
+    return TableStore(root) if root else None
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description='Query the consolidated table store')
+    arg_parser.add_argument('store', help='Store directory (TABLE_STORE_DIR)')
+    arg_parser.add_argument('--doi')
+    arg_parser.add_argument('--amino-acid')
+    arg_parser.add_argument('--output', help='Write the matching rows to this .csv or .parquet file')
+    args = arg_parser.parse_args()
+
+    result = TableStore(args.store).query(doi=args.doi, amino_acid=args.amino_acid)
+    print(f"{result.num_rows} row(s)")
+    if args.output and args.output.endswith('.parquet'):
+        pq.write_table(result, args.output)
+    elif args.output:
+        result.to_pandas().to_csv(args.output, index=False)
+    else:
+        print(result.to_pandas().head(20).to_string())
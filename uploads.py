@@ -0,0 +1,97 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from flask import Request
+from werkzeug.utils import secure_filename
+
+# Uploads up to this size are held in memory, larger ones spill to a temporary file
+UPLOAD_SPOOL_BYTES = int(os.getenv('UPLOAD_SPOOL_MB', '8')) * 1024 * 1024
+
+# Largest accepted request body for PDF uploads and for batch archives (413 above)
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_MB', '100')) * 1024 * 1024
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv('MAX_BATCH_UPLOAD_MB', '2048')) * 1024 * 1024
+
+# Parent of the per-request workspaces (default: the system temp directory)
+UPLOAD_DIR = os.getenv('UPLOAD_DIR') or None
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class HashingSpooledFile(tempfile.SpooledTemporaryFile):
+    """
+    SpooledTemporaryFile computing the SHA-256 of everything written to it, so
+    an upload is hashed while it is being received
+    """
+
+    def __init__(self, max_size=UPLOAD_SPOOL_BYTES):
+        super().__init__(max_size=max_size, dir=UPLOAD_DIR)
+        self._digest = hashlib.sha256()
+
+    def write(self, data):
+        self._digest.update(data)
+        return super().write(data)
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+
+class UploadRequest(Request):
+    """
+    Flask request class receiving uploaded files into HashingSpooledFile
+    streams instead of Werkzeug's default (memory up to 500 KB, then disk)
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingSpooledFile()
+
+
+def upload_hash(file):
+    """
+    SHA-256 of an uploaded werkzeug FileStorage, computed while it was received
+    when possible and otherwise by reading the stream once
+    """
+    hexdigest = getattr(file.stream, 'hexdigest', None)
+    if hexdigest is not None:
+        return hexdigest()
+
+    digest = hashlib.sha256()
+    file.stream.seek(0)
+    for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    file.stream.seek(0)
+    return digest.hexdigest()
+
+
+class UploadWorkspace:
+    """
+    Scratch directory of one request, so concurrent uploads of files with the
+    same name never share a path. cleanup() removes it with everything written
+    into it and may be called more than once.
+    """
+
+    def __init__(self, root=UPLOAD_DIR):
+        self.path = tempfile.mkdtemp(prefix='amino-upload-', dir=root)
+
+    def save(self, file, filename=None):
+        """
+        Write an uploaded FileStorage into the workspace
+
+        Returns:
+            str: Path of the saved file
+        """
+        path = os.path.join(self.path, secure_filename(filename or file.filename or '') or 'upload')
+        file.stream.seek(0)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(file.stream, f, CHUNK_SIZE)
+        return path
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
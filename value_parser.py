@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# mean, optional ±SD (also written +/- or +-) and optional significance letters,
+# e.g. "2.45±0.05b", "7.53 ± 0.08 e" (superscript letters), "45", "-0.3a".
+# Written for RE2 (pyarrow.compute); Python's re accepts it too.
+VALUE_PATTERN = (
+    r'^(?P<mean>[-+−]?(?:\d+(?:\.\d+)?|\.\d+))'
+    r'(?:\s*(?:±|\+/?-)\s*(?P<sd>\d+(?:\.\d+)?|\.\d+))?'
+    r'\s*(?P<letters>[A-Za-z]{1,4})?$'
+)
+
+# Columns that describe a row rather than hold measured values
+LABEL_COLUMNS = ('Sample', 'Title', 'DOI')
+
+
+def _optional_float32(strings):
+    """
+    float32 numpy array from a pyarrow string array, NaN for null or empty entries
+    """
+    strings = pc.if_else(pc.equal(strings, ''), pa.scalar(None, pa.string()), strings)
+    return pc.cast(strings, pa.float32()).to_numpy(zero_copy_only=False)
+
+
+def parse_values(df):
+    """
+    Split every cell of a frame into mean, SD and significance letters in one
+    vectorised pass over the flattened values (a single Arrow regex kernel
+    instead of a Python regex call per cell)
+
+    Args:
+        df (pd.DataFrame): Table with string (or missing) cells
+
+    Returns:
+        dict: 2-D arrays shaped like df: 'mean' and 'sd' (float32, NaN where
+        absent), 'letters' (object, None where absent) and 'parsed' (bool, True
+        where the cell is a value)
+    """
+    shape = df.shape
+    flat = pd.Series(df.to_numpy(dtype=object).ravel(), dtype=object)
+    strings = pc.utf8_trim_whitespace(pa.array(flat.astype(str), type=pa.string(), from_pandas=True))
+    parts = pc.extract_regex(strings, VALUE_PATTERN)
+
+    parsed = pc.is_valid(parts).to_numpy(zero_copy_only=False)
+    mean = _optional_float32(pc.replace_substring(pc.struct_field(parts, 'mean'), '−', '-'))
+    sd = _optional_float32(pc.struct_field(parts, 'sd'))
+    letters = pc.struct_field(parts, 'letters').to_numpy(zero_copy_only=False).astype(object)
+    letters[~parsed | (letters == '')] = None
+
+    return {
+        'mean': mean.reshape(shape),
+        'sd': sd.reshape(shape),
+        'letters': letters.reshape(shape),
+        'parsed': parsed.reshape(shape),
+    }
+
+
+def numeric_mask(df):
+    """
+    Boolean array marking the cells of df that hold a (mean±SD) value
+    """
+    if df.size == 0:
+        return np.zeros(df.shape, dtype=bool)
+    return parse_values(df)['parsed']
+
+
+def split_value_columns(df, min_ratio=0.5, label_columns=LABEL_COLUMNS):
+    """
+    Typed copy of a cleaned table: every value column is replaced by
+    '<name>_mean' and, where present, '<name>_sd' (float32) and
+    '<name>_letters' (categorical) columns. Label columns and columns where
+    fewer than min_ratio of the filled cells are values are kept as text.
+
+    Returns:
+        pd.DataFrame: Typed table with the same index
+    """
+    values = parse_values(df)
+    text = df.to_numpy(dtype=object)
+    flat = pd.Series(text.ravel(), dtype=object)
+    filled = (flat.notna() & (flat.astype(str).str.strip() != '')).to_numpy().reshape(df.shape)
+
+    names = []
+    arrays = []
+    for j, name in enumerate(df.columns):
+        parsed = values['parsed'][:, j]
+        is_values = (str(name) not in label_columns and filled[:, j].any() and
+                     parsed.sum() >= min_ratio * filled[:, j].sum())
+        if not is_values:
+            names.append(name)
+            arrays.append(text[:, j])
+            continue
+
+        names.append(f"{name}_mean")
+        arrays.append(values['mean'][:, j])
+        if not np.isnan(values['sd'][:, j]).all():
+            names.append(f"{name}_sd")
+            arrays.append(values['sd'][:, j])
+        letters = values['letters'][:, j]
+        if any(letter is not None for letter in letters):
+            names.append(f"{name}_letters")
+            arrays.append(pd.Categorical(letters))
+
+    typed = pd.DataFrame({i: array for i, array in enumerate(arrays)}, index=df.index)
+    typed.columns = names
+    return typed
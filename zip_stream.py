@@ -0,0 +1,102 @@
+import os
+import zipfile
+
+from metrics import span
+
+
+class _ChunkBuffer:
+    """
+    Write-only, non-seekable file object collecting the bytes zipfile produces
+    until they are drained
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ZipSink:
+    """
+    Output sink writing result files straight into a ZIP archive.
+
+    With a file object the archive is written to it directly; without one the
+    archive bytes are buffered only until drain() is called, so a response
+    generator can hand out each entry as soon as it has been written and never
+    holds the whole archive in memory.
+    """
+
+    def __init__(self, fileobj=None, compression=zipfile.ZIP_STORED):
+        self._buffer = None
+        if fileobj is None:
+            self._buffer = _ChunkBuffer()
+            fileobj = self._buffer
+        self._zip = zipfile.ZipFile(fileobj, 'w', compression=compression)
+        self.entries = 0
+
+    def write(self, filename, content):
+        with span('zip'):
+            self._zip.writestr(filename, content)
+        self.entries += 1
+
+    def drain(self):
+        """
+        Archive bytes produced since the previous call (only without a file object)
+        """
+        return self._buffer.drain() if self._buffer else b''
+
+    def close(self):
+        with span('zip'):
+            self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def write_directory(directory, sink):
+    """
+    Write every file below directory into sink, yielding after each file
+    """
+    for root, _, files in os.walk(directory):
+        for file in sorted(files):
+            file_path = os.path.join(root, file)
+            with open(file_path, 'rb') as f:
+                sink.write(os.path.relpath(file_path, directory), f.read())
+            yield file_path
+
+
+def iter_zip(sink, steps):
+    """
+    Drive a generator that writes into sink and yield the archive bytes as they
+    become available, finishing with the central directory
+
+    Args:
+        sink (ZipSink): Buffered sink the steps write into
+        steps (iterable): Generator performing one unit of output per item
+    """
+    for _ in steps:
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+    sink.close()
+    chunk = sink.drain()
+    if chunk:
+        yield chunk